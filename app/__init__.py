@@ -1,25 +1,41 @@
-"""app/__init__.py"""
+"""app/__init__.py
+
+Application factory.
+
+Startup does only what serving requests needs. Flask-Migrate (and through
+it Alembic) is imported only when the app is built for a `flask` CLI
+command, and the Debug Toolbar only when `DEBUG_TB_ENABLED` is set (in
+development). Nothing is printed. `wsgi.py` builds the production app.
+`flask routes` lists the URL rules the factory used to print.
+"""
 
 import os
+import click
 from dotenv import load_dotenv
 from flask import Flask, render_template, g
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
 from flask_login import LoginManager, current_user
-from flask_debugtoolbar import DebugToolbarExtension
 from app.config.settings import config
-from app.models import db, User
+from app.models import db
 from app.routes import main_bp
 from app.auth.routes import auth_bp
 from app.users.routes import users_bp
 from app.messages.routes import messages_bp
+from app.internal.routes import internal_bp
+from app.cache import timeline_cache
+from app.follow_graph import follow_graph
+from app.autocomplete import autocomplete
+from app.passwords import password_hasher
+from app.principal import load_principal, revocations
+from app.throttle import login_throttle
+from app.pool import configure_pool
+from app.replicas import init_replicas
+from app.commands import register_commands
+from app.utils.query_budget import init_query_budget
 from flask_wtf.csrf import CSRFProtect, CSRFError
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime
 
 # Initialize extensions
-bcrypt = Bcrypt()
-migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
 load_dotenv()
@@ -40,7 +56,6 @@ def register_error_handlers(app):
 
     @app.errorhandler(404)
     def page_not_found(e):
-        print("Attempting to render error.html")
         return render_template("error.html", message="Page not found."), 404
 
     @app.errorhandler(500)
@@ -73,9 +88,8 @@ def create_app(config_name=None):
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'fallback-secret-key')
     assert app.config['SECRET_KEY'], "SECRET_KEY is missing!"
     
-    # Debug to ensure the right environment is used
-    print(f"Config in use: {config_name}")
-    print(f"WTF_CSRF_ENABLED: {app.config['WTF_CSRF_ENABLED']}")
+    config[config_name].init_app(app)
+    app.logger.debug("Config in use: %s", config_name)
 
     # Adjust database configuration for testing environment
     if config_name == "testing":
@@ -83,16 +97,32 @@ def create_app(config_name=None):
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config["WTF_CSRF_ENABLED"] = False
 
-    # initialize debugger toolbar
-    toolbar = DebugToolbarExtension()
-    toolbar.init_app(app)
+    if app.config.get('PROXY_FIX_X_FOR'):
+        # Client address and scheme from the trusted proxies' forwarding headers
+        proxies = app.config['PROXY_FIX_X_FOR']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
+    if app.config.get('DEBUG_TB_ENABLED'):
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
 
     # Initialize extensions
     csrf.init_app(app)  # Initialize CSRF protection
+    init_replicas(app)
+    configure_pool(app)
     db.init_app(app)
-    bcrypt.init_app(app)
-    migrate.init_app(app, db)
+    password_hasher.init_app(app)
+    # Only `flask db ...` needs migrations; web workers skip importing Alembic
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
     login_manager.init_app(app)
+    timeline_cache.init_app(app)
+    revocations.init_app(app)
+    follow_graph.init_app(app)
+    autocomplete.init_app(app)
+    login_throttle.init_app(app)
+    init_query_budget(app)
 
     # Handle CSRF errors (Define before registering)
     @app.errorhandler(CSRFError)
@@ -124,15 +154,15 @@ def create_app(config_name=None):
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(users_bp, url_prefix="/users")
     app.register_blueprint(messages_bp, url_prefix="/messages")
+    app.register_blueprint(internal_bp, url_prefix="/internal")
     app.register_error_handler(CSRFError, handle_csrf_error)
+
+    # Register CLI commands
+    register_commands(app)
     
     @app.before_request
     def load_logged_in_user():
         g.user = current_user if current_user.is_authenticated else None
-    
-    # Print all routes for debugging
-    for rule in app.url_map.iter_rules():
-        print(f"Rule: {rule}, Endpoint: {rule.endpoint}")
 
     return app
 
@@ -140,5 +170,5 @@ def create_app(config_name=None):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login."""
-    return User.query.get(int(user_id))
+    """Load the cached principal for Flask-Login; see app/principal.py."""
+    return load_principal(int(user_id))
@@ -1,9 +1,16 @@
 """app/auth/routes.py"""
 
+import math
 from flask import render_template, redirect, url_for, flash, request, current_app, Blueprint
-from flask_login import login_user, logout_user, login_required
+from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, User
 from app.forms import LoginForm, RegistrationForm, UserProfileForm
+from app.search import index_user
+from app.autocomplete import autocomplete
+from app.passwords import PasswordHasherBusy
+from app.throttle import login_throttle
+from app.cache import timeline_cache
+from app.principal import current_user_model, invalidate_principal, forget_principal
 from . import auth_bp
 
 auth_bp = Blueprint('auth', __name__)
@@ -15,6 +22,13 @@ def login():
     if form.validate_on_submit():
         current_app.logger.debug("Form validation succeeded.")
 
+        # Refuse throttled attempts before any database or bcrypt work
+        retry_after = login_throttle.check(request.remote_addr, form.username.data)
+        if retry_after:
+            current_app.logger.warning(f"Login throttled for {request.remote_addr}.")
+            return ("Too many login attempts. Please try again later.", 429,
+                    {'Retry-After': str(math.ceil(retry_after)), 'Content-Type': 'text/plain'})
+
         # Log the username being queried
         current_app.logger.debug(f"Looking up user with username: {form.username.data}")
         user = User.query.filter_by(username=form.username.data).first()
@@ -23,7 +37,17 @@ def login():
             current_app.logger.debug(f"User found: {user}")
 
             # Log password check
-            if user.check_password(form.password.data):
+            try:
+                password_ok = user.check_password(form.password.data)
+                if password_ok and user.rehash_password_if_needed(form.password.data):
+                    db.session.commit()
+                    current_app.logger.info(f"Re-hashed password for user {user.id} at the configured cost.")
+            except PasswordHasherBusy:
+                current_app.logger.warning("Password hasher saturated; shedding login.")
+                flash("Too many sign-ins right now. Please try again in a moment.", "warning")
+                return render_template('auth/login.html', form=form), 503
+
+            if password_ok:
                 current_app.logger.debug("Password matched.")
                 login_user(user)
                 flash("Logged in successfully!", "success")  # Added message required for the test case
@@ -33,7 +57,8 @@ def login():
                 current_app.logger.debug("Invalid password.")
         else:
             current_app.logger.debug(f"No user found with username: {form.username.data}")
-        
+
+        login_throttle.failed(form.username.data)
         flash("Invalid username or password.", "danger")
     else:
         if request.method == 'POST':
@@ -89,11 +114,19 @@ def register():
                 )
                 user.set_password(form.password.data)
                 db.session.add(user)
+                db.session.flush()  # Assigns the id the search index is keyed on
+                index_user(user)
                 db.session.commit()
+                autocomplete.add_user(user.id, user.username)
 
                 flash("Account created successfully. Please log in.", "success")
                 current_app.logger.debug(f"User created successfully: {user}")
                 return redirect(url_for("auth.login"))
+            except PasswordHasherBusy:
+                db.session.rollback()
+                current_app.logger.warning("Password hasher saturated; shedding sign-up.")
+                flash("Too many sign-ups right now. Please try again in a moment.", "warning")
+                return render_template("auth/register.html", form=form), 503
             except Exception as e:
                 db.session.rollback()
                 flash("An error occurred. Please try again.", "danger")
@@ -130,6 +163,7 @@ def logout():
     print("Logout route accessed.")  # Debug statement
     print(f"Flash function: {flash}")  # Ensure flash is accessible
     logout_user()
+    forget_principal()
     flash("You have been logged out.", "info")
     return redirect(url_for("auth.login"))
 
@@ -139,18 +173,23 @@ def logout():
 @login_required
 def profile():
     """Update profile for the current user."""
-    form = UserProfileForm(obj=current_user)
+    user = current_user_model()
+    form = UserProfileForm(obj=user)
     if form.validate_on_submit():
-        current_user.username = form.username.data
-        current_user.email = form.email.data
-        current_user.bio = form.bio.data
-        current_user.location = form.location.data
-        current_user.image_url = form.image_url.data or "/static/images/default-pic.png"
-        current_user.header_image_url = form.header_image_url.data or "/static/images/warbler-hero.jpg"
-
+        user.username = form.username.data
+        user.email = form.email.data
+        user.bio = form.bio.data
+        user.location = form.location.data
+        user.image_url = form.image_url.data or "/static/images/default-pic.png"
+        user.header_image_url = form.header_image_url.data or "/static/images/warbler-hero.jpg"
+
+        index_user(user)
         db.session.commit()
+        autocomplete.add_user(user.id, user.username)
+        invalidate_principal(user.id)
+        timeline_cache.invalidate_author(user.id)
         flash("Profile updated successfully.", "success")
-        return redirect(url_for('users.users_show', user_id=current_user.id))
+        return redirect(url_for('users.users_show', user_id=user.id))
     return render_template('users/edit.html', form=form)
 
 
@@ -0,0 +1,153 @@
+"""app/autocomplete.py
+
+In-memory prefix index for username type-ahead.
+
+Usernames are held in one packed string, sorted case-insensitively, with
+an `array` of start offsets and a parallel `array` of user ids. A prefix
+lookup is a binary search plus a short forward scan, with no database
+round-trip. Steady-state memory is about one byte per username character
+plus 12 bytes per user, a few tens of megabytes for millions of users,
+where a list of `str` objects would need several times that.
+
+Registrations, renames and deletions made by this process go into a small
+sorted overlay (see `UsernameIndex.add`). Once it grows past
+`AUTOCOMPLETE_COMPACT_THRESHOLD`, the index is rebuilt in the background.
+Changes made by other worker processes show up when the index is rebuilt,
+at most `AUTOCOMPLETE_MAX_AGE` seconds later.
+"""
+
+import time
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import islice
+from typing import Iterable
+from sqlalchemy import select
+from app.models import db, User
+from app.utils.rebuilding_index import RebuildingIndex
+
+SEPARATOR = '\0'
+
+
+def _sort_key(username: str) -> tuple[str, str]:
+    return username.lower(), username
+
+
+class _Names:
+    """Sequence view over the packed usernames, so `bisect` can search it."""
+
+    def __init__(self, blob: str, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1] - 1]
+
+
+class UsernameIndex:
+    """Case-insensitive prefix index over usernames.
+
+    Args:
+        entries: `(username, user_id)` pairs in any order.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, int]]):
+        entries = sorted(entries, key=lambda entry: _sort_key(entry[0]))
+        self.blob = ''.join(username + SEPARATOR for username, _ in entries)
+        offsets = array('q', [0])
+        for username, _ in entries:
+            offsets.append(offsets[-1] + len(username) + 1)
+        self.names = _Names(self.blob, offsets)
+        self.ids = array('i', (user_id for _, user_id in entries))
+        self.added = []  # sorted (lowercased, username, user_id) entries
+        self.removed = set()  # ids whose packed entry no longer applies
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_db(cls, batch_size: int = 50000) -> "UsernameIndex":
+        """Build the index by streaming `users`."""
+        rows = db.session.execute(
+            select(User.username, User.id).execution_options(yield_per=batch_size)
+        )
+        return cls((username, user_id) for username, user_id in rows)
+
+    def _base(self, prefix: str):
+        i = bisect_left(self.names, prefix, key=str.lower)
+        while i < len(self.names):
+            username = self.names[i]
+            if not username.lower().startswith(prefix):
+                return
+            if self.ids[i] not in self.removed:
+                yield username.lower(), username, self.ids[i]
+            i += 1
+
+    def _overlay(self, prefix: str):
+        i = bisect_left(self.added, (prefix,))
+        for entry in self.added[i:]:
+            if not entry[0].startswith(prefix):
+                return
+            yield entry
+
+    def complete(self, prefix: str, limit: int = 8) -> list[tuple[int, str]]:
+        """Return up to `limit` `(user_id, username)` pairs whose username starts with `prefix`.
+
+        Matching ignores case; results are in case-insensitive alphabetical order.
+        """
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        entries = merge(self._base(prefix), self._overlay(prefix))
+        return [(user_id, username) for _, username, user_id in islice(entries, limit)]
+
+    def add(self, user_id: int, username: str) -> None:
+        """Record a user created or renamed after the index was built."""
+        self.remove(user_id)
+        insort(self.added, (*_sort_key(username), user_id))
+
+    def remove(self, user_id: int) -> None:
+        """Record a user renamed or deleted after the index was built."""
+        self.added = [entry for entry in self.added if entry[2] != user_id]
+        self.removed.add(user_id)
+
+    def pending(self) -> int:
+        """Number of overlay entries not yet folded into the arrays."""
+        return len(self.added) + len(self.removed)
+
+    def compact(self) -> None:
+        """Fold the overlay into fresh packed arrays."""
+        base = ((self.names[i], self.ids[i]) for i in range(len(self.names)) if self.ids[i] not in self.removed)
+        fresh = UsernameIndex([*base, *((username, user_id) for _, username, user_id in self.added)])
+        self.blob, self.names, self.ids = fresh.blob, fresh.names, fresh.ids
+        self.added, self.removed = [], set()
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the packed string and arrays."""
+        return (len(self.blob) + self.names.offsets.itemsize * len(self.names.offsets)
+                + self.ids.itemsize * len(self.ids))
+
+
+class Autocomplete(RebuildingIndex):
+    """Per-process username index; see `RebuildingIndex` for rebuilds."""
+    name = 'autocomplete'
+    config_prefix = 'AUTOCOMPLETE'
+
+    def build(self) -> UsernameIndex:
+        return UsernameIndex.from_db()
+
+    def complete(self, prefix: str, limit: int = 8) -> list[tuple[int, str]]:
+        """Return up to `limit` `(user_id, username)` pairs starting with `prefix`."""
+        return self.current().complete(prefix, limit)
+
+    def add_user(self, user_id: int, username: str) -> None:
+        """Record a committed registration or username change."""
+        self.apply(lambda index: index.add(user_id, username))
+
+    def remove_user(self, user_id: int) -> None:
+        """Record a committed account deletion."""
+        self.apply(lambda index: index.remove(user_id))
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,182 @@
+"""app/bulk_import.py
+
+Bulk user import.
+
+`User.signup` costs one bcrypt hash, two uniqueness queries and a commit per
+user. `import_users` instead works in chunks of `chunk_size` rows:
+
+1. rows with missing fields, or repeating a username/email seen earlier in
+   the file, are rejected without touching the database;
+2. one query finds the chunk's usernames and emails that are already taken;
+3. the surviving passwords are hashed on a process pool, so throughput
+   grows with the number of cores;
+4. the chunk is inserted with a single executemany, indexed for search,
+   and committed.
+
+If a concurrent signup takes a name between steps 2 and 4, the insert
+fails. The chunk is then retried row by row inside savepoints, so only the
+rows that really conflict are rejected.
+
+Every rejected row is reported with its line number and the reason.
+Running web workers see the new usernames in autocomplete after their next
+index rebuild (`AUTOCOMPLETE_MAX_AGE`).
+"""
+
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Iterable, Iterator
+from sqlalchemy import select, insert, or_
+from sqlalchemy.exc import IntegrityError
+from app.models import db, User
+from app.passwords import password_hasher, bcrypt_hash
+from app.search import index_new_users
+
+DEFAULT_IMAGE_URL = "/static/images/default-pic.png"
+
+
+class ImportRow(NamedTuple):
+    """One user to import; `line` is the row's line number in the source file."""
+    line: int
+    username: str
+    email: str
+    password: str
+    image_url: str | None = None
+
+
+class Conflict(NamedTuple):
+    """A rejected row."""
+    line: int
+    username: str
+    reason: str
+
+
+class ImportReport(NamedTuple):
+    """Outcome of an import."""
+    created: int
+    conflicts: list[Conflict]
+
+
+def read_csv(file) -> Iterator[ImportRow]:
+    """Yield rows from a CSV with `username,email,password[,image_url]` columns.
+
+    Raises:
+        ValueError: If a required column is missing from the header.
+    """
+    reader = csv.DictReader(file)
+    missing = {'username', 'email', 'password'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+    for record in reader:
+        yield ImportRow(reader.line_num, (record['username'] or '').strip(), (record['email'] or '').strip(),
+                        record['password'] or '', (record.get('image_url') or '').strip() or None)
+
+
+def _chunks(rows: Iterable[ImportRow], size: int) -> Iterator[list[ImportRow]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _taken(chunk: list[ImportRow]) -> tuple[set, set]:
+    """Return the chunk's usernames and emails that already exist, in one query."""
+    usernames = [row.username for row in chunk]
+    emails = [row.email for row in chunk]
+    taken_usernames, taken_emails = set(), set()
+    for username, email in db.session.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    ):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def _insert_rows(records: list[dict], chunk: list[ImportRow], conflicts: list[Conflict]) -> list[dict]:
+    """Insert a chunk; on a unique-constraint race, fall back to one savepoint per row."""
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(User), records)
+        return records
+    except IntegrityError:
+        inserted = []
+        for record, row in zip(records, chunk):
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(User), [record])
+                inserted.append(record)
+            except IntegrityError:
+                conflicts.append(Conflict(row.line, row.username, "username or email already taken"))
+        return inserted
+
+
+def import_users(rows: Iterable[ImportRow], chunk_size: int = 1000, processes: int | None = None) -> ImportReport:
+    """Create users in bulk, hashing passwords in parallel.
+
+    Args:
+        rows: Rows to import, for example from `read_csv`.
+        chunk_size (int): Rows checked, inserted and committed together.
+        processes (int | None): Hashing processes; None uses one per CPU.
+
+    Returns:
+        ImportReport: How many users were created and every rejected row.
+    """
+    conflicts = []
+    seen_usernames, seen_emails = set(), set()
+    created = 0
+    rounds = password_hasher.rounds
+    processes = processes or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for chunk in _chunks(rows, chunk_size):
+            valid = []
+            for row in chunk:
+                if not (row.username and row.email and row.password):
+                    conflicts.append(Conflict(row.line, row.username, "username, email and password are required"))
+                elif row.username in seen_usernames:
+                    conflicts.append(Conflict(row.line, row.username, "duplicate username in file"))
+                elif row.email in seen_emails:
+                    conflicts.append(Conflict(row.line, row.username, "duplicate email in file"))
+                else:
+                    seen_usernames.add(row.username)
+                    seen_emails.add(row.email)
+                    valid.append(row)
+            if not valid:
+                continue
+
+            taken_usernames, taken_emails = _taken(valid)
+            fresh = []
+            for row in valid:
+                if row.username in taken_usernames:
+                    conflicts.append(Conflict(row.line, row.username, "username already taken"))
+                elif row.email in taken_emails:
+                    conflicts.append(Conflict(row.line, row.username, "email already taken"))
+                else:
+                    fresh.append(row)
+            if not fresh:
+                continue
+
+            hashes = pool.map(bcrypt_hash, [row.password.encode('utf-8') for row in fresh], [rounds] * len(fresh),
+                              chunksize=max(1, len(fresh) // (4 * processes)))
+            records = [
+                {'username': row.username, 'email': row.email, 'password': password_hash,
+                 'image_url': row.image_url or DEFAULT_IMAGE_URL}
+                for row, password_hash in zip(fresh, hashes)
+            ]
+            inserted = _insert_rows(records, fresh, conflicts)
+
+            ids = dict(db.session.execute(
+                select(User.username, User.id).where(User.username.in_([r['username'] for r in inserted]))
+            ).all())
+            for record in inserted:
+                record['id'] = ids[record['username']]
+            index_new_users(inserted)
+            db.session.commit()
+            created += len(inserted)
+
+    conflicts.sort()
+    return ImportReport(created, conflicts)
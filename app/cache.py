@@ -0,0 +1,289 @@
+"""app/cache.py
+
+Caching for feed, profile and likes pages.
+
+Only query results are cached, as lightweight snapshots of the messages on a
+page. Rendered HTML is never cached because every page embeds a per-session
+CSRF token. Like counts and the viewer's likes are annotated fresh per
+request (see `app.feed`), so cached pages never show another viewer's state.
+
+Entries are keyed by `(kind, user_id, version, cursor)`. Invalidating a user's
+pages bumps their version for that kind, which orphans every cached page at
+once without scanning keys. Orphans age out through LRU eviction or TTL.
+
+The backend is pluggable. `LocalCache` is a bounded in-process LRU with
+TTLs. It only sees invalidations made by its own worker process, so other
+workers can serve a stale page for up to `CACHE_DEFAULT_TTL` seconds. A
+shared backend implementing `CacheBackend` removes that window.
+"""
+
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Any
+from sqlalchemy import select
+from app.models import db, User, Message, Likes, follows
+from app.replicas import reading_replica
+
+
+class CacheBackend(ABC):
+    """Interface every cache backend implements."""
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the cached value, or None on a miss."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store a value for `ttl` seconds (None: backend default, 0: no expiry)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every key."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Return backend counters."""
+
+
+class NullCache(CacheBackend):
+    """Backend that stores nothing; every lookup is a miss."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'null', 'hits': 0, 'misses': self.misses, 'evictions': 0,
+                'expirations': 0, 'size': 0, 'max_entries': 0}
+
+
+class LocalCache(CacheBackend):
+    """Bounded in-process LRU cache with per-entry TTLs.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is evicted.
+        default_ttl (float): Seconds an entry lives when `set` gets no ttl.
+        clock: Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, max_entries: int = 10000, default_ttl: float = 60, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'local', 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'size': len(self._entries), 'max_entries': self.max_entries}
+
+
+class AuthorSnapshot(NamedTuple):
+    """The author fields a message list renders."""
+    id: int
+    username: str
+    image_url: str
+
+
+class MessageSnapshot(NamedTuple):
+    """A detached, cacheable copy of a rendered message."""
+    id: int
+    text: str
+    timestamp: Any
+    user_id: int
+    user: AuthorSnapshot
+
+
+def snapshot_messages(messages) -> list[MessageSnapshot]:
+    """Copy ORM messages (with their authors) into cacheable snapshots."""
+    return [
+        MessageSnapshot(msg.id, msg.text, msg.timestamp, msg.user_id,
+                        AuthorSnapshot(msg.user.id, msg.user.username, msg.user.image_url))
+        for msg in messages
+    ]
+
+
+BACKENDS = {
+    'local': lambda config: LocalCache(config.get('CACHE_MAX_ENTRIES', 10000),
+                                       config.get('CACHE_DEFAULT_TTL', 60)),
+    'null': lambda config: NullCache(),
+}
+
+
+class TimelineCache:
+    """Versioned page cache for feeds, profiles and likes lists."""
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.hits = self.misses = self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Create the configured backend and register the cache on the app."""
+        name = app.config.get('CACHE_BACKEND', 'local')
+        if name not in BACKENDS:
+            raise KeyError(f"Invalid CACHE_BACKEND '{name}'. Valid options are: {list(BACKENDS)}")
+        self.backend = BACKENDS[name](app.config)
+        app.extensions['timeline_cache'] = self
+
+    def version(self, kind: str, user_id: int) -> str:
+        """Return the current version token of a user's `kind` entries."""
+        key = f"version:{kind}:{user_id}"
+        version = self.backend.get(key)
+        if version is None:
+            # A fresh token (never a counter reset) so an evicted version
+            # can never make old pages reachable again.
+            version = uuid.uuid4().hex
+            self.backend.set(key, version, ttl=0)
+        return version
+
+    def cached_page(self, kind: str, user_id: int, cursor: str | None, loader):
+        """Return the cached page for `(kind, user_id, cursor)`, loading it on a miss.
+
+        The key (and so the version) is fixed before `loader` runs, so a page
+        computed while a write invalidates it is stored under the old version
+        and is never served. Pages loaded from a read replica are served but
+        not stored: a lagging replica could otherwise cache a page missing a
+        write under the version that write created (see app/replicas.py).
+
+        Args:
+            kind (str): Page family: 'feed', 'profile' or 'likes'.
+            user_id (int): Owner of the page.
+            cursor (str | None): Keyset cursor of the page.
+            loader: Callable returning the page to cache on a miss.
+        """
+        key = f"page:{kind}:{user_id}:{self.version(kind, user_id)}:{cursor or ''}"
+        page = self.backend.get(key)
+        if page is not None:
+            self.hits += 1
+            return page
+
+        self.misses += 1
+        page = loader()
+        if not reading_replica():
+            self.backend.set(key, page)
+        return page
+
+    def invalidate(self, kind: str, *user_ids: int) -> None:
+        """Drop every cached entry of `kind` for the given users."""
+        for user_id in user_ids:
+            self.backend.set(f"version:{kind}:{user_id}", uuid.uuid4().hex, ttl=0)
+            self.invalidations += 1
+
+    def invalidate_message_audience(self, author_id: int) -> None:
+        """Drop the pages that show an author's messages.
+
+        That is the author's profile and home feed plus the home feed of
+        every follower. Followers of fan-out-on-read accounts are skipped, as
+        invalidating them would bring back the write amplification the
+        hybrid timeline avoids; they see the post once their page expires.
+        """
+        follower_ids = db.session.execute(
+            select(follows.c.user_following_id)
+            .join(User, User.id == follows.c.user_being_followed_id)
+            .where(follows.c.user_being_followed_id == author_id)
+            .where(User.fanout_on_read.is_(False))
+        ).scalars().all()
+        self.invalidate('profile', author_id)
+        self.invalidate('feed', author_id, *follower_ids)
+
+    def author_pages(self, author_id: int) -> dict[str, list[int]]:
+        """Return the owners of every page showing an author's username or picture, by kind.
+
+        Unlike `invalidate_message_audience` this includes followers of
+        fan-out-on-read accounts, and the likes pages of everyone who liked
+        one of the author's messages: profile edits and account deletions
+        are rare, posts are not.
+        """
+        follower_ids = db.session.execute(
+            select(follows.c.user_following_id)
+            .where(follows.c.user_being_followed_id == author_id)
+        ).scalars().all()
+        liker_ids = db.session.execute(
+            select(Likes.user_id).distinct()
+            .join(Message, Message.id == Likes.message_id)
+            .where(Message.user_id == author_id)
+        ).scalars().all()
+        return {'profile': [author_id], 'feed': [author_id, *follower_ids], 'likes': liker_ids}
+
+    def invalidate_pages(self, pages: dict[str, list[int]]) -> None:
+        """Drop the pages listed by `author_pages`."""
+        for kind, user_ids in pages.items():
+            self.invalidate(kind, *user_ids)
+
+    def invalidate_author(self, author_id: int) -> None:
+        """Drop every page that shows an author; call after a profile change.
+
+        Snapshots copy the author's fields, so they go stale on every edit.
+        To delete an account, collect `author_pages` before the rows are
+        gone and pass them to `invalidate_pages` after the commit.
+        """
+        self.invalidate_pages(self.author_pages(author_id))
+
+    def stats(self) -> dict:
+        """Return page hit/miss and invalidation counters plus backend counters.
+
+        Backend counters include the version lookups made for every page.
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'invalidations': self.invalidations, 'backend': self.backend.stats()}
+
+
+timeline_cache = TimelineCache()
@@ -0,0 +1,125 @@
+"""app/commands.py
+
+Bulk jobs import their modules inside the command, so web workers never
+load them (or multiprocessing) at startup.
+"""
+
+import csv
+import click
+from flask.cli import with_appcontext
+from app.timeline import rebuild_timelines
+from app.counters import reconcile_counters
+from app.search import reindex_users, reindex_messages
+
+
+@click.command('rebuild-timelines')
+@click.option('--batch-size', default=500, show_default=True, help="Users rebuilt per transaction.")
+@with_appcontext
+def rebuild_timelines_command(batch_size: int) -> None:
+    """Rebuild every user's home timeline from follows and messages."""
+    total = rebuild_timelines(batch_size=batch_size)
+    click.echo(f"Timelines rebuilt: {total} entries written.")
+
+
+@click.command('reconcile-counters')
+@click.option('--batch-size', default=1000, show_default=True, help="Rows recomputed per transaction.")
+@with_appcontext
+def reconcile_counters_command(batch_size: int) -> None:
+    """Recompute the denormalized user and message counters."""
+    user_rows, message_rows = reconcile_counters(batch_size=batch_size)
+    click.echo(f"Counters reconciled: {user_rows} users, {message_rows} messages.")
+
+
+@click.command('reindex-search')
+@click.option('--batch-size', default=1000, show_default=True, help="Rows indexed per transaction.")
+@with_appcontext
+def reindex_search_command(batch_size: int) -> None:
+    """Rebuild the user and message search indexes."""
+    users = reindex_users(batch_size=batch_size)
+    messages = reindex_messages(batch_size=batch_size)
+    click.echo(f"Search indexes rebuilt: {users} users, {messages} messages indexed.")
+
+
+@click.command('import-users')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8'))
+@click.option('--chunk-size', default=1000, show_default=True, help="Rows checked and inserted per transaction.")
+@click.option('--processes', type=int, default=None, help="Password hashing processes (default: one per CPU).")
+@click.option('--report', type=click.File('w', encoding='utf-8'), default=None,
+              help="Write rejected rows to this CSV instead of printing them.")
+@with_appcontext
+def import_users_command(csv_file, chunk_size: int, processes: int | None, report) -> None:
+    """Create users in bulk from a username,email,password[,image_url] CSV."""
+    from app.bulk_import import read_csv, import_users
+
+    try:
+        result = import_users(read_csv(csv_file), chunk_size=chunk_size, processes=processes)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='CSV_FILE')
+
+    if report is not None:
+        writer = csv.writer(report)
+        writer.writerow(['line', 'username', 'reason'])
+        writer.writerows(result.conflicts)
+    else:
+        for conflict in result.conflicts:
+            click.echo(f"line {conflict.line}: {conflict.username or '(blank)'}: {conflict.reason}", err=True)
+    click.echo(f"Users imported: {result.created} created, {len(result.conflicts)} rejected.")
+
+
+@click.command('seed')
+@click.option('--users', 'users_csv', default='app/generator/users.csv', show_default=True,
+              type=click.Path(exists=True, dir_okay=False), help="Users CSV.")
+@click.option('--messages', 'messages_csv', default='app/generator/messages.csv', show_default=True,
+              type=click.Path(exists=True, dir_okay=False), help="Messages CSV.")
+@click.option('--follows', 'follows_csv', default='app/generator/follows.csv', show_default=True,
+              type=click.Path(exists=True, dir_okay=False), help="Follows CSV.")
+@click.option('--likes', 'likes_csv', default=None, type=click.Path(exists=True, dir_okay=False),
+              help="Likes CSV (optional).")
+@click.option('--chunk-size', default=10000, show_default=True, help="Rows loaded per transaction.")
+@click.option('--fresh', is_flag=True, help="Drop and recreate every table instead of resuming.")
+@with_appcontext
+def seed_command(users_csv: str, messages_csv: str, follows_csv: str, likes_csv: str | None,
+                 chunk_size: int, fresh: bool) -> None:
+    """Stream the sample CSVs into the database, resuming an interrupted load."""
+    from app.seed import seed_files, load_seed
+
+    def progress(table: str, loaded: int, rate: float) -> None:
+        click.echo(f"{table}: {loaded} rows ({rate:,.0f} rows/s)")
+
+    try:
+        loaded = load_seed(seed_files(users_csv, messages_csv, follows_csv, likes_csv),
+                           chunk_size=chunk_size, fresh=fresh, progress=progress)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    click.echo("Seed loaded: " + ", ".join(f"{count} {table}" for table, count in loaded.items()) + ".")
+
+
+@click.command('rehash-passwords')
+@click.option('--batch-size', default=1000, show_default=True, help="Users hashed per transaction.")
+@click.option('--processes', type=int, default=None, help="Password hashing processes (default: one per CPU).")
+@click.option('--cost', type=int, default=None, help="bcrypt cost (default: BCRYPT_LOG_ROUNDS).")
+@click.option('--restart', is_flag=True, help="Scan from the first user instead of resuming.")
+@with_appcontext
+def rehash_passwords_command(batch_size: int, processes: int | None, cost: int | None, restart: bool) -> None:
+    """Hash plaintext passwords in batches, resuming an interrupted run."""
+    from app.rehash import rehash_passwords
+
+    def progress(report, rate: float) -> None:
+        click.echo(f"{report.scanned} users scanned, {report.hashed} hashed ({rate:,.0f} users/s)")
+
+    result = rehash_passwords(batch_size=batch_size, processes=processes, rounds=cost, restart=restart,
+                              progress=progress)
+    if result.resumed_after:
+        click.echo(f"Resumed after user {result.resumed_after}; pass --restart to scan every user.")
+    click.echo(f"Passwords rehashed: {result.hashed} of {result.scanned} users; "
+               f"{result.stale} at another cost will be rehashed at their next login.")
+
+
+def register_commands(app) -> None:
+    """Register the Warbler maintenance commands on the Flask CLI."""
+    app.cli.add_command(rebuild_timelines_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(reindex_search_command)
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(rehash_passwords_command)
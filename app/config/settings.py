@@ -1,7 +1,6 @@
 """config / settings.py."""
 
 import os
-import logging
 from dotenv import load_dotenv, find_dotenv
 from sqlalchemy.pool import NullPool
 
@@ -22,9 +21,128 @@ class Config:
         Secret key for securing sessions and cookies.
     SQLALCHEMY_TRACK_MODIFICATIONS : bool
         Whether to track modifications of objects and emit signals.
+    TIMELINE_BACKFILL_LIMIT : int or None
+        Maximum number of a followed user's messages copied into the
+        follower's timeline on follow. None copies the full history.
+    FEED_PAGE_SIZE : int
+        Number of messages per keyset page on the home feed and profiles.
+    TIMELINE_FANOUT : bool
+        Materialize timelines on write. When False, feeds are read by
+        joining messages against follows at request time.
+    TIMELINE_FANOUT_FOLLOWER_LIMIT : int or None
+        Accounts with more followers are not fanned out on write; their
+        messages are merged into followers' feeds at read time.
+    CACHE_BACKEND : str
+        Page cache backend: 'local' (in-process LRU) or 'null' (disabled).
+    CACHE_MAX_ENTRIES : int
+        Entries kept by the local cache before LRU eviction.
+    CACHE_DEFAULT_TTL : int
+        Seconds a cached page lives; bounds staleness across workers.
+    INTERNAL_ALLOWED_IPS : list
+        Client addresses allowed to reach the /internal endpoints.
+    QUERY_BUDGET_RAISE : bool
+        Raise when a view exceeds its `@query_budget` instead of logging a warning.
+    FOLLOW_GRAPH_MAX_AGE : int or None
+        Seconds before the in-memory follow graph is rebuilt in the background,
+        picking up follows made by other workers. None never rebuilds.
+    FOLLOW_GRAPH_COMPACT_THRESHOLD : int
+        Follows/unfollows buffered in the graph's overlay before an early background rebuild.
+    AUTOCOMPLETE_MAX_AGE : int or None
+        Seconds before the in-memory username index is rebuilt in the background,
+        picking up users added, renamed or deleted by other workers. None never rebuilds.
+    AUTOCOMPLETE_COMPACT_THRESHOLD : int
+        Username changes buffered in the index's overlay before an early background rebuild.
+    BCRYPT_LOG_ROUNDS : int
+        bcrypt work factor (log2 iterations) for new hashes. Stored hashes made
+        at another cost are re-hashed on the user's next successful login.
+    PASSWORD_HASH_WORKERS : int or None
+        Threads hashing passwords concurrently in each worker process. None
+        splits half the CPU cores between the `WEB_CONCURRENCY` gunicorn
+        workers; see app/passwords.py.
+    PASSWORD_HASH_MAX_PENDING : int or None
+        Hashes admitted at once before logins, sign-ups and password
+        confirmations are shed with a 503. None allows four per hashing thread.
+    AUTH_PRINCIPAL_TTL : int
+        Seconds the logged-in user's id, username and image URL are cached in
+        the session before `load_user` reads them again.
+    LOGIN_THROTTLE_BACKEND : str
+        Where login token buckets live: 'local' (in-process LRU) or 'null' (off).
+    LOGIN_THROTTLE_MAX_ENTRIES : int
+        Buckets the 'local' backend keeps before evicting the least recently used.
+    LOGIN_THROTTLE_IP_BURST, LOGIN_THROTTLE_IP_PER_MINUTE : int
+        Login attempts a client IP may make at once, and its refill rate.
+    LOGIN_THROTTLE_USERNAME_BURST, LOGIN_THROTTLE_USERNAME_PER_MINUTE : int
+        Failed logins allowed against one username at once, from any number of
+        addresses, and their refill rate.
+    PROXY_FIX_X_FOR : int
+        Trusted proxies (load balancer, nginx) in front of the app. When
+        set, the client address is taken from `X-Forwarded-For`, so login
+        throttling sees clients rather than the proxy. Leave at 0 when the
+        app is reached directly, or clients could forge their address.
+    DB_POOL_SIZE : int
+        Connections each worker process keeps open.
+    DB_MAX_OVERFLOW : int
+        Extra connections a worker may open under load, closed when returned.
+    DB_POOL_TIMEOUT : float
+        Seconds a request waits for a free connection before failing.
+    DB_POOL_RECYCLE : int
+        Seconds after which a pooled connection is replaced, ahead of server
+        or load balancer idle timeouts.
+    DB_POOL_PRE_PING : bool
+        Test each connection on checkout and replace it if the server dropped it.
+    DB_CONNECT_TIMEOUT : int
+        Seconds to wait when opening a Postgres connection.
+    DB_STATEMENT_TIMEOUT : int or None
+        Postgres statement timeout in milliseconds. Ignored with DB_PGBOUNCER;
+        set it on the database role instead.
+    DB_PGBOUNCER : bool
+        Connect through PgBouncer in transaction pooling mode: no app-side
+        pool (PgBouncer pools) and no startup options. See app/pool.py.
+    SQLALCHEMY_REPLICA_URIS : list
+        Read replicas of the primary database, from the comma-separated
+        DATABASE_REPLICA_URLS. Read-only views query one at random; see
+        app/replicas.py.
+    REPLICA_READ_YOUR_WRITES : float
+        Seconds a user's requests stay on the primary after they write, so
+        they see their own posts, likes and follows despite replication lag.
     """
     SECRET_KEY = os.environ.get('SECRET_KEY', 'default_secret_key')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TIMELINE_BACKFILL_LIMIT = None
+    FEED_PAGE_SIZE = 50
+    TIMELINE_FANOUT = True
+    TIMELINE_FANOUT_FOLLOWER_LIMIT = int(os.environ.get('TIMELINE_FANOUT_FOLLOWER_LIMIT', 10000))
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 30))
+    INTERNAL_ALLOWED_IPS = os.environ.get('INTERNAL_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    QUERY_BUDGET_RAISE = False
+    FOLLOW_GRAPH_MAX_AGE = int(os.environ.get('FOLLOW_GRAPH_MAX_AGE', 300))
+    FOLLOW_GRAPH_COMPACT_THRESHOLD = 10000
+    AUTOCOMPLETE_MAX_AGE = int(os.environ.get('AUTOCOMPLETE_MAX_AGE', 300))
+    AUTOCOMPLETE_COMPACT_THRESHOLD = 1000
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = None
+    PASSWORD_HASH_MAX_PENDING = None
+    AUTH_PRINCIPAL_TTL = int(os.environ.get('AUTH_PRINCIPAL_TTL', 300))
+    LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'local')
+    LOGIN_THROTTLE_MAX_ENTRIES = int(os.environ.get('LOGIN_THROTTLE_MAX_ENTRIES', 100000))
+    LOGIN_THROTTLE_IP_BURST = 20
+    LOGIN_THROTTLE_IP_PER_MINUTE = 10
+    LOGIN_THROTTLE_USERNAME_BURST = 5
+    LOGIN_THROTTLE_USERNAME_PER_MINUTE = 5
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    DEBUG_TB_ENABLED = False
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+    DB_STATEMENT_TIMEOUT = int(os.environ['DB_STATEMENT_TIMEOUT']) if os.environ.get('DB_STATEMENT_TIMEOUT') else None
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
+    SQLALCHEMY_REPLICA_URIS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    REPLICA_READ_YOUR_WRITES = float(os.environ.get('REPLICA_READ_YOUR_WRITES', 5))
 
     @staticmethod
     def init_app(app):
@@ -39,6 +157,8 @@ class DevelopmentConfig(Config):
     ----------
     DEBUG : bool
         Enable debug mode for Flask.
+    DEBUG_TB_ENABLED : bool
+        Load the Flask Debug Toolbar (never loaded in other environments).
     DEBUG_TB_INTERCEPT_REDIRECTS : bool
         Enable redirect interception for the Flask Debug Toolbar.
     FLASK_ENV : str
@@ -51,8 +171,7 @@ class DevelopmentConfig(Config):
     LOG_LEVEL = "DEBUG"
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DEV_DATABASE_URL') 
-    if not SQLALCHEMY_DATABASE_URI:
-        raise RuntimeError("DEV_DATABASE_URL is not set in the environment or .env file.")
+    DEBUG_TB_ENABLED = True
     DEBUG_TB_INTERCEPT_REDIRECTS = True
     FLASK_ENV = 'development'
     USE_RELOADER = True
@@ -61,6 +180,11 @@ class DevelopmentConfig(Config):
     WTF_CSRF_SECRET_KEY = 'your-secret-key'
     WTF_CSRF_ENABLED = True  # Ensure CSRF protection is enabled
 
+    @staticmethod
+    def init_app(app):
+        # Checked when an app is built, not at import, so other configs load without it
+        if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+            raise RuntimeError("DEV_DATABASE_URL is not set in the environment or .env file.")
 
 
 class ProductionConfig(Config):
@@ -83,6 +207,11 @@ class ProductionConfig(Config):
     WTF_CSRF_SECRET_KEY = 'your-secret-key'
     WTF_CSRF_ENABLED = True
 
+    @staticmethod
+    def init_app(app):
+        if not app.config.get('SQLALCHEMY_DATABASE_URI'):
+            raise RuntimeError("DATABASE_URL is not set in the environment or .env file.")
+
 
 class TestingConfig(Config):
     """
@@ -98,6 +227,12 @@ class TestingConfig(Config):
         Hosts to avoid showing the debug toolbar.
     SQLALCHEMY_ECHO : bool
         Log SQL statements (set to True if debugging tests).
+    QUERY_BUDGET_RAISE : bool
+        Fail the request (and so the test) when a view exceeds its query budget.
+    BCRYPT_LOG_ROUNDS : int
+        bcrypt's minimum cost, so fixtures don't spend seconds hashing.
+    SQLALCHEMY_REPLICA_URIS : list
+        No replicas, whatever the environment says; replica tests add their own.
     """
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') 
@@ -107,6 +242,9 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False  # Disable CSRF protection for tests
     SECRET_KEY = "test-secret-key"
     SQLALCHEMY_ENGINE_OPTIONS = {'poolclass': NullPool}
+    QUERY_BUDGET_RAISE = True
+    BCRYPT_LOG_ROUNDS = 4
+    SQLALCHEMY_REPLICA_URIS = []
 
     
 # Configurations dictionary    
@@ -115,37 +253,3 @@ config = {
     'testing': TestingConfig,
     'production': ProductionConfig,
     }
-
-
-# Initialize a logger for configuration debugging
-def initialize_logger():
-    """
-    Initialize and configure the logger for debugging configuration settings.
-
-    Returns
-    -------
-    logging.Logger
-        Configured logger instance.
-    """
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
-
-    # Create a console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
-
-    # Define and set a formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(formatter)
-
-    # Add the handler to the logger
-    logger.addHandler(console_handler)
-
-    return logger
-
-
-# Initialize the logger
-logger = initialize_logger()
-logger.debug("Configuration module loaded successfully.")
@@ -0,0 +1,137 @@
+"""app/counters.py
+
+Denormalized counters for users and messages.
+
+`users.messages_count`, `followers_count`, `following_count`, `likes_count`
+and `messages.likes_count` are maintained by database triggers on
+`messages`, `follows` and `likes`. Every write path (ORM relationships,
+cascades, bulk loads, raw SQL) keeps them consistent, and templates read
+a column instead of loading a relationship to take its `length`.
+
+The triggers are installed by `db.create_all()` (see `install_triggers`) and by
+the matching migration. `reconcile_counters` recomputes every counter from
+scratch in batches (see the `flask reconcile-counters` command).
+"""
+
+from sqlalchemy import DDL, event, select, func, update
+from app.models import db, User, Message, follows, likes
+
+
+# (table, trigger name, statements run AFTER INSERT, statements run AFTER DELETE)
+COUNTER_TRIGGERS = [
+    ('messages', 'messages_counters',
+     ["UPDATE users SET messages_count = messages_count + 1 WHERE id = NEW.user_id"],
+     ["UPDATE users SET messages_count = messages_count - 1 WHERE id = OLD.user_id"]),
+    ('follows', 'follows_counters',
+     ["UPDATE users SET followers_count = followers_count + 1 WHERE id = NEW.user_being_followed_id",
+      "UPDATE users SET following_count = following_count + 1 WHERE id = NEW.user_following_id"],
+     ["UPDATE users SET followers_count = followers_count - 1 WHERE id = OLD.user_being_followed_id",
+      "UPDATE users SET following_count = following_count - 1 WHERE id = OLD.user_following_id"]),
+    ('likes', 'likes_counters',
+     ["UPDATE users SET likes_count = likes_count + 1 WHERE id = NEW.user_id",
+      "UPDATE messages SET likes_count = likes_count + 1 WHERE id = NEW.message_id"],
+     ["UPDATE users SET likes_count = likes_count - 1 WHERE id = OLD.user_id",
+      "UPDATE messages SET likes_count = likes_count - 1 WHERE id = OLD.message_id"]),
+]
+
+
+def sqlite_trigger_ddl() -> list[str]:
+    """Return the CREATE TRIGGER statements for SQLite."""
+    statements = []
+    for table, name, on_insert, on_delete in COUNTER_TRIGGERS:
+        for event_name, body in (('INSERT', on_insert), ('DELETE', on_delete)):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {name}_{event_name.lower()} "
+                f"AFTER {event_name} ON {table} FOR EACH ROW BEGIN "
+                + " ".join(f"{stmt};" for stmt in body)
+                + " END"
+            )
+    return statements
+
+
+def postgresql_trigger_ddl() -> list[str]:
+    """Return the trigger function and CREATE TRIGGER statements for Postgres."""
+    statements = []
+    for table, name, on_insert, on_delete in COUNTER_TRIGGERS:
+        statements.append(
+            f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$ BEGIN "
+            f"IF TG_OP = 'INSERT' THEN " + " ".join(f"{stmt};" for stmt in on_insert)
+            + " ELSE " + " ".join(f"{stmt};" for stmt in on_delete)
+            + " END IF; RETURN NULL; END $$ LANGUAGE plpgsql"
+        )
+        statements.append(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+        statements.append(
+            f"CREATE TRIGGER {name} AFTER INSERT OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {name}()"
+        )
+    return statements
+
+
+def drop_trigger_ddl(dialect: str) -> list[str]:
+    """Return the statements that remove the counter triggers, e.g. before a bulk load."""
+    if dialect == 'postgresql':
+        return [f"DROP TRIGGER IF EXISTS {name} ON {table}" for table, name, _, _ in COUNTER_TRIGGERS]
+    return [f"DROP TRIGGER IF EXISTS {name}_{suffix}"
+            for _, name, _, _ in COUNTER_TRIGGERS for suffix in ('insert', 'delete')]
+
+
+def install_triggers(metadata) -> None:
+    """Create the counter triggers whenever `metadata.create_all()` runs."""
+    for statement in sqlite_trigger_ddl():
+        event.listen(metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    for statement in postgresql_trigger_ddl():
+        event.listen(metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+install_triggers(db.metadata)
+
+
+def _id_batches(column, batch_size: int):
+    """Yield `(lo, hi)` id ranges of at most `batch_size` rows, walking the primary key."""
+    last = None
+    while True:
+        query = select(column).order_by(column).limit(batch_size)
+        if last is not None:
+            query = query.where(column > last)
+        ids = db.session.scalars(query).all()
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last = ids[-1]
+
+
+def reconcile_counters(batch_size: int = 1000) -> tuple[int, int]:
+    """Recompute every counter from the underlying rows.
+
+    Users and messages are processed in primary-key batches with a commit
+    per batch, so the job can run against a live database.
+
+    Returns:
+        tuple[int, int]: Number of user rows and message rows updated.
+    """
+    user_rows = message_rows = 0
+
+    for lo, hi in _id_batches(User.id, batch_size):
+        result = db.session.execute(
+            update(User)
+            .where(User.id.between(lo, hi))
+            .values(
+                messages_count=select(func.count()).where(Message.user_id == User.id).scalar_subquery(),
+                followers_count=select(func.count()).where(follows.c.user_being_followed_id == User.id).scalar_subquery(),
+                following_count=select(func.count()).where(follows.c.user_following_id == User.id).scalar_subquery(),
+                likes_count=select(func.count()).where(likes.c.user_id == User.id).scalar_subquery(),
+            )
+        )
+        db.session.commit()
+        user_rows += result.rowcount
+
+    for lo, hi in _id_batches(Message.id, batch_size):
+        result = db.session.execute(
+            update(Message)
+            .where(Message.id.between(lo, hi))
+            .values(likes_count=select(func.count()).where(likes.c.message_id == Message.id).scalar_subquery())
+        )
+        db.session.commit()
+        message_rows += result.rowcount
+
+    return user_rows, message_rows
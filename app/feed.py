@@ -0,0 +1,51 @@
+"""app/feed.py
+
+Per-page annotations for rendered message lists.
+
+Templates used to call `msg.liked_by.all()` and `msg in user.likes` for every
+message, costing one query plus a list scan per row. `annotate_messages`
+fetches the same information for a whole page in one query, reading the
+maintained `Message.likes_count` counter, and hands the template plain dicts
+and sets.
+"""
+
+from typing import NamedTuple, Iterable
+from sqlalchemy import select, exists
+from app.models import db, Message, likes
+
+
+class FeedAnnotations(NamedTuple):
+    """Like information for one page of messages."""
+    like_counts: dict[int, int]
+    liked_ids: set[int]
+
+
+def annotate_messages(messages: Iterable[Message], viewer_id: int | None = None) -> FeedAnnotations:
+    """Fetch like counts and the viewer's likes for a page of messages.
+
+    Args:
+        messages: The messages being rendered.
+        viewer_id (int | None): The logged-in user, or None for anonymous viewers.
+
+    Returns:
+        FeedAnnotations: `like_counts` maps message id to its number of likes
+        (messages without likes are absent); `liked_ids` holds the ids the
+        viewer has liked.
+    """
+    message_ids = [msg.id for msg in messages]
+    if not message_ids:
+        return FeedAnnotations({}, set())
+
+    liked_by_viewer = exists().where(likes.c.message_id == Message.id, likes.c.user_id == viewer_id)
+    rows = db.session.execute(
+        select(Message.id, Message.likes_count, liked_by_viewer)
+        .where(Message.id.in_(message_ids))
+    )
+
+    like_counts, liked_ids = {}, set()
+    for message_id, count, viewer_liked in rows:
+        if count:
+            like_counts[message_id] = count
+        if viewer_liked:
+            liked_ids.add(message_id)
+    return FeedAnnotations(like_counts, liked_ids)
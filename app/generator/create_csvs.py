@@ -3,75 +3,280 @@
 Students won't need to run this for the exercise; they will just use the CSV
 files that this generates. You should only need to run this if you wanted to
 tweak the CSV formats or generate fewer/more rows.
+
+Generation is offline and deterministic: the same flags (including
+--chunk-size) always produce the same files. Faker is only used, seeded, to
+build small vocabularies up front. Every row is then assembled from
+vectorized NumPy draws and written a chunk at a time, so tens of millions of
+rows take minutes and memory stays flat. The exceptions are a few arrays of
+8 bytes per user, message, follow or like.
+
+Follows and likes follow power laws. Followed users are drawn from a Zipf
+distribution over a "popularity" ranking, while followers, authors and
+likers are drawn from one over an "activity" ranking. A few accounts
+therefore hold most followers and most users post rarely. Duplicate pairs
+and self-follows are rejected.
+
+Usage (from the project root):
+    python app/generator/create_csvs.py --users 1000000 --messages 10000000 \\
+        --follows 20000000 --likes 10000000 --out /tmp/warbler-data
+
+Users and messages carry explicit ids (1..N in file order), which the
+follows, messages and likes files refer to. Load the result with `flask
+seed --users ... --likes ...`.
 """
 
+import argparse
 import csv
-from random import choice, randint, sample
-from itertools import permutations
-import requests
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
 from faker import Faker
-from helpers import get_random_datetime
 
 MAX_WARBLER_LENGTH = 140
 
-USERS_CSV_HEADERS = ['email', 'username', 'image_url', 'password', 'bio', 'header_image_url', 'location']
-MESSAGES_CSV_HEADERS = ['text', 'timestamp', 'user_id']
+USERS_CSV_HEADERS = ['id', 'email', 'username', 'image_url', 'password', 'bio', 'header_image_url', 'location']
+MESSAGES_CSV_HEADERS = ['id', 'text', 'timestamp', 'user_id']
 FOLLOWS_CSV_HEADERS = ['user_being_followed_id', 'user_following_id']
+LIKES_CSV_HEADERS = ['user_id', 'message_id', 'created_at']
 
 NUM_USERS = 300
 NUM_MESSAGES = 1000
 NUM_FOLLWERS = 5000
+NUM_LIKES = 2000
 
-fake = Faker()
-
-# Generate random profile image URLs to use for users
+# Every sample user shares this hash of "password"
+PASSWORD_HASH = '$2b$12$Q1PUFjhN/AWRQ21LbGYvjeLpZZB6lfZ1BPwifHALGO6oIbyC3CmJe'
 
-image_urls = [
+IMAGE_URLS = [
     f"https://randomuser.me/api/portraits/{kind}/{i}.jpg"
     for kind, count in [("lego", 10), ("men", 100), ("women", 100)]
     for i in range(count)
 ]
+HEADER_IMAGE_URLS = [
+    "/static/images/warbler-hero.jpg",
+    "/static/images/signed-out-home.jpg",
+    "/static/images/nav-bg.png",
+]
 
-# Generate random header image URLs to use for users
 
-header_image_urls = [
-    requests.get(f"http://www.splashbase.co/api/v1/images/{i}").json()['url']
-    for i in range(1, 46)
-]
+class Vocabulary:
+    """Seeded Faker word pools that rows are assembled from."""
+
+    def __init__(self, seed: int):
+        fake = Faker()
+        fake.seed_instance(seed)
+        self.words = sorted(set(fake.words(nb=5000)))
+        self.first_names = sorted({fake.first_name().lower() for _ in range(2000)})
+        self.last_names = sorted({fake.last_name().lower() for _ in range(2000)})
+        self.domains = sorted({fake.free_email_domain() for _ in range(50)})
+        self.cities = sorted({fake.city() for _ in range(1000)})
+
+    def sentences(self, rng: np.random.Generator, count: int, low: int, high: int) -> list[str]:
+        """Return `count` sentences of `low` to `high` words, cut to MAX_WARBLER_LENGTH."""
+        lengths = rng.integers(low, high + 1, count)
+        words = rng.integers(len(self.words), size=int(lengths.sum())).tolist()
+        ends = np.cumsum(lengths).tolist()
+        sentences, start = [], 0
+        for end in ends:
+            text = ' '.join([self.words[i] for i in words[start:end]])
+            sentences.append((text[:1].upper() + text[1:])[:MAX_WARBLER_LENGTH - 1] + '.')
+            start = end
+        return sentences
+
+
+def zipf_cdf(n: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Return the cumulative distribution of a Zipf law over ids 1..n in a random order."""
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -exponent
+    cdf = np.cumsum(weights[rng.permutation(n)])
+    return cdf / cdf[-1]
+
+
+def draw(cdf: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw `size` 1-based ids from a distribution returned by `zipf_cdf`."""
+    return np.minimum(np.searchsorted(cdf, rng.random(size), side='right'), len(cdf) - 1) + 1
+
+
+def chunk_sizes(total: int, chunk_size: int):
+    """Yield the sizes of consecutive chunks covering `total` rows."""
+    for start in range(0, total, chunk_size):
+        yield min(chunk_size, total - start)
+
+
+def sorted_unique(keys: np.ndarray) -> np.ndarray:
+    """`np.unique` for int64 keys via one sort, which beats its hashing path here."""
+    keys = np.sort(keys)
+    return keys[np.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+
+
+def unique_pairs(count: int, draw_left, draw_right, width: int, rng: np.random.Generator, chunk_size: int,
+                 distinct: bool = False):
+    """Yield `(left, right)` id arrays, a chunk at a time, until `count` distinct pairs are out.
+
+    Pairs are packed into one int64 key (`left * width + right`). Keys are
+    drawn in rounds, `chunk_size` at a time, and each round is deduplicated
+    against the keys kept so far with one sort and one `np.isin` pass. A
+    round is sized from the share of fresh keys the previous one found, so a
+    handful of sorts cover the whole file. The kept keys are then shuffled
+    and written a chunk at a time. With `distinct`, pairs with
+    `left == right` are rejected too.
+    """
+    def draw_keys(size: int) -> np.ndarray:
+        parts = []
+        for n in chunk_sizes(size, chunk_size):
+            left, right = draw_left(n), draw_right(n)
+            keys = left.astype(np.int64) * width + right
+            parts.append(keys[left != right] if distinct else keys)
+        return sorted_unique(np.concatenate(parts))
+
+    kept = np.empty(0, dtype=np.int64)
+    fresh_share = 1.0
+    while len(kept) < count:
+        needed = count - len(kept)
+        size = max(chunk_size, min(int(needed / fresh_share * 1.1), 16 * needed))
+        keys = draw_keys(size)
+        keys = keys[~np.isin(keys, kept, assume_unique=True)]
+        fresh_share = max(len(keys) / size, 1 / 16)
+        if len(keys) > needed:
+            keys = keys[rng.choice(len(keys), needed, replace=False)]
+        kept = np.concatenate([kept, keys])
+
+    kept = rng.permutation(kept)
+    for start in range(0, count, chunk_size):
+        keys = kept[start:start + chunk_size]
+        yield keys // width, keys % width
+
+
+def timestamps_as_text(microseconds: np.ndarray) -> list[str]:
+    """Format epoch microseconds the way the original CSVs did."""
+    text = np.datetime_as_string(microseconds.astype('datetime64[us]'), unit='us')
+    return np.char.replace(text, 'T', ' ').tolist()
+
+
+def write_users(path: str, count: int, vocab: Vocabulary, rng: np.random.Generator, chunk_size: int) -> None:
+    with open(path, 'w', newline='') as users_csv:
+        writer = csv.writer(users_csv)
+        writer.writerow(USERS_CSV_HEADERS)
+        first_id = 1
+        for size in chunk_sizes(count, chunk_size):
+            ids = range(first_id, first_id + size)
+            first = rng.integers(len(vocab.first_names), size=size).tolist()
+            last = rng.integers(len(vocab.last_names), size=size).tolist()
+            usernames = [f"{vocab.first_names[f]}{vocab.last_names[l]}{i}" for f, l, i in zip(first, last, ids)]
+            domains = rng.integers(len(vocab.domains), size=size).tolist()
+            writer.writerows(zip(
+                ids,
+                [f"{username}@{vocab.domains[d]}" for username, d in zip(usernames, domains)],
+                usernames,
+                [IMAGE_URLS[i] for i in rng.integers(len(IMAGE_URLS), size=size).tolist()],
+                [PASSWORD_HASH] * size,
+                vocab.sentences(rng, size, 4, 12),
+                [HEADER_IMAGE_URLS[i] for i in rng.integers(len(HEADER_IMAGE_URLS), size=size).tolist()],
+                [vocab.cities[i] for i in rng.integers(len(vocab.cities), size=size).tolist()],
+            ))
+            first_id += size
+
+
+def epoch_us(moment: datetime) -> int:
+    """Microseconds since the epoch for a naive UTC datetime, independent of the local timezone."""
+    return (moment - datetime(1970, 1, 1)) // timedelta(microseconds=1)
+
+
+def message_timestamps(count: int, start: datetime, end: datetime, rng: np.random.Generator) -> np.ndarray:
+    """Return sorted epoch microseconds, so message ids ascend with time as they do in production."""
+    lo, hi = epoch_us(start), epoch_us(end)
+    return np.sort(rng.integers(lo, hi, count, dtype=np.int64))
+
+
+def write_messages(path: str, timestamps: np.ndarray, activity: np.ndarray, vocab: Vocabulary,
+                   rng: np.random.Generator, chunk_size: int) -> None:
+    with open(path, 'w', newline='') as messages_csv:
+        writer = csv.writer(messages_csv)
+        writer.writerow(MESSAGES_CSV_HEADERS)
+        start = 0
+        for size in chunk_sizes(len(timestamps), chunk_size):
+            writer.writerows(zip(
+                range(start + 1, start + size + 1),
+                vocab.sentences(rng, size, 4, 24),
+                timestamps_as_text(timestamps[start:start + size]),
+                draw(activity, size, rng).tolist(),
+            ))
+            start += size
+
+
+def write_follows(path: str, count: int, popularity: np.ndarray, activity: np.ndarray,
+                  rng: np.random.Generator, chunk_size: int) -> None:
+    with open(path, 'w', newline='') as follows_csv:
+        writer = csv.writer(follows_csv)
+        writer.writerow(FOLLOWS_CSV_HEADERS)
+        pairs = unique_pairs(count, lambda size: draw(popularity, size, rng), lambda size: draw(activity, size, rng),
+                             len(activity) + 1, rng, chunk_size, distinct=True)
+        for followed, follower in pairs:
+            writer.writerows(zip(followed.tolist(), follower.tolist()))
+
+
+def write_likes(path: str, count: int, activity: np.ndarray, timestamps: np.ndarray, end: datetime,
+                rng: np.random.Generator, chunk_size: int) -> None:
+    message_popularity = zipf_cdf(len(timestamps), 1.0, rng)
+    latest = epoch_us(end)
+    with open(path, 'w', newline='') as likes_csv:
+        writer = csv.writer(likes_csv)
+        writer.writerow(LIKES_CSV_HEADERS)
+        pairs = unique_pairs(count, lambda size: draw(activity, size, rng),
+                             lambda size: draw(message_popularity, size, rng),
+                             len(timestamps) + 1, rng, chunk_size)
+        for user_ids, message_ids in pairs:
+            # Most likes land within a day or two of the message
+            delay = rng.exponential(2 * 86400e6, len(message_ids)).astype(np.int64)
+            liked_at = np.minimum(timestamps[message_ids - 1] + delay, latest)
+            writer.writerows(zip(user_ids.tolist(), message_ids.tolist(), timestamps_as_text(liked_at)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=NUM_USERS)
+    parser.add_argument('--messages', type=int, default=NUM_MESSAGES)
+    parser.add_argument('--follows', type=int, default=NUM_FOLLWERS)
+    parser.add_argument('--likes', type=int, default=NUM_LIKES)
+    parser.add_argument('--skew', type=float, default=1.0, help="Zipf exponent; higher concentrates activity.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows generated and written at a time.")
+    parser.add_argument('--start', type=datetime.fromisoformat, default=datetime(2023, 1, 1),
+                        help="Earliest message timestamp.")
+    parser.add_argument('--end', type=datetime.fromisoformat, default=datetime(2025, 1, 1),
+                        help="Latest message or like timestamp.")
+    parser.add_argument('--out', default=os.path.dirname(os.path.abspath(__file__)), help="Output directory.")
+    args = parser.parse_args(argv)
+
+    if args.users < 2:
+        parser.error("--users must be at least 2")
+    # Past half of all possible pairs, rejecting duplicates gets slow
+    if args.follows > args.users * (args.users - 1) // 2:
+        parser.error("--follows must be at most half of users * (users - 1)")
+    if args.likes and (not args.messages or args.likes > args.users * args.messages // 2):
+        parser.error("--likes must be at most half of users * messages")
+
+    rng = np.random.default_rng(args.seed)
+    vocab = Vocabulary(args.seed)
+    popularity = zipf_cdf(args.users, args.skew, rng)
+    activity = zipf_cdf(args.users, args.skew, rng)
+    timestamps = message_timestamps(args.messages, args.start, args.end, rng)
+
+    os.makedirs(args.out, exist_ok=True)
+    steps = [
+        ('users', lambda path: write_users(path, args.users, vocab, rng, args.chunk_size)),
+        ('messages', lambda path: write_messages(path, timestamps, activity, vocab, rng, args.chunk_size)),
+        ('follows', lambda path: write_follows(path, args.follows, popularity, activity, rng, args.chunk_size)),
+        ('likes', lambda path: write_likes(path, args.likes, activity, timestamps, args.end, rng, args.chunk_size)),
+    ]
+    for name, write in steps:
+        started = time.perf_counter()
+        path = os.path.join(args.out, f"{name}.csv")
+        write(path)
+        print(f"{path}: {getattr(args, name)} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
 
-with open('generator/users.csv', 'w') as users_csv:
-    users_writer = csv.DictWriter(users_csv, fieldnames=USERS_CSV_HEADERS)
-    users_writer.writeheader()
-
-    for i in range(NUM_USERS):
-        users_writer.writerow(dict(
-            email=fake.email(),
-            username=fake.user_name(),
-            image_url=choice(image_urls),
-            password='$2b$12$Q1PUFjhN/AWRQ21LbGYvjeLpZZB6lfZ1BPwifHALGO6oIbyC3CmJe',
-            bio=fake.sentence(),
-            header_image_url=choice(header_image_urls),
-            location=fake.city()
-        ))
-
-with open('generator/messages.csv', 'w') as messages_csv:
-    messages_writer = csv.DictWriter(messages_csv, fieldnames=MESSAGES_CSV_HEADERS)
-    messages_writer.writeheader()
-
-    for i in range(NUM_MESSAGES):
-        messages_writer.writerow(dict(
-            text=fake.paragraph()[:MAX_WARBLER_LENGTH],
-            timestamp=get_random_datetime(),
-            user_id=randint(1, NUM_USERS)
-        ))
-
-# Generate follows.csv from random pairings of users
-
-with open('generator/follows.csv', 'w') as follows_csv:
-    all_pairs = list(permutations(range(1, NUM_USERS + 1), 2))
-
-    users_writer = csv.DictWriter(follows_csv, fieldnames=FOLLOWS_CSV_HEADERS)
-    users_writer.writeheader()
-
-    for followed_user, follower in sample(all_pairs, NUM_FOLLWERS):
-        users_writer.writerow(dict(user_being_followed_id=followed_user, user_following_id=follower))
+if __name__ == '__main__':
+    main()
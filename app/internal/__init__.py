@@ -0,0 +1 @@
+"""app/internal/__init__.py"""
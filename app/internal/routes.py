@@ -0,0 +1,35 @@
+"""app/internal/routes.py"""
+
+from flask import Blueprint, jsonify, request, current_app, abort
+from app.cache import timeline_cache
+from app.throttle import login_throttle
+from app.pool import pool_stats
+
+
+# Operational endpoints for monitoring; not linked from the UI
+internal_bp = Blueprint('internal', __name__)
+
+
+@internal_bp.before_request
+def restrict_to_internal_hosts():
+    """Hide internal endpoints from anything but the allowed addresses."""
+    if request.remote_addr not in current_app.config.get('INTERNAL_ALLOWED_IPS', ()):
+        abort(404)
+
+
+@internal_bp.route('/cache-stats')
+def cache_stats():
+    """Return timeline cache hit, miss and eviction counters."""
+    return jsonify(timeline_cache.stats())
+
+
+@internal_bp.route('/throttle-stats')
+def throttle_stats():
+    """Return login throttle counters."""
+    return jsonify(login_throttle.stats())
+
+
+@internal_bp.route('/pool-stats')
+def database_pool_stats():
+    """Return live connection pool state and checkout wait counters per database."""
+    return jsonify(pool_stats())
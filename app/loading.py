@@ -0,0 +1,45 @@
+"""app/loading.py
+
+Named eager-loading profiles.
+
+Relationships on `User` default to lazy loading, and `User.likes` raises if
+it is ever lazy-loaded. Each route states what it renders by applying one of
+these profiles to its query with `.options(*PROFILE)`. Over-fetching then
+shows up in review and an accidental N+1 fails in tests, instead of every
+`User` load pulling the user's liked messages along.
+"""
+
+from sqlalchemy.orm import selectinload, load_only, raiseload, configure_mappers
+from app.models import User, Message
+
+# Backrefs such as `Message.user` only exist once the mappers are configured
+configure_mappers()
+
+# Columns a message list shows for each author
+AUTHOR_COLUMNS = (User.id, User.username, User.image_url)
+
+# Columns a user card or profile header shows
+CARD_COLUMNS = (
+    User.id, User.username, User.image_url, User.header_image_url, User.bio, User.location,
+    User.messages_count, User.followers_count, User.following_count, User.likes_count,
+)
+
+# Message lists (feeds, profiles, likes): authors in one extra query, nothing else
+FEED = (
+    selectinload(Message.user).options(load_only(*AUTHOR_COLUMNS), raiseload(User.likes)),
+)
+
+# User cards and profile headers: display columns and counters only
+PROFILE_CARD = (
+    load_only(*CARD_COLUMNS),
+    raiseload(User.likes),
+    raiseload(User.messages),
+)
+
+# The logged-in user loaded by Flask-Login on every request. Pages render the
+# viewer's own card, so it carries the card columns; the password hash is
+# only loaded when a password is actually checked.
+AUTH_PRINCIPAL = (
+    load_only(*CARD_COLUMNS, User.email, User.fanout_on_read),
+    raiseload(User.likes),
+)
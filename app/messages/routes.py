@@ -1,18 +1,17 @@
 """app/messages/routes.py"""
 
-from flask import Blueprint, render_template, redirect, flash, url_for, current_app, request
+from flask import Blueprint, render_template, redirect, flash, url_for, current_app, request, abort
 from flask_login import login_required, current_user
 from app.models import db, Message
 from app.forms import MessageForm
+from app.timeline import fan_out_message, retract_message
+from app.cache import timeline_cache
+from app.feed import annotate_messages
+from app.search import search_messages, index_message, unindex_message
+from app.utils.query_budget import query_budget
+from app.replicas import read_replica
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.DEBUG,  # Set the minimum log level
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-
-# Create a logger
 logger = logging.getLogger(__name__)
 
 # Create message blueprint
@@ -21,20 +20,42 @@ messages_bp = Blueprint('messages', __name__)
 
 @messages_bp.route('/messages/new', methods=["GET", "POST"])
 @login_required
+@query_budget(8)
 def messages_add() -> str:
     """Add a message."""
     form = MessageForm()
     if form.validate_on_submit():
         msg = Message(text=form.text.data, user_id=current_user.id)
         db.session.add(msg)
+        fan_out_message(msg)
+        index_message(msg)
         db.session.commit()
+        timeline_cache.invalidate_message_audience(msg.user_id)
         flash("Message added successfully!", "success")
         current_app.logger.debug(f"Message added: {msg.text[:20]}...")
         return redirect(url_for('users.users_show', user_id=current_user.id))
     return render_template('messages/new.html', form=form)
 
 
+@messages_bp.route('/messages/search', methods=["GET"])
+@query_budget(4)
+def messages_search() -> str:
+    """Full-text search over warbles, newest first."""
+    query = request.args.get('q', '').strip()
+    cursor = request.args.get('before')
+    try:
+        messages, next_cursor = search_messages(query, cursor, current_app.config.get('FEED_PAGE_SIZE', 50))
+    except ValueError:
+        abort(400)
+
+    annotations = annotate_messages(messages, current_user.id if current_user.is_authenticated else None)
+    return render_template('messages/search.html', query=query, messages=messages,
+                           next_cursor=next_cursor, **annotations._asdict())
+
+
 @messages_bp.route('/messages/<int:message_id>', methods=["GET"])
+@query_budget(3)
+@read_replica
 def messages_show(message_id: int) -> str:
     """Show a message."""
     current_app.logger.debug(f"Fetching message with ID: {message_id}")
@@ -44,6 +65,7 @@ def messages_show(message_id: int) -> str:
 
 @messages_bp.route('/messages/<int:message_id>/delete', methods=["POST"])
 @login_required
+@query_budget(8)
 def messages_destroy(message_id: int) -> str:
     """Delete a message."""
     msg = Message.query.get_or_404(message_id)
@@ -51,8 +73,11 @@ def messages_destroy(message_id: int) -> str:
         flash("Access unauthorized.", "danger")
         current_app.logger.warning(f"Unauthorized delete attempt on message ID: {message_id}")
         return redirect(url_for('homepage'))
+    retract_message(msg.id)
+    unindex_message(msg.id)
     db.session.delete(msg)
     db.session.commit()
+    timeline_cache.invalidate_message_audience(msg.user_id)
     flash(f"Message '{msg.text[:20]}...' deleted.", "success")
     current_app.logger.debug(f"Message deleted with ID: {message_id}")
     return redirect(url_for('users.users_show', user_id=current_user.id))
@@ -60,6 +85,7 @@ def messages_destroy(message_id: int) -> str:
 
 @messages_bp.route('/messages/<int:message_id>/like', methods=['POST'])
 @login_required
+@query_budget(6)
 def like_message(message_id):
     """Like a warble."""
     print("===================================================")
@@ -73,7 +99,6 @@ def like_message(message_id):
     
     # Fetch message
     message = Message.query.get_or_404(message_id)
-    liked_message_ids = {message.id for message in current_user.likes}  # Fetch all liked message IDs once
     current_app.logger.debug(f"Received request to like message ID: {message_id}")
 
     try:
@@ -84,16 +109,15 @@ def like_message(message_id):
             return redirect(request.referrer or url_for('main.homepage'))
 
         # Check if already liked
-        if message.id in liked_message_ids:
+        if current_user.has_liked_message(message):
             flash("You already liked this warble.", "info")
             current_app.logger.debug(f"User {current_user.id} has already liked message {message_id}.")
         else:
             # Add the like
             print('+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++')
-            current_app.logger.debug(f"Current user likes before: {[msg.id for msg in current_user.likes]}")
-            current_user.likes.append(message)
+            current_user.like_message(message)
             db.session.commit()
-            current_app.logger.debug(f"Current user likes after: {[msg.id for msg in current_user.likes]}")
+            timeline_cache.invalidate('likes', current_user.id)
             print('+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++')
             flash("Warble liked!", "success")
             current_app.logger.debug(f"User {current_user.id} liked message {message_id}.")
@@ -110,19 +134,19 @@ def like_message(message_id):
 
 @messages_bp.route('/messages/<int:message_id>/unlike', methods=['POST'])
 @login_required
+@query_budget(6)
 def unlike_message(message_id):
     """Unlike a warble."""
     message = Message.query.get_or_404(message_id)
-    
-    # Log the current liked messages
-    liked_message_ids = [msg.id for msg in current_user.likes]
-    current_app.logger.debug(f"User {current_user.id} has liked message IDs: {liked_message_ids}")
+
+    current_app.logger.debug(f"User {current_user.id} unliking message {message_id}")
 
     # Check if the like exists before attempting to remove it
     if current_user.has_liked_message(message):
         try:
-            current_user.likes.remove(message)
+            current_user.unlike_message(message)
             db.session.commit()
+            timeline_cache.invalidate('likes', current_user.id)
             flash("Warble unliked.", "success")
         except Exception as e:
             db.session.rollback()
@@ -136,6 +160,7 @@ def unlike_message(message_id):
 
 @messages_bp.route('/messages/<int:message_id>/delete', methods=['POST'])
 @login_required
+@query_budget(8)
 def delete_message(message_id):
     """Delete a message."""
     message = Message.query.get_or_404(message_id)
@@ -146,8 +171,11 @@ def delete_message(message_id):
         return redirect(url_for('main.homepage'))  # Or redirect to another page
 
     try:
+        retract_message(message.id)
+        unindex_message(message.id)
         db.session.delete(message)
         db.session.commit()
+        timeline_cache.invalidate_message_audience(message.user_id)
         flash("Message deleted.", "success")
     except Exception as e:
         db.session.rollback()
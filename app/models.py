@@ -1,13 +1,14 @@
 """app/models.py"""
 
 from datetime import datetime
-from flask_bcrypt import Bcrypt
+from typing import NamedTuple, Iterable
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from app.passwords import password_hasher
+from app.replicas import RoutingSession
 
 
-bcrypt = Bcrypt()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class Follows(db.Model):
@@ -32,23 +33,23 @@ class Follows(db.Model):
 class Likes(db.Model):
     """Mapping user likes to warbles."""
     __tablename__ = 'likes'
+    __table_args__ = (
+        # "Who liked message X" and per-message counts without touching the table
+        db.Index('ix_likes_message_id_user_id', 'message_id', 'user_id'),
+        # A user's likes newest-first
+        db.Index('ix_likes_user_id_created_at', 'user_id', 'created_at', 'message_id'),
+    )
 
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Ensure auto-increment
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='cascade'), nullable=False)
-    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='cascade'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='cascade'), primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='cascade'), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=db.func.now())
 
     def __repr__(self) -> str:
         return f"<Likes User {self.user_id} likes Message {self.message_id}>"
 
 
-
 # Association tables
-likes = db.Table(
-    'likes',
-    db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), primary_key=True),
-    db.Column('message_id', db.Integer, db.ForeignKey('messages.id', ondelete="CASCADE"), primary_key=True),
-    extend_existing=True  # Prevent re-declaration error
-)
+likes = Likes.__table__
 
 follows = db.Table(
     'follows',
@@ -57,6 +58,17 @@ follows = db.Table(
     extend_existing=True  # Prevent re-declaration error
 )
 
+class FollowStatus(NamedTuple):
+    """How the viewer and another user follow each other."""
+    following: bool = False
+    followed_by: bool = False
+
+    @property
+    def mutual(self) -> bool:
+        """True when both users follow each other."""
+        return self.following and self.followed_by
+
+
 class User(db.Model, UserMixin):
     """User in the system."""
     __tablename__ = 'users'
@@ -69,6 +81,18 @@ class User(db.Model, UserMixin):
     bio = db.Column(db.Text)
     location = db.Column(db.Text)
     password = db.Column(db.Text, nullable=False)
+    # Set for accounts above TIMELINE_FANOUT_FOLLOWER_LIMIT; see app/timeline.py
+    fanout_on_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Maintained by database triggers; see app/counters.py
+    messages_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    following_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # Case-insensitive username prefix search for queries too short for trigrams
+        db.Index('ix_users_username_lower', db.func.lower(username)),
+    )
 
     messages = db.relationship('Message', backref="user", cascade="all, delete")
     followers = db.relationship(
@@ -78,11 +102,15 @@ class User(db.Model, UserMixin):
         secondaryjoin=(follows.c.user_following_id == id),
         backref="following"
     )
+    # Never loaded implicitly: query `likes` directly or opt in with a
+    # profile from app/loading.py. Deleting a user deletes their rows through
+    # the ORM, since SQLite never enforces ON DELETE CASCADE (and so would
+    # skip the likes_count triggers).
     likes = db.relationship(
         'Message',
         secondary="likes",
         backref=db.backref('liked_by', lazy='dynamic'),
-        lazy='joined'
+        lazy='raise_on_sql',
     )
 
 
@@ -91,17 +119,24 @@ class User(db.Model, UserMixin):
 
     def debug_password(self, plain_password: str):
         """Debug the password matching process."""
-        is_valid = bcrypt.check_password_hash(self.password, plain_password)
+        is_valid = password_hasher.check(self.password, plain_password)
         current_app.logger.debug(f"Debug Password Match for {self.username}: {is_valid}")
         return is_valid
 
     def set_password(self, password: str) -> None:
         """Hash and set the password for the user."""
-        self.password = bcrypt.generate_password_hash(password).decode('UTF-8')
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
         """Check if the provided password matches the hashed password."""
-        return bcrypt.check_password_hash(self.password, password)
+        return password_hasher.check(self.password, password)
+
+    def rehash_password_if_needed(self, password: str) -> bool:
+        """Re-hash a just-verified password if it is stored at another cost; caller commits."""
+        if not password_hasher.needs_rehash(self.password):
+            return False
+        self.set_password(password)
+        return True
 
     def is_followed_by(self, other_user: "User") -> bool:
         """Check if this user is followed by `other_user`."""
@@ -111,22 +146,60 @@ class User(db.Model, UserMixin):
         """Check if this user is following `other_user`."""
         return other_user in self.following
 
+    @staticmethod
+    def follow_status(viewer_id: int, user_ids: Iterable[int]) -> dict[int, FollowStatus]:
+        """Return how the viewer and each of `user_ids` follow each other, in one query.
+
+        Takes the viewer's id rather than a `User`, so views can pass
+        `current_user.id` without hydrating the cached principal.
+
+        Args:
+            viewer_id (int): Id of the user looking at the page.
+            user_ids: Ids of the users shown on the page.
+
+        Returns:
+            dict[int, FollowStatus]: Status per requested id; ids with no follow
+            edge in either direction map to `FollowStatus()`.
+        """
+        user_ids = set(user_ids)
+        status = {user_id: FollowStatus() for user_id in user_ids}
+        if not user_ids:
+            return status
+
+        edges = db.session.execute(
+            db.select(follows.c.user_following_id, follows.c.user_being_followed_id).where(
+                db.or_(
+                    db.and_(follows.c.user_following_id == viewer_id,
+                            follows.c.user_being_followed_id.in_(user_ids)),
+                    db.and_(follows.c.user_being_followed_id == viewer_id,
+                            follows.c.user_following_id.in_(user_ids)),
+                )
+            )
+        )
+        for follower_id, followed_id in edges:
+            if follower_id == viewer_id:
+                status[followed_id] = status[followed_id]._replace(following=True)
+            if followed_id == viewer_id:
+                status[follower_id] = status[follower_id]._replace(followed_by=True)
+        return status
+
     def has_liked_message(self, message: "Message") -> bool:
         """Check if the user has liked a specific message."""
-        return message.id in {msg.id for msg in self.likes}
-
+        return db.session.scalar(
+            db.select(db.exists().where(likes.c.user_id == self.id, likes.c.message_id == message.id))
+        )
 
     def like_message(self, message: "Message") -> None:
         """Like a message if not already liked."""
         if not self.has_liked_message(message):
-            self.likes.append(message)
+            db.session.execute(db.insert(likes).values(user_id=self.id, message_id=message.id))
 
     def unlike_message(self, message: "Message") -> None:
         """Unlike a message if already liked."""
-        current_app.logger.debug(f"Current user likes: {[msg.id for msg in current_user.likes]}")
-        if self.has_liked_message(message):
-            self.likes.remove(message)
-            
+        db.session.execute(
+            db.delete(likes).where(likes.c.user_id == self.id, likes.c.message_id == message.id)
+        )
+
     def toggle_follow(user_to_follow, action):
         """Follow or unfollow a user."""
         if not user_to_follow:
@@ -182,14 +255,25 @@ class User(db.Model, UserMixin):
         )
         user.set_password(password)
         db.session.add(user)
+        db.session.flush()
+
+        # Both modules import this one
+        from app.search import index_user
+        from app.autocomplete import autocomplete
+        index_user(user)
         db.session.commit()
+        autocomplete.add_user(user.id, user.username)
         return user
 
     @classmethod
     def authenticate(cls, username: str, password: str) -> "User | bool":
         """Authenticate a user with a username and password."""
         user = cls.query.filter_by(username=username).first()
-        return user if user and user.check_password(password) else False
+        if not user or not user.check_password(password):
+            return False
+        if user.rehash_password_if_needed(password):
+            db.session.commit()
+        return user
 
 
 class Message(db.Model):
@@ -200,11 +284,41 @@ class Message(db.Model):
     text = db.Column(db.String(140), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    # Maintained by database triggers; see app/counters.py
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Serves per-author feeds and keyset pages newest-first without a sort
+    __table_args__ = (
+        db.Index('ix_messages_user_id_timestamp', user_id, timestamp.desc(), id.desc()),
+    )
 
     def __repr__(self) -> str:
         return f"<Message #{self.id}: {self.text[:20]} by User #{self.user_id}>"
 
 
+class TimelineEntry(db.Model):
+    """A message materialized into a user's home timeline.
+
+    Rows are written when a message is posted (fan-out on write) so the
+    homepage reads a single indexed range of `timelines` instead of
+    rebuilding the feed from `follows` and `messages` on every request.
+    """
+    __tablename__ = 'timelines'
+    __table_args__ = (
+        db.Index('ix_timelines_user_id_timestamp', 'user_id', 'timestamp', 'message_id'),
+        db.Index('ix_timelines_user_id_author_id', 'user_id', 'author_id'),
+        db.Index('ix_timelines_message_id', 'message_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id', ondelete='CASCADE'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TimelineEntry User #{self.user_id} <- Message #{self.message_id}>"
+
+
 def connect_db(app):
     """Connect this database to provided Flask app."""
     db.app = app
@@ -0,0 +1,135 @@
+"""app/passwords.py
+
+bcrypt hashing on a bounded executor.
+
+bcrypt is deliberately slow: about 250ms of CPU per hash at cost 12. Run
+inline, a burst of logins ties up every worker thread and every core,
+and feed requests queue behind them. `PasswordHasher` runs hashes on a
+small thread pool instead (the bcrypt C extension releases the GIL, so
+`PASSWORD_HASH_WORKERS` hashes really run in parallel). It admits at most
+`PASSWORD_HASH_MAX_PENDING` hashes at once. Past that, `PasswordHasherBusy`
+is raised immediately, and the login view answers 503 rather than letting
+the backlog grow.
+
+Each worker process has its own pool, so the machine runs up to (gunicorn
+workers x `PASSWORD_HASH_WORKERS`) hashes at once. The default,
+`default_hash_workers`, gives each process an equal share of half the
+cores, using gunicorn's `WEB_CONCURRENCY` worker count, so a login surge
+leaves the other half for feed requests. The executor bounds CPU, not
+request threads: the view waits for its hash, so with gunicorn's `sync`
+workers a waiting login still occupies its worker process. Use `gthread`
+workers (`--threads`) so other requests keep flowing while logins wait,
+and set `PASSWORD_HASH_WORKERS` explicitly if the worker count is not in
+`WEB_CONCURRENCY`.
+
+The cost comes from `BCRYPT_LOG_ROUNDS`. Every hash records the cost it was
+made with, so `needs_rehash` can spot stored hashes made at another cost.
+The login view re-hashes them with the password it has just verified.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when too many hashes are already queued."""
+
+
+def hash_cost(password_hash: str) -> int | None:
+    """Return the cost a bcrypt hash was made with, or None if it is not a bcrypt hash.
+
+    Args:
+        password_hash (str): A stored hash such as `$2b$12$...`.
+
+    Returns:
+        int | None: The log2 work factor.
+    """
+    parts = password_hash.split('$') if password_hash else []
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def bcrypt_hash(password: bytes, rounds: int) -> str:
+    """Hash a password at `rounds`; a plain function so process pools can pickle it."""
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password: bytes, password_hash: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password, password_hash)
+    except ValueError:
+        return False  # Not a bcrypt hash
+
+
+def default_hash_workers() -> int:
+    """Return this process's share of half the CPU cores, given `WEB_CONCURRENCY` worker processes."""
+    processes = max(1, int(os.environ.get('WEB_CONCURRENCY') or 1))
+    return max(1, (os.cpu_count() or 1) // 2 // processes)
+
+
+class PasswordHasher:
+    """Bounded executor for bcrypt; configure with `init_app`."""
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.workers = default_hash_workers()
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(4 * self.workers)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Read the hashing settings and register the hasher on the app."""
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        workers = app.config.get('PASSWORD_HASH_WORKERS') or default_hash_workers()
+        max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING') or 4 * workers
+        if self._executor is None or workers != self.workers:
+            self.shutdown()
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)  # Not initialised (scripts): hash inline
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Too many password hashes in progress.")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """Hash a password at the configured cost.
+
+        Raises:
+            PasswordHasherBusy: If `PASSWORD_HASH_MAX_PENDING` hashes are already in progress.
+        """
+        return self._run(bcrypt_hash, password.encode('utf-8'), self.rounds)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """Return whether `password` matches `password_hash`.
+
+        Raises:
+            PasswordHasherBusy: If `PASSWORD_HASH_MAX_PENDING` hashes are already in progress.
+        """
+        if not password_hash:
+            return False
+        return self._run(_check, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Return whether a stored hash was made at a cost other than the configured one."""
+        return hash_cost(password_hash) != self.rounds
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
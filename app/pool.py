@@ -0,0 +1,152 @@
+"""app/pool.py
+
+Connection pool settings and live pool statistics.
+
+`configure_pool` turns the `DB_*` settings into engine options before
+`db.init_app` creates the engines. Each worker process gets `DB_POOL_SIZE`
+persistent connections plus up to `DB_MAX_OVERFLOW` temporary ones, and a
+request waits up to `DB_POOL_TIMEOUT` seconds for one before failing. Size
+the pool so `workers x (pool size + overflow)` stays under the server's
+`max_connections`.
+
+With `DB_PGBOUNCER`, the app talks to PgBouncer in transaction pooling mode.
+PgBouncer already shares server connections between clients, so the app
+stops holding its own (`NullPool`) and does not send startup `options`,
+which PgBouncer rejects. Set `statement_timeout` on the database role
+instead.
+
+The pool classes below time every checkout. `pool_stats` (served at
+`/internal/pool-stats`) reports checkouts, time spent waiting and timeouts
+next to the pool's live checked-out and overflow counts. A rising
+`wait_ms_max` or any `timeouts` means the pool is too small for the
+worker's concurrency. Counters are per process.
+"""
+
+import threading
+import time
+from flask import current_app
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from app.models import db
+
+# Checkouts slower than this count as having waited for a connection
+WAIT_THRESHOLD = 0.001
+
+
+class PoolStats:
+    """Checkout counters for one pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if seconds >= WAIT_THRESHOLD:
+                self.waits += 1
+                self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {'checkouts': self.checkouts, 'waits': self.waits, 'timeouts': self.timeouts,
+                    'wait_ms_total': round(self.wait_total * 1000, 3),
+                    'wait_ms_max': round(self.wait_max * 1000, 3)}
+
+
+class _TimedCheckout:
+    """Pool mixin that times `connect()`, including waiting for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    """`QueuePool` with checkout statistics."""
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    """`NullPool` (connect per checkout) with checkout statistics."""
+
+
+def engine_options(config, url) -> dict:
+    """Return engine options for `url` from the `DB_*` settings in `config`.
+
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if config.get('DB_PGBOUNCER'):
+        options['poolclass'] = TimedNullPool
+    else:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=config.get('DB_POOL_SIZE', 5),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+        )
+
+    if backend == 'postgresql':
+        connect_args = {'connect_timeout': config.get('DB_CONNECT_TIMEOUT', 10)}
+        statement_timeout = config.get('DB_STATEMENT_TIMEOUT')
+        if statement_timeout and not config.get('DB_PGBOUNCER'):
+            connect_args['options'] = f"-c statement_timeout={statement_timeout}"
+        options['connect_args'] = connect_args
+    return options
+
+
+def configure_pool(app) -> None:
+    """Fill in `SQLALCHEMY_ENGINE_OPTIONS` from the `DB_*` settings; call before `db.init_app`.
+
+    Options set explicitly in the config (as `TestingConfig` does) are left alone.
+    """
+    url = app.config.get('SQLALCHEMY_DATABASE_URI')
+    if url and not app.config.get('SQLALCHEMY_ENGINE_OPTIONS'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config, url)
+
+
+def describe_pool(pool) -> dict:
+    """Return the live state of one pool, plus checkout counters if it keeps them."""
+    state = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        state.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                     overflow=max(pool.overflow(), 0), timeout=pool.timeout())
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        state.update(stats.as_dict())
+    return state
+
+
+def pool_stats() -> dict:
+    """Return `describe_pool` for every engine, keyed by bind (`default` for the main database).
+
+    Read replicas (see app/replicas.py) are listed as `replica1`, `replica2`, ...
+    """
+    engines = {key or 'default': engine for key, engine in db.engines.items()}
+    engines.update(current_app.extensions.get('replicas', {}))
+    return {key: describe_pool(engine.pool) for key, engine in engines.items()}
@@ -0,0 +1,151 @@
+"""app/principal.py
+
+Cached authentication principal.
+
+Flask-Login calls `load_user` on every request. Instead of loading a `User`
+each time, it now returns a `Principal`: the id, username and image URL,
+cached in the session for `AUTH_PRINCIPAL_TTL` seconds. Most requests only
+need those three fields to render the navbar and check ownership, so they
+authenticate without touching the database.
+
+Any other attribute (`following`, `like_message`, `bio`, ...) hydrates the
+full `User` on first access, once per request. Code that writes to the user
+or hands it to the session (`db.session.delete`) should call
+`current_user_model()` instead.
+
+A cached principal is trusted until its TTL runs out, then reloaded from
+the `users` row, which every worker shares. Profile edits and account
+deletion (`invalidate_principal`) also leave a revocation token in
+`revocations`, kept for one TTL. It is a backend of the `CACHE_BACKEND`
+kind, separate from the timeline cache's: every request looks its token
+up, and that traffic would drown out the page counters reported by
+`/internal/cache-stats`. Sessions that reach a worker
+holding the token reload their copy early. A worker without a token never
+forces a reload, so requests alternating between workers (or the `null`
+backend) do not reload the principal or rewrite the cookie. With the
+in-process `local` backend, other workers pick up a change when the TTL
+runs out.
+
+A session whose user was deleted is logged out the first time it needs
+the full `User`.
+"""
+
+import time
+import uuid
+from flask import abort, current_app, session
+from flask_login import current_user, logout_user
+from sqlalchemy import select
+from app.models import db, User
+from app.loading import AUTH_PRINCIPAL
+from app.cache import BACKENDS, NullCache
+
+SESSION_KEY = '_principal'
+
+
+class Principal:
+    """The logged-in user as seen by most requests: three columns, no ORM state."""
+    __slots__ = ('id', 'username', 'image_url', '_user')
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id: int, username: str, image_url: str | None):
+        self.id = id
+        self.username = username
+        self.image_url = image_url
+        self._user = None
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    @property
+    def user(self) -> User:
+        """The full `User`, loaded on first access."""
+        if self._user is None:
+            self._user = db.session.get(User, self.id, options=AUTH_PRINCIPAL)
+            if self._user is None:
+                # Deleted since the principal was cached: end the session as Flask-Login would
+                forget_principal()
+                logout_user()
+                abort(current_app.login_manager.unauthorized())
+        return self._user
+
+    def __getattr__(self, name):
+        # Only reached for attributes a principal does not carry
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self) -> str:
+        return f"<Principal #{self.id}: {self.username}>"
+
+
+class PrincipalRevocations:
+    """Revocation tokens for cached principals, in a cache backend of their own."""
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Create a backend of the configured `CACHE_BACKEND` kind and register it on the app."""
+        self.backend = BACKENDS[app.config.get('CACHE_BACKEND', 'local')](app.config)
+        app.extensions['principal_revocations'] = self
+
+    def version(self, user_id: int) -> str | None:
+        """Return the user's revocation token, or None if this backend holds none."""
+        return self.backend.get(f"principal:{user_id}")
+
+    def revoke(self, user_id: int, ttl: float) -> None:
+        """Store a fresh revocation token for `ttl` seconds."""
+        self.backend.set(f"principal:{user_id}", uuid.uuid4().hex, ttl=ttl)
+
+
+revocations = PrincipalRevocations()
+
+
+def load_principal(user_id: int) -> Principal | None:
+    """Return the cached principal for `user_id`, reloading it when expired or revoked."""
+    version = revocations.version(user_id)
+    cached = session.get(SESSION_KEY)
+    if (cached and cached['id'] == user_id and cached['expires'] > time.time()
+            and version in (None, cached['version'])):
+        return Principal(user_id, cached['username'], cached['image_url'])
+
+    row = db.session.execute(
+        select(User.username, User.image_url).where(User.id == user_id)
+    ).first()
+    if row is None:
+        session.pop(SESSION_KEY, None)
+        return None
+    session[SESSION_KEY] = {
+        'id': user_id,
+        'username': row.username,
+        'image_url': row.image_url,
+        'version': version,
+        'expires': time.time() + current_app.config.get('AUTH_PRINCIPAL_TTL', 300),
+    }
+    return Principal(user_id, row.username, row.image_url)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Make sessions reload the user's principal; call after committing a profile change.
+
+    Sessions served by this worker reload on their next request, all others
+    within `AUTH_PRINCIPAL_TTL`.
+    """
+    ttl = current_app.config.get('AUTH_PRINCIPAL_TTL', 300)
+    revocations.revoke(user_id, ttl)
+
+
+def forget_principal() -> None:
+    """Drop the principal cached in this session (on logout)."""
+    session.pop(SESSION_KEY, None)
+
+
+def current_user_model() -> User:
+    """Return the logged-in user as a full `User`, hydrating the principal if needed."""
+    user = current_user._get_current_object()
+    return user.user if isinstance(user, Principal) else user
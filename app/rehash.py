@@ -0,0 +1,129 @@
+"""app/rehash.py
+
+Batched, resumable password migration.
+
+`rehash_passwords` walks `users` in primary-key order, `batch_size` rows at
+a time. Each batch runs one keyset query, hashes its plaintext passwords on
+a process pool, writes them back with one executemany UPDATE and commits.
+The last id processed is committed in `password_rehash_progress` in the
+same transaction, so an interrupted run picks up at the next batch. A run
+that reaches the end of the table deletes its checkpoint, so the next one
+(say, after raising `BCRYPT_LOG_ROUNDS`) scans every user again. Memory
+stays at one batch however large the table is.
+
+A stored bcrypt hash cannot be moved to a new cost without the password it
+was made from. Rows hashed at a cost other than the target are only
+counted, as `stale`. The login view re-hashes them at the configured cost
+the next time their owners sign in (see `User.rehash_password_if_needed`).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple
+from sqlalchemy import Column, Integer, MetaData, Table, Text, bindparam, select, insert, update, delete
+from app.models import db, User
+from app.passwords import password_hasher, bcrypt_hash, hash_cost
+
+JOB = 'rehash-passwords'
+
+# Kept out of db.metadata: it belongs to the migration, not to the application schema
+password_rehash_progress = Table(
+    'password_rehash_progress', MetaData(),
+    Column('job', Text, primary_key=True),
+    Column('last_id', Integer, nullable=False),
+)
+
+
+class RehashReport(NamedTuple):
+    """Outcome of a run; counts cover this run only, not batches skipped on resume."""
+    scanned: int
+    hashed: int
+    stale: int
+    resumed_after: int = 0  # checkpointed id the run started after; 0 for a fresh run
+
+
+def _checkpoint() -> int:
+    last_id = db.session.scalar(
+        select(password_rehash_progress.c.last_id).where(password_rehash_progress.c.job == JOB)
+    )
+    if last_id is None:
+        db.session.execute(insert(password_rehash_progress).values(job=JOB, last_id=0))
+        return 0
+    return last_id
+
+
+def rehash_passwords(batch_size: int = 1000, processes: int | None = None, rounds: int | None = None,
+                     restart: bool = False,
+                     progress: Callable[[RehashReport, float], None] | None = None) -> RehashReport:
+    """Hash every plaintext password, resuming an interrupted run.
+
+    Args:
+        batch_size (int): Users read, hashed and committed together.
+        processes (int | None): Hashing processes; None uses one per CPU.
+        rounds (int | None): bcrypt cost; None uses `BCRYPT_LOG_ROUNDS`.
+        restart (bool): Start again from the first user instead of the checkpoint.
+        progress: Called after each batch with the running report and rows
+            scanned per second.
+
+    Returns:
+        RehashReport: Rows scanned and hashed, bcrypt hashes left at another
+        cost, and the id a resumed run started after.
+    """
+    rounds = rounds or password_hasher.rounds
+    processes = processes or os.cpu_count() or 1
+    password_rehash_progress.create(db.engine, checkfirst=True)
+    last_id = resumed_after = _checkpoint()
+    if restart:
+        last_id = resumed_after = 0
+    db.session.commit()
+
+    users = User.__table__
+    write_back = (
+        update(users)
+        .where(users.c.id == bindparam('b_id'), users.c.password == bindparam('b_old'))
+        .values(password=bindparam('b_new'))
+    )
+    scanned = hashed = stale = 0
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while True:
+            rows = db.session.execute(
+                select(users.c.id, users.c.password)
+                .where(users.c.id > last_id).order_by(users.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            plaintext = []
+            for row in rows:
+                cost = hash_cost(row.password)
+                if cost is None:
+                    plaintext.append(row)
+                elif cost != rounds:
+                    stale += 1
+            if plaintext:
+                hashes = pool.map(bcrypt_hash, [row.password.encode('utf-8') for row in plaintext],
+                                  [rounds] * len(plaintext),
+                                  chunksize=max(1, len(plaintext) // (4 * processes)))
+                # A password changed since the read keeps its new value: the WHERE no longer matches
+                db.session.execute(write_back, [
+                    {'b_id': row.id, 'b_old': row.password, 'b_new': password_hash}
+                    for row, password_hash in zip(plaintext, hashes)
+                ])
+
+            last_id = rows[-1].id
+            db.session.execute(update(password_rehash_progress)
+                               .where(password_rehash_progress.c.job == JOB).values(last_id=last_id))
+            db.session.commit()
+            scanned += len(rows)
+            hashed += len(plaintext)
+            if progress:
+                progress(RehashReport(scanned, hashed, stale, resumed_after),
+                         scanned / max(time.monotonic() - started, 1e-9))
+
+    # Finished: the next run starts from the first user again
+    db.session.execute(delete(password_rehash_progress).where(password_rehash_progress.c.job == JOB))
+    db.session.commit()
+    return RehashReport(scanned, hashed, stale, resumed_after)
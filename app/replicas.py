@@ -0,0 +1,109 @@
+"""app/replicas.py
+
+Read replica routing with read-your-writes stickiness.
+
+`SQLALCHEMY_REPLICA_URIS` lists read replicas of the primary database.
+`init_replicas` creates an engine for each (`replica1`, `replica2`, ...)
+with the same pool settings as the primary (see app/pool.py). They are
+kept in `app.extensions['replicas']` rather than `SQLALCHEMY_BINDS`:
+no model lives on them, and `db.create_all` must never target them.
+Views marked `@read_replica` pick one replica at random per request, and
+`RoutingSession` sends that request's plain SELECTs to it. Everything else
+stays on the primary: flushes, INSERT/UPDATE/DELETE, `SELECT ... FOR
+UPDATE`, raw `text()` statements, and every statement in unmarked views.
+
+Replicas lag the primary, so a user who just posted, liked or followed
+would not see it on their next page. Any request that writes records
+`time + REPLICA_READ_YOUR_WRITES` in the user's session. Until then,
+`@read_replica` leaves that user's requests on the primary. Other users
+keep reading from replicas. `timeline_cache.cached_page` never stores a
+page read from a replica, so cached pages always come from the primary and
+a write's new cache version never holds a page that is missing it.
+
+Without replicas configured, `@read_replica` does nothing.
+"""
+
+import random
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+SESSION_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """`db.session` class that sends reads of `@read_replica` views to the chosen replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            replica = g.get('replica')
+            if replica is not None and not self._flushing and _is_read(clause):
+                return replica
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.wrote_primary = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_read(clause) -> bool:
+    """Is `clause` a SELECT a replica can answer (no row locks)?"""
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def replica_engines() -> dict:
+    """Return the current app's replica engines by name."""
+    return current_app.extensions.get('replicas', {})
+
+
+def reading_replica() -> bool:
+    """Is the current request reading from a replica?"""
+    return has_request_context() and g.get('replica') is not None
+
+
+def reading_own_writes() -> bool:
+    """Is the current user inside the read-your-writes window after a write?"""
+    return (has_request_context() and bool(replica_engines())
+            and session.get(SESSION_KEY, 0) > time.time())
+
+
+def read_replica(view):
+    """Serve a read-only view's SELECTs from a replica, unless the user just wrote."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        engines = list(replica_engines().values())
+        if not engines or request.method not in ('GET', 'HEAD') or reading_own_writes():
+            return view(*args, **kwargs)
+        g.replica = random.choice(engines)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            # The app context (and `g`) can outlive the request in tests and CLI code
+            g.pop('replica', None)
+    return wrapper
+
+
+def init_replicas(app) -> None:
+    """Create engines for `SQLALCHEMY_REPLICA_URIS`; call before `configure_pool` fills in defaults.
+
+    No connection is opened until a request reads from a replica.
+    """
+    # app.pool imports app.models, which imports this module
+    from app.pool import engine_options
+
+    explicit = app.config.get('SQLALCHEMY_ENGINE_OPTIONS')
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    app.extensions['replicas'] = {
+        f"replica{number}": create_engine(uri, **(explicit or engine_options(app.config, uri)))
+        for number, uri in enumerate(uris, start=1)
+    }
+    if not uris:
+        return
+
+    @app.after_request
+    def remember_write(response):
+        if g.pop('wrote_primary', False):
+            session[SESSION_KEY] = time.time() + app.config.get('REPLICA_READ_YOUR_WRITES', 5)
+        return response
@@ -1,10 +1,14 @@
 """app/routes.py"""
 
-from flask import render_template, flash, current_app, Blueprint, g
-from flask_login import current_user
+from flask import render_template, flash, current_app, Blueprint, g, request, jsonify, abort
+from flask_login import current_user, login_required
 from sqlalchemy.exc import SQLAlchemyError
-from app.models import Message
 from app.forms import LikeForm
+from app.timeline import home_feed_page
+from app.feed import annotate_messages
+from app.cache import timeline_cache, snapshot_messages
+from app.utils.query_budget import query_budget
+from app.replicas import read_replica
 
 
 ##############################################################################
@@ -20,30 +24,68 @@ main_bp = Blueprint('main', __name__)
 
 
 
+def feed_page(user_id: int, cursor: str | None):
+    """Return one keyset page of a user's home timeline and the next cursor."""
+    def load():
+        try:
+            messages, next_cursor = home_feed_page(user_id, cursor, current_app.config.get('FEED_PAGE_SIZE', 50))
+        except ValueError:
+            abort(400)
+        return snapshot_messages(messages), next_cursor
+
+    return timeline_cache.cached_page('feed', user_id, cursor, load)
+
+
 @main_bp.route('/')
+@query_budget(6)
+@read_replica
 def homepage():
     """Show homepage for logged-in users or anonymous users."""
     form = LikeForm()  # Create an instance of the LikeForm
     if current_user.is_authenticated:
+        next_cursor = None
         try:
-            # Fetch messages from the logged-in user and the users they follow
-            messages = (Message.query
-                        .filter((Message.user_id == current_user.id) |
-                                (Message.user_id.in_([user.id for user in current_user.following])))
-                        .order_by(Message.timestamp.desc())
-                        .limit(100)
-                        .all())
+            # Read one page of the user's materialized timeline (own messages + followed users)
+            messages, next_cursor = feed_page(current_user.id, request.args.get('before'))
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error fetching messages: {e}")
             flash("Error loading messages. Please try again later.", "danger")
             messages = []
 
+        # Like counts and the viewer's likes for the whole page in one query
+        annotations = annotate_messages(messages, current_user.id)
+
         # Pass current_user as 'user' to match the template
-        return render_template('home.html', messages=messages, form=form, user=current_user)
+        return render_template('home.html', messages=messages, form=form, user=current_user,
+                               next_cursor=next_cursor, **annotations._asdict())
 
     return render_template('home-anon.html', form=form)
 
 
+@main_bp.route('/feed')
+@login_required
+@query_budget(5)
+def feed():
+    """Return the next page of the home feed after `?before=<cursor>` as JSON."""
+    messages, next_cursor = feed_page(current_user.id, request.args.get('before'))
+    return jsonify({
+        'messages': [
+            {
+                'id': msg.id,
+                'text': msg.text,
+                'timestamp': msg.timestamp.isoformat(),
+                'user': {
+                    'id': msg.user.id,
+                    'username': msg.user.username,
+                    'image_url': msg.user.image_url,
+                },
+            }
+            for msg in messages
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
 
 
 @main_bp.after_request
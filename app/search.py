@@ -0,0 +1,391 @@
+"""app/search.py
+
+Indexed search over users and messages.
+
+Users
+-----
+
+Postgres matches `username`/`email` substrings with ILIKE. GIN trigram
+indexes (pg_trgm) serve those matches, and results are ranked by
+`similarity()`. SQLite uses an FTS5 table, `users_fts`, with the trigram
+tokenizer, keyed by user id and ranked by bm25. The base table carries no
+full-text data, so `index_user` / `unindex_user` must be called wherever
+users are created, edited or deleted. `reindex_users` rebuilds the index
+from scratch (see `flask reindex-search`).
+
+Trigrams need at least three characters. Shorter queries match username
+prefixes, ignoring case, through the `lower(username)` index.
+
+Messages
+--------
+Postgres serves full-text matches from a GIN index on the expression
+`to_tsvector('english', text)`; the planner uses it for any query that
+repeats the same expression, so there is no column to backfill or keep in
+sync. SQLite uses an FTS5 table, `messages_fts`, with the porter stemmer,
+kept in sync by `index_message` / `unindex_message` from the views that post
+and delete messages. Entries left behind by cascading deletes (account
+removal) never match, since results join back to `messages`, and are
+dropped by the next `flask reindex-search`. Results are newest first and keyset-paginated like
+every other message list (see `app.utils.pagination`).
+"""
+
+import re
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+from sqlalchemy import DDL, event, select, delete, insert, func, or_, table, column, literal_column
+from app.models import db, User, Message
+from app.loading import PROFILE_CARD, FEED
+from app.utils.pagination import keyset_page
+
+
+MIN_TRIGRAM_LENGTH = 3
+MAX_PAGE = 50
+
+TEXT_SEARCH_CONFIG = 'english'
+_WORDS = re.compile(r"\w+")
+
+users_fts = table('users_fts', column('rowid'), column('username'), column('email'), column('rank'))
+messages_fts = table('messages_fts', column('rowid'), column('text'))
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(username, email, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, tokenize='porter unicode61')",
+]
+
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_messages_text_fts ON messages "
+    f"USING gin (to_tsvector('{TEXT_SEARCH_CONFIG}', text))",
+]
+
+# Dropped while `app/seed.py` bulk-loads and recreated from POSTGRESQL_DDL afterwards
+POSTGRESQL_INDEXES = ['ix_users_username_trgm', 'ix_users_email_trgm', 'ix_messages_text_fts']
+
+for statement in SQLITE_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for name in ('users_fts', 'messages_fts'):
+    event.listen(db.metadata, 'before_drop', DDL(f"DROP TABLE IF EXISTS {name}").execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+
+class SearchPage(NamedTuple):
+    """One page of ranked search results."""
+    items: list
+    page: int
+    has_next: bool
+
+
+def _escape_like(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _page(query, page: int, per_page: int) -> SearchPage:
+    """Fetch `per_page + 1` rows at `page` to learn whether a next page exists."""
+    page = max(1, min(page, MAX_PAGE))
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return SearchPage(rows[:per_page], page, len(rows) > per_page)
+
+
+class UserSearch(ABC):
+    """Interface every user search backend implements."""
+
+    @abstractmethod
+    def query(self, text: str):
+        """Return a query of users matching `text`, best match first."""
+
+    @abstractmethod
+    def index(self, user: User) -> None:
+        """Add or refresh a user's entry in the search index."""
+
+    @abstractmethod
+    def index_new(self, rows: list[dict]) -> None:
+        """Index users that have no entry yet, from `id`/`username`/`email` dicts."""
+
+    @abstractmethod
+    def remove(self, user_id: int) -> None:
+        """Drop a user's entry from the search index."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Empty the search index."""
+
+    @abstractmethod
+    def rebuild(self, batch_size: int) -> int:
+        """Rebuild the index from `users`; returns the number of users indexed."""
+
+
+class ScanUserSearch(UserSearch):
+    """Unindexed fallback for other databases: ILIKE scan ordered by username.
+
+    The database does all the work, so there is no index to maintain.
+    """
+
+    def query(self, text):
+        pattern = f"%{_escape_like(text)}%"
+        return (User.query.options(*PROFILE_CARD)
+                .filter(or_(User.username.ilike(pattern, escape='\\'),
+                            User.email.ilike(pattern, escape='\\')))
+                .order_by(User.username, User.id))
+
+    def index(self, user):
+        pass
+
+    def index_new(self, rows):
+        pass
+
+    def remove(self, user_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def rebuild(self, batch_size):
+        return 0
+
+
+class PostgresUserSearch(ScanUserSearch):
+    """ILIKE served by pg_trgm GIN indexes, ranked by trigram similarity."""
+
+    def query(self, text: str):
+        score = func.greatest(func.similarity(User.username, text), func.similarity(User.email, text))
+        return super().query(text).order_by(None).order_by(score.desc(), User.id)
+
+
+class SQLiteUserSearch(UserSearch):
+    """FTS5 trigram table ranked by bm25."""
+
+    def query(self, text: str):
+        phrase = '"' + text.replace('"', '""') + '"'
+        return (User.query.options(*PROFILE_CARD)
+                .join(users_fts, users_fts.c.rowid == User.id)
+                .filter(literal_column('users_fts').op('MATCH')(phrase))
+                .order_by(users_fts.c.rank, User.id))
+
+    def index(self, user):
+        self.remove(user.id)
+        db.session.execute(insert(users_fts).values(rowid=user.id, username=user.username, email=user.email))
+
+    def index_new(self, rows):
+        if rows:
+            db.session.execute(insert(users_fts), [
+                {'rowid': row['id'], 'username': row['username'], 'email': row['email']} for row in rows
+            ])
+
+    def remove(self, user_id):
+        db.session.execute(delete(users_fts).where(users_fts.c.rowid == user_id))
+
+    def clear(self):
+        db.session.execute(delete(users_fts))
+
+    def rebuild(self, batch_size):
+        self.clear()
+        total, last_id = 0, 0
+        while True:
+            rows = db.session.execute(
+                select(User.id, User.username, User.email)
+                .where(User.id > last_id).order_by(User.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            db.session.execute(insert(users_fts), [
+                {'rowid': user_id, 'username': username, 'email': email} for user_id, username, email in rows
+            ])
+            db.session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+
+
+class MessageSearch(ABC):
+    """Interface every message search backend implements."""
+
+    @abstractmethod
+    def filter(self, query, words: list[str]):
+        """Narrow a message query to messages containing every word."""
+
+    @abstractmethod
+    def index(self, message: Message) -> None:
+        """Add or refresh a message's entry in the search index."""
+
+    @abstractmethod
+    def remove(self, message_id: int) -> None:
+        """Drop a message's entry from the search index."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Empty the search index."""
+
+    @abstractmethod
+    def rebuild(self, batch_size: int) -> int:
+        """Rebuild the index from `messages`; returns the number of messages indexed."""
+
+
+class ScanMessageSearch(MessageSearch):
+    """Unindexed fallback for other databases: ILIKE scan on every word.
+
+    The database does all the work, so there is no index to maintain.
+    """
+
+    def filter(self, query, words):
+        for word in words:
+            query = query.filter(Message.text.ilike(f"%{_escape_like(word)}%", escape='\\'))
+        return query
+
+    def index(self, message):
+        pass
+
+    def remove(self, message_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def rebuild(self, batch_size):
+        return 0
+
+
+class PostgresMessageSearch(ScanMessageSearch):
+    """Match against the GIN-indexed `to_tsvector` expression."""
+
+    def filter(self, query, words):
+        # The config must be a literal for the expression to match the index
+        config = literal_column(f"'{TEXT_SEARCH_CONFIG}'")
+        vector = func.to_tsvector(config, Message.text)
+        return query.filter(vector.op('@@')(func.plainto_tsquery(config, ' '.join(words))))
+
+
+class SQLiteMessageSearch(MessageSearch):
+    """FTS5 table with the porter stemmer; every word must match."""
+
+    def filter(self, query, words):
+        terms = ' '.join(f'"{word}"' for word in words)
+        return (query.join(messages_fts, messages_fts.c.rowid == Message.id)
+                .filter(literal_column('messages_fts').op('MATCH')(terms)))
+
+    def index(self, message):
+        self.remove(message.id)
+        db.session.execute(insert(messages_fts).values(rowid=message.id, text=message.text))
+
+    def remove(self, message_id):
+        db.session.execute(delete(messages_fts).where(messages_fts.c.rowid == message_id))
+
+    def clear(self):
+        db.session.execute(delete(messages_fts))
+
+    def rebuild(self, batch_size):
+        self.clear()
+        total, last_id = 0, 0
+        while True:
+            rows = db.session.execute(
+                select(Message.id, Message.text)
+                .where(Message.id > last_id).order_by(Message.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            db.session.execute(insert(messages_fts), [
+                {'rowid': message_id, 'text': text} for message_id, text in rows
+            ])
+            db.session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+
+
+BACKENDS = {
+    'postgresql': PostgresUserSearch(),
+    'sqlite': SQLiteUserSearch(),
+}
+
+MESSAGE_BACKENDS = {
+    'postgresql': PostgresMessageSearch(),
+    'sqlite': SQLiteMessageSearch(),
+}
+
+
+def user_search() -> UserSearch:
+    """Return the user search backend for the current database."""
+    return BACKENDS.get(db.session.get_bind().dialect.name, ScanUserSearch())
+
+
+def message_search() -> MessageSearch:
+    """Return the message search backend for the current database."""
+    return MESSAGE_BACKENDS.get(db.session.get_bind().dialect.name, ScanMessageSearch())
+
+
+def search_users(text: str, page: int = 1, per_page: int = 20) -> SearchPage:
+    """Return one ranked page of users whose username or email contains `text`."""
+    text = text.strip()
+    if len(text) < MIN_TRIGRAM_LENGTH:
+        prefix = text.lower()
+        username = func.lower(User.username)
+        query = (User.query.options(*PROFILE_CARD)
+                 .filter(username >= prefix, username < prefix + '\uffff')
+                 .order_by(username, User.id))
+    else:
+        query = user_search().query(text)
+    return _page(query, page, per_page)
+
+
+def index_user(user: User) -> None:
+    """Add or refresh a user's search entry; call before committing a new or edited user."""
+    user_search().index(user)
+
+
+def index_new_users(rows: list[dict]) -> None:
+    """Index freshly inserted users in bulk; call before committing the insert."""
+    user_search().index_new(rows)
+
+
+def unindex_user(user_id: int) -> None:
+    """Drop a user's search entry; call before committing the deletion."""
+    user_search().remove(user_id)
+
+
+def reindex_users(batch_size: int = 1000) -> int:
+    """Rebuild the user search index from the `users` table."""
+    return user_search().rebuild(batch_size)
+
+
+def search_messages(text: str, cursor: str | None = None, per_page: int = 20):
+    """Return one newest-first page of messages containing every word of `text`.
+
+    Args:
+        text (str): The search terms.
+        cursor (str | None): Cursor from the previous page, or None for the first page.
+        per_page (int): Page size.
+
+    Returns:
+        tuple[list, str | None]: The matching messages and the cursor for the
+        next page (None when this is the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    words = _WORDS.findall(text.lower())
+    if not words:
+        return [], None
+    query = message_search().filter(Message.query.options(*FEED), words)
+    return keyset_page(query.order_by(Message.timestamp.desc(), Message.id.desc()),
+                       Message.timestamp, Message.id, cursor, per_page)
+
+
+def index_message(message: Message) -> None:
+    """Add a message's search entry; call after flushing a new message and before committing."""
+    message_search().index(message)
+
+
+def unindex_message(message_id: int) -> None:
+    """Drop a message's search entry; call before committing the deletion."""
+    message_search().remove(message_id)
+
+
+def reindex_messages(batch_size: int = 1000) -> int:
+    """Rebuild the message search index from the `messages` table."""
+    return message_search().rebuild(batch_size)
+
+
+def clear_indexes() -> None:
+    """Empty every search index."""
+    user_search().clear()
+    message_search().clear()
@@ -0,0 +1,262 @@
+"""app/seed.py
+
+Streaming, resumable loader for the sample CSVs.
+
+`load_seed` reads each CSV in chunks of `chunk_size` rows and never holds more
+than one chunk in memory. Postgres chunks go in with `COPY ... FROM STDIN`;
+SQLite chunks go in with a single executemany `INSERT`. Each chunk is
+committed together with its row count in `seed_progress`. If a load dies
+part-way, running it again without `fresh` skips the rows already committed
+and carries on from the next chunk.
+
+Child rows refer to their parents by id, so a table with a generated
+primary key (users, messages) must be loaded with explicit ids. A
+database sequence is not a safe substitute: a rolled-back COPY still
+uses up sequence values, and every later row would get a shifted id.
+Once loading is done, `finish` moves the Postgres sequences past the
+loaded ids. A load is never resumed into a table that already holds rows
+the loader did not record.
+
+Secondary indexes, the search indexes and the counter triggers are dropped
+before loading. Maintaining them row by row would cost more than the load
+itself. Once every file is in, `finish` builds them once, recomputes the
+counters, and rebuilds the search indexes and home timelines. `finish` is
+idempotent, so a load that fails during this step can simply be re-run.
+"""
+
+import csv
+import io
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterator, NamedTuple
+from sqlalchemy import Column, DDL, DateTime, Integer, MetaData, Table, Text, select, insert, update, text
+from app.models import db, User, Message, follows, likes
+from app.counters import drop_trigger_ddl, sqlite_trigger_ddl, postgresql_trigger_ddl, reconcile_counters
+from app.search import POSTGRESQL_DDL, POSTGRESQL_INDEXES, reindex_users, reindex_messages
+from app.timeline import rebuild_timelines
+
+# Kept out of db.metadata: it belongs to the loader, not to the application schema
+seed_progress = Table(
+    'seed_progress', MetaData(),
+    Column('table_name', Text, primary_key=True),
+    Column('source', Text, nullable=False),
+    Column('rows_loaded', Integer, nullable=False, default=0),
+)
+
+
+class SeedFile(NamedTuple):
+    """A CSV to load into `table`; its header names the columns."""
+    table: Table
+    path: str
+
+
+def seed_files(users: str, messages: str, follows_path: str, likes_path: str | None = None) -> list[SeedFile]:
+    """Return the sample CSVs in load order (parents before children); likes are optional."""
+    files = [SeedFile(User.__table__, users), SeedFile(Message.__table__, messages), SeedFile(follows, follows_path)]
+    if likes_path:
+        files.append(SeedFile(likes, likes_path))
+    return files
+
+
+def _header(path: str, table: Table) -> list[str]:
+    """Return the header of `path`, checked against `table`.
+
+    Raises:
+        ValueError: If the header names a column `table` does not have, or
+            lacks the table's generated primary key.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        header = next(csv.reader(file), None) or []
+    unknown = set(header) - set(table.c.keys())
+    if not header or unknown:
+        raise ValueError(f"{path}: columns not in '{table.name}': {', '.join(sorted(unknown)) or '(no header)'}")
+    key = table.autoincrement_column
+    if key is not None and key.name not in header:
+        raise ValueError(f"{path}: no '{key.name}' column; other files refer to '{table.name}' rows by id, "
+                         f"so ids must be explicit (regenerate with app/generator/create_csvs.py).")
+    return header
+
+
+def _records(path: str, table: Table) -> tuple[list[str], Iterator[list[str]]]:
+    """Return the checked header of `path` and an iterator over its rows."""
+    header = _header(path, table)
+
+    def rows():
+        with open(path, newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader)
+            yield from reader
+    return header, rows()
+
+
+def _copy_chunk(table: Table, columns: list[str], chunk: list[list[str]]) -> None:
+    """Load a chunk through Postgres `COPY FROM STDIN`; empty fields become NULL."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(chunk)
+    buffer.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_chunk(table: Table, columns: list[str], chunk: list[list[str]]) -> None:
+    """Load a chunk with one executemany INSERT, mirroring COPY's handling of empty fields."""
+    dates = {name for name in columns if isinstance(table.c[name].type, DateTime)}
+    records = [
+        {name: (None if value == '' else datetime.fromisoformat(value) if name in dates else value)
+         for name, value in zip(columns, row)}
+        for row in chunk
+    ]
+    db.session.execute(insert(table), records)
+
+
+def _defer_indexes(tables: list[Table]) -> None:
+    """Drop secondary indexes and counter triggers for the duration of the load."""
+    bind = db.session.connection()
+    for table in tables:
+        for index in table.indexes:
+            # IF EXISTS rather than checkfirst: SQLite's inspector misses expression indexes
+            bind.execute(DDL(f"DROP INDEX IF EXISTS {index.name}"))
+    if bind.dialect.name == 'postgresql':
+        for name in POSTGRESQL_INDEXES:
+            bind.execute(DDL(f"DROP INDEX IF EXISTS {name}"))
+    for statement in drop_trigger_ddl(bind.dialect.name):
+        bind.execute(DDL(statement))
+    db.session.commit()
+
+
+def _check_unrecorded(table: Table) -> None:
+    """Refuse to load into `table` if it holds rows no recorded load accounts for.
+
+    Raises:
+        ValueError: If `table` has rows but no `seed_progress` entry.
+    """
+    recorded = db.session.execute(select(seed_progress.c.table_name)
+                                  .where(seed_progress.c.table_name == table.name)).first()
+    if recorded is None and db.session.execute(select(1).select_from(table).limit(1)).first():
+        raise ValueError(f"'{table.name}' already has rows that no seed load recorded; load with fresh=True.")
+
+
+def _progress_row(table: Table, path: str, fresh: bool) -> int:
+    """Return how many rows of `path` are already loaded into `table`.
+
+    Raises:
+        ValueError: If an unfinished load of a different file is recorded for
+            `table`, or `table` has rows no recorded load accounts for.
+    """
+    row = db.session.execute(
+        select(seed_progress.c.source, seed_progress.c.rows_loaded).where(seed_progress.c.table_name == table.name)
+    ).first()
+    if row is None and not fresh:
+        _check_unrecorded(table)
+    if row is None:
+        db.session.execute(insert(seed_progress).values(table_name=table.name, source=path, rows_loaded=0))
+        return 0
+    if fresh:
+        db.session.execute(update(seed_progress).where(seed_progress.c.table_name == table.name)
+                           .values(source=path, rows_loaded=0))
+        return 0
+    if row.source != path:
+        raise ValueError(f"'{table.name}' was being loaded from {row.source}, not {path}; load with fresh=True.")
+    return row.rows_loaded
+
+
+def _commit_chunk(table: Table, columns: list[str], chunk: list[list[str]], loaded_before: int) -> None:
+    """Load a chunk and advance its checkpoint in the same transaction."""
+    load_chunk = _copy_chunk if db.engine.dialect.name == 'postgresql' else _insert_chunk
+    try:
+        load_chunk(table, columns, chunk)
+        db.session.execute(update(seed_progress).where(seed_progress.c.table_name == table.name)
+                           .values(rows_loaded=loaded_before + len(chunk)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def load_file(seed: SeedFile, chunk_size: int = 10000, fresh: bool = False,
+              progress: Callable[[str, int, float], None] | None = None) -> int:
+    """Stream one CSV into its table, committing a checkpoint after every chunk.
+
+    Args:
+        seed (SeedFile): The table and CSV to load.
+        chunk_size (int): Rows per COPY/INSERT and per commit.
+        fresh (bool): Ignore any recorded progress and start from the first row.
+        progress: Called after each chunk with the table name, rows loaded so
+            far and rows per second for this run.
+
+    Returns:
+        int: Rows loaded by this call, not counting rows skipped on resume.
+    """
+    table, path = seed
+    header, rows = _records(path, table)
+    done = _progress_row(table, path, fresh)
+    db.session.commit()
+    rows = islice(rows, done, None)
+
+    loaded, started = 0, time.monotonic()
+    while chunk := list(islice(rows, chunk_size)):
+        _commit_chunk(table, header, chunk, done + loaded)
+        loaded += len(chunk)
+        if progress:
+            progress(table.name, done + loaded, loaded / max(time.monotonic() - started, 1e-9))
+    return loaded
+
+
+def finish(batch_size: int = 1000) -> None:
+    """Rebuild everything `_defer_indexes` dropped and every derived table."""
+    bind = db.session.connection()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+    if bind.dialect.name == 'postgresql':
+        statements = POSTGRESQL_DDL + postgresql_trigger_ddl()
+    else:
+        statements = sqlite_trigger_ddl()
+    for statement in statements:
+        bind.execute(DDL(statement))
+    if bind.dialect.name == 'postgresql':
+        # Explicit ids bypass the sequences; start new rows after the loaded ones
+        for table in db.metadata.sorted_tables:
+            key = table.autoincrement_column
+            if key is not None:
+                bind.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', '{key.name}'), "
+                                  f"coalesce(max({key.name}), 0) + 1, false) FROM {table.name}"))
+    db.session.commit()
+
+    reconcile_counters(batch_size=batch_size)
+    reindex_users(batch_size=batch_size)
+    reindex_messages(batch_size=batch_size)
+    rebuild_timelines()
+
+
+def load_seed(files: list[SeedFile], chunk_size: int = 10000, fresh: bool = False,
+              progress: Callable[[str, int, float], None] | None = None) -> dict[str, int]:
+    """Load every CSV, resuming a previous run unless `fresh`, then rebuild indexes.
+
+    With `fresh`, every table is dropped and recreated first, like the old
+    seed script did.
+
+    Returns:
+        dict[str, int]: Rows loaded by this run, per table.
+    """
+    for seed in files:
+        _header(seed.path, seed.table)
+    if fresh:
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    seed_progress.create(db.engine, checkfirst=True)
+    if not fresh:
+        # Before anything is dropped, so a refused load leaves the database as it was
+        for seed in files:
+            _check_unrecorded(seed.table)
+        db.session.commit()
+    _defer_indexes([seed.table for seed in files])
+
+    loaded = {seed.table.name: load_file(seed, chunk_size, fresh, progress) for seed in files}
+    finish()
+    return loaded
@@ -1,8 +1,10 @@
 """app/test/conftest.py"""
 
 import pytest
+from flask import g
 from app import create_app, db
 from app.models import User, Message
+from app.search import clear_indexes
 
 @pytest.fixture(scope="module")
 def app():
@@ -37,3 +39,32 @@ def setup_users():
     db.session.add_all([user1, user2])
     db.session.commit()
     return user1, user2
+
+
+@pytest.fixture
+def clean_db(app):
+    """Empty every table before the test runs."""
+    db.session.rollback()
+    db.session.expunge_all()
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    clear_indexes()
+    db.session.commit()
+    # The module-wide app context outlives requests, so drop the user
+    # Flask-Login cached on `g` by an earlier test's request
+    g.pop('_login_user', None)
+    yield
+    db.session.rollback()
+
+
+@pytest.fixture
+def make_users(clean_db):
+    """Return a factory that commits one user per username and returns them in order."""
+    def make(*usernames):
+        users = [User(username=name, email=f"{name}@example.com") for name in usernames]
+        for user in users:
+            user.set_password("password123")
+        db.session.add_all(users)
+        db.session.commit()
+        return users
+    return make
@@ -0,0 +1,32 @@
+"""app/test/test_app_factory.py"""
+
+import sys
+import subprocess
+import pytest
+from app import create_app
+from app.config.settings import DevelopmentConfig, ProductionConfig
+
+
+class TestAppFactory:
+    def test_production_app_is_lean(self, monkeypatch, capsys):
+        """Does the production app skip debug extensions and Alembic, and print nothing?"""
+        monkeypatch.setattr(ProductionConfig, 'SQLALCHEMY_DATABASE_URI', 'sqlite://')
+        app = create_app('production')
+        assert 'debugtoolbar' not in app.extensions
+        assert 'migrate' not in app.extensions  # Only built for `flask` CLI commands
+        assert capsys.readouterr() == ('', '')
+
+    def test_missing_database_url_fails_at_create_app(self, monkeypatch):
+        """Is a missing database URL reported when the app is built, not when settings are imported?"""
+        monkeypatch.setattr(DevelopmentConfig, 'SQLALCHEMY_DATABASE_URI', None)
+        with pytest.raises(RuntimeError, match="DEV_DATABASE_URL"):
+            create_app('development')
+
+    def test_import_has_no_side_effects(self):
+        """Can the package be imported without database settings, silently and without Alembic?"""
+        code = ("import sys, app; "
+                "assert 'alembic' not in sys.modules and 'flask_debugtoolbar' not in sys.modules")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                env={'PATH': '', 'PYTHONPATH': '.'})
+        assert result.returncode == 0, result.stderr
+        assert result.stdout == result.stderr == ''
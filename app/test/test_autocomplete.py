@@ -0,0 +1,54 @@
+"""app/test/test_autocomplete.py"""
+
+import pytest
+from app.models import db, User
+from app.autocomplete import UsernameIndex, autocomplete
+
+
+class TestUsernameIndex:
+    @pytest.fixture
+    def index(self):
+        return UsernameIndex([("robin", 1), ("Rob", 2), ("alice", 3), ("robinson", 4), ("bob", 5)])
+
+    def test_prefix_ignores_case(self, index):
+        """Are prefix matches returned case-insensitively in alphabetical order?"""
+        assert index.complete("rob") == [(2, "Rob"), (1, "robin"), (4, "robinson")]
+        assert index.complete("ROBI", limit=1) == [(1, "robin")]
+        assert index.complete("z") == [] and index.complete("") == []
+
+    def test_overlay_and_compact(self, index):
+        """Do additions, renames and removals show up before and after compaction?"""
+        index.add(6, "robert")
+        index.add(1, "rosalind")  # rename of robin
+        index.remove(4)
+        expected = [(2, "Rob"), (6, "robert"), (1, "rosalind")]
+        assert index.complete("ro") == expected
+        assert index.pending()
+
+        index.compact()
+        assert index.pending() == 0
+        assert index.complete("ro") == expected
+        assert len(index.ids) == 5
+
+
+class TestAutocompleteEndpoint:
+    @pytest.fixture
+    def users(self, clean_db):
+        users = [User.signup(username=name, email=f"{name}@example.com", password="password123")
+                 for name in ("martin", "marta", "mary")]
+        autocomplete.reset()
+        yield users
+        autocomplete.reset()
+
+    def test_endpoint_follows_registrations_and_deletes(self, app, users):
+        """Does the endpoint answer from the index and track later registrations and deletions?"""
+        client = app.test_client()
+        assert client.get("/users/autocomplete?q=mart").json == {
+            'users': [{'id': users[1].id, 'username': "marta"}, {'id': users[0].id, 'username': "martin"}],
+        }
+
+        marty = User.signup(username="marty", email="marty@example.com", password="password123")
+        autocomplete.remove_user(users[0].id)
+        response = client.get("/users/autocomplete?q=MART")
+        assert [user['username'] for user in response.json['users']] == ["marta", "marty"]
+        assert marty.id in {user['id'] for user in response.json['users']}
@@ -0,0 +1,65 @@
+"""app/test/test_bulk_import.py"""
+
+import io
+import pytest
+from app.models import db, User
+from app.bulk_import import ImportRow, Conflict, import_users, read_csv, _insert_rows
+from app.search import search_users
+
+
+class TestBulkImport:
+    @pytest.fixture
+    def existing(self, clean_db):
+        return User.signup(username="taken", email="taken@example.com", password="password123").id
+
+    def test_imports_and_reports_conflicts(self, existing):
+        """Are valid rows created in chunks and every rejected row reported with its line?"""
+        rows = [
+            ImportRow(2, "ann", "ann@example.com", "secret-ann"),
+            ImportRow(3, "taken", "new@example.com", "secret"),
+            ImportRow(4, "ben", "taken@example.com", "secret"),
+            ImportRow(5, "ann", "ann2@example.com", "secret"),
+            ImportRow(6, "", "blank@example.com", "secret"),
+            ImportRow(7, "cat", "cat@example.com", "secret-cat", "/static/images/cat.png"),
+        ]
+        report = import_users(rows, chunk_size=2, processes=2)
+
+        assert report.created == 2
+        assert report.conflicts == [
+            Conflict(3, "taken", "username already taken"),
+            Conflict(4, "ben", "email already taken"),
+            Conflict(5, "ann", "duplicate username in file"),
+            Conflict(6, "", "username, email and password are required"),
+        ]
+        ann = User.query.filter_by(username="ann").one()
+        assert ann.check_password("secret-ann") and ann.image_url == "/static/images/default-pic.png"
+        assert User.query.filter_by(username="cat").one().image_url == "/static/images/cat.png"
+        assert [user.username for user in search_users("ann").items] == ["ann"]
+
+    def test_read_csv(self):
+        """Are CSV rows numbered by line, and a missing column rejected up front?"""
+        rows = list(read_csv(io.StringIO("username,email,password\n dee ,dee@example.com,pw123456\n")))
+        assert rows == [ImportRow(2, "dee", "dee@example.com", "pw123456", None)]
+        with pytest.raises(ValueError):
+            list(read_csv(io.StringIO("username,email\nx,y\n")))
+
+    def test_command(self, app, existing, tmp_path):
+        """Does the CLI import a file and write a conflict report?"""
+        source = tmp_path / "users.csv"
+        source.write_text("username,email,password\neve,eve@example.com,password1\ntaken,t2@example.com,password2\n")
+        report = tmp_path / "rejected.csv"
+        result = app.test_cli_runner().invoke(args=["import-users", str(source), "--processes", "1",
+                                                    "--report", str(report)])
+        assert "1 created, 1 rejected" in result.output
+        assert report.read_text().splitlines()[1] == "3,taken,username already taken"
+
+    def test_race_falls_back_to_per_row_inserts(self, existing):
+        """If a name is taken after the uniqueness check, is only that row rejected?"""
+        records = [{'username': "fay", 'email': "fay@example.com", 'password': "x"},
+                   {'username': "taken", 'email': "late@example.com", 'password': "x"}]
+        rows = [ImportRow(2, "fay", "fay@example.com", "x"), ImportRow(3, "taken", "late@example.com", "x")]
+        conflicts = []
+        assert _insert_rows(records, rows, conflicts) == records[:1]
+        assert conflicts == [Conflict(3, "taken", "username or email already taken")]
+        db.session.commit()
+        assert User.query.filter_by(username="fay").count() == 1
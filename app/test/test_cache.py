@@ -0,0 +1,127 @@
+"""app/test/test_cache.py"""
+
+import pytest
+from flask import g
+from app.cache import CacheBackend, LocalCache, TimelineCache
+from app.models import db, User, Message, likes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalCache:
+    def test_lru_eviction(self):
+        """Is the least recently used entry evicted once the cache is full?"""
+        cache = LocalCache(max_entries=2, default_ttl=0)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Do entries expire after their TTL?"""
+        clock = FakeClock()
+        cache = LocalCache(default_ttl=10, clock=clock)
+        cache.set("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+
+class TestCacheBackend:
+    def test_missing_override_fails_at_instantiation(self):
+        """Does a backend that skips part of the interface fail when created, not when called?"""
+        class Partial(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError, match="abstract"):
+            Partial()
+
+
+class TestTimelineCache:
+    @pytest.fixture
+    def cache(self):
+        cache = TimelineCache()
+        cache.backend = LocalCache(max_entries=100, default_ttl=60)
+        return cache
+
+    def test_hit_after_miss(self, cache):
+        """Is a loaded page served from cache on the next lookup?"""
+        calls = []
+        load = lambda: calls.append(1) or ["page"]
+        assert cache.cached_page("feed", 1, None, load) == ["page"]
+        assert cache.cached_page("feed", 1, None, load) == ["page"]
+        assert len(calls) == 1
+        assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+    def test_invalidate_is_targeted(self, cache):
+        """Does invalidating one user's feed leave other pages cached?"""
+        cache.cached_page("feed", 1, None, lambda: "old feed 1")
+        cache.cached_page("feed", 2, None, lambda: "feed 2")
+        cache.cached_page("profile", 1, None, lambda: "profile 1")
+
+        cache.invalidate("feed", 1)
+
+        assert cache.cached_page("feed", 1, None, lambda: "new feed 1") == "new feed 1"
+        assert cache.cached_page("feed", 2, None, lambda: "reloaded") == "feed 2"
+        assert cache.cached_page("profile", 1, None, lambda: "reloaded") == "profile 1"
+
+    def test_page_loaded_during_invalidation_is_not_served(self, cache):
+        """Is a page computed across an invalidation stored under the old version?"""
+        def load():
+            cache.invalidate("feed", 1)  # a write lands while the page is computed
+            return "stale"
+
+        cache.cached_page("feed", 1, None, load)
+        assert cache.cached_page("feed", 1, None, lambda: "fresh") == "fresh"
+
+
+class TestAuthorChanges:
+    @pytest.fixture
+    def users(self, clean_db):
+        author, follower, liker = (User.signup(username=name, email=f"{name}@example.com", password="password123")
+                                   for name in ("wren", "follower", "liker"))
+        db.session.commit()
+        follower.following.append(author)
+        db.session.commit()
+        return author.id, follower.id, liker.id
+
+    def client_for(self, app, user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        # Requests share the module-wide app context; drop the cached user
+        g.pop('_login_user', None)
+        return client
+
+    def get(self, app, user_id, url):
+        return self.client_for(app, user_id).get(url).get_data(as_text=True)
+
+    def test_rename_reaches_cached_pages(self, app, users):
+        """After a profile edit, do cached feeds and likes pages show the author's new name?"""
+        author, follower, liker = users
+        self.client_for(app, author).post("/messages/messages/new", data={"text": "signed warble"})
+        message = db.session.execute(db.select(Message.id)).scalar_one()
+        db.session.execute(db.insert(likes).values(user_id=liker, message_id=message))
+        db.session.commit()
+        pages = [(follower, "/"), (liker, f"/users/users/{liker}/likes")]
+        for user_id, url in pages:
+            assert "wren" in self.get(app, user_id, url)
+
+        self.client_for(app, author).post("/auth/users/profile", data={"username": "finch", "email": "wren@example.com"})
+
+        for user_id, url in pages:
+            page = self.get(app, user_id, url)
+            assert "finch" in page and "wren" not in page
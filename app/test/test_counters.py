@@ -0,0 +1,63 @@
+"""app/test/test_counters.py"""
+
+import pytest
+from sqlalchemy import update
+from app.models import db, User, Message
+from app.counters import reconcile_counters
+
+
+class TestCounters:
+    @pytest.fixture
+    def users(self, make_users):
+        return make_users("alice", "bob")
+
+    def test_message_and_follow_counters(self, users):
+        """Do posting, deleting and following keep the user counters current?"""
+        alice, bob = users
+        msg = Message(text="hello", user_id=alice.id)
+        db.session.add_all([msg, Message(text="again", user_id=alice.id)])
+        bob.following.append(alice)
+        db.session.commit()
+
+        assert (alice.messages_count, alice.followers_count, alice.following_count) == (2, 1, 0)
+        assert (bob.messages_count, bob.followers_count, bob.following_count) == (0, 0, 1)
+
+        db.session.delete(msg)
+        bob.following.remove(alice)
+        db.session.commit()
+
+        assert (alice.messages_count, alice.followers_count) == (1, 0)
+        assert bob.following_count == 0
+
+    def test_like_counters(self, users):
+        """Do likes and unlikes update both the user and the message?"""
+        alice, bob = users
+        msg = Message(text="hello", user_id=alice.id)
+        db.session.add(msg)
+        db.session.commit()
+
+        bob.like_message(msg)
+        db.session.commit()
+        assert (bob.likes_count, msg.likes_count) == (1, 1)
+
+        bob.unlike_message(msg)
+        db.session.commit()
+        assert (bob.likes_count, msg.likes_count) == (0, 0)
+
+    def test_reconcile_repairs_drift(self, users):
+        """Does reconciliation recompute counters that drifted?"""
+        alice, bob = users
+        msg = Message(text="hello", user_id=alice.id)
+        db.session.add(msg)
+        bob.following.append(alice)
+        bob.like_message(msg)
+        db.session.commit()
+
+        db.session.execute(update(User).values(messages_count=7, followers_count=7,
+                                               following_count=7, likes_count=7))
+        db.session.execute(update(Message).values(likes_count=7))
+        db.session.commit()
+
+        assert reconcile_counters(batch_size=1) == (2, 1)
+        assert (alice.messages_count, alice.followers_count, alice.likes_count) == (1, 1, 0)
+        assert (bob.following_count, bob.likes_count, msg.likes_count) == (1, 1, 1)
@@ -0,0 +1,39 @@
+"""app/test/test_feed.py"""
+
+import pytest
+from app.models import db, Message
+from app.feed import annotate_messages
+
+
+class TestFeedAnnotations:
+    @pytest.fixture
+    def setup(self, make_users):
+        users = make_users("fan0", "fan1", "fan2")
+
+        messages = [Message(text=f"warble {i}", user_id=users[0].id) for i in range(3)]
+        db.session.add_all(messages)
+        db.session.commit()
+
+        # msg0 liked by fan1 and fan2, msg1 liked by fan2, msg2 not liked
+        users[1].like_message(messages[0])
+        users[2].like_message(messages[0])
+        users[2].like_message(messages[1])
+        db.session.commit()
+        return users, messages
+
+    def test_like_counts(self, setup):
+        """Are like counts returned per message, omitting unliked messages?"""
+        _, messages = setup
+        annotations = annotate_messages(messages)
+        assert annotations.like_counts == {messages[0].id: 2, messages[1].id: 1}
+
+    def test_liked_ids_for_viewer(self, setup):
+        """Are only the viewer's own likes reported as liked?"""
+        users, messages = setup
+        assert annotate_messages(messages, users[1].id).liked_ids == {messages[0].id}
+        assert annotate_messages(messages, users[2].id).liked_ids == {messages[0].id, messages[1].id}
+        assert annotate_messages(messages, None).liked_ids == set()
+
+    def test_empty_page(self, clean_db):
+        """Does an empty page skip the query entirely?"""
+        assert annotate_messages([], 1) == ({}, set())
@@ -0,0 +1,128 @@
+"""app/test/test_follow_graph.py"""
+
+import pytest
+from flask import g
+from app.models import db, User
+from app.follow_graph import FollowGraph, follow_graph
+
+
+# 1 follows 2, 3; 2 follows 4, 5; 3 follows 4, 6; 5 follows 1
+EDGES = [(1, 2), (1, 3), (2, 4), (2, 5), (3, 4), (3, 6), (5, 1)]
+
+
+class TestFollowGraph:
+    @pytest.fixture
+    def graph(self):
+        return FollowGraph(EDGES, 7)
+
+    def test_adjacency(self, graph):
+        """Are both directions built from the sorted edge list?"""
+        assert list(graph.following.neighbors(1)) == [2, 3]
+        assert list(graph.followers.neighbors(4)) == [2, 3]
+        assert list(graph.following.neighbors(6)) == []
+        assert list(graph.following.neighbors(99)) == []
+        assert graph.is_following(5, 1) and not graph.is_following(1, 5)
+
+    def test_overlay_and_compact(self, graph):
+        """Do recorded follows and unfollows read the same before and after compaction?"""
+        graph.add_edge(6, 1)
+        graph.add_edge(8, 2)
+        graph.remove_edge(1, 3)
+        graph.remove_edge(1, 3)
+        assert graph.pending() == 3
+
+        for _ in range(2):
+            assert list(graph.following.neighbors(1)) == [2]
+            assert list(graph.followers.neighbors(1)) == [5, 6]
+            assert list(graph.followers.neighbors(2)) == [1, 8]
+            assert graph.is_following(8, 2) and not graph.is_following(1, 3)
+            graph.compact()
+        assert graph.pending() == 0
+
+    def test_size_fits_the_edges(self):
+        """Does an id past the given size (a user who joined mid-build) still get its edges?"""
+        graph = FollowGraph(EDGES, 3)
+        assert list(graph.following.neighbors(5)) == [1]
+        assert list(graph.followers.neighbors(6)) == [3]
+        assert list(FollowGraph(reversed(EDGES)).following.neighbors(1)) == [2, 3]
+        assert list(FollowGraph([]).following.neighbors(1)) == []
+
+    def test_remove_user(self, graph):
+        """Does a deleted user drop out of both directions and of recommendations?"""
+        graph.remove_user(4)
+        assert list(graph.followers.neighbors(4)) == []
+        assert list(graph.following.neighbors(2)) == [5]
+        assert graph.recommend(1) == [(5, 1), (6, 1)]
+
+    def test_recommend(self, graph):
+        """Are two-hop accounts ranked by overlap, without self or already-followed accounts?"""
+        assert graph.recommend(1) == [(4, 2), (5, 1), (6, 1)]
+        assert graph.recommend(1, limit=1) == [(4, 2)]
+        assert graph.recommend(6) == []
+
+    def test_followers_you_know(self, graph):
+        """Does the viewer see which of a user's followers they follow?"""
+        assert graph.followers_you_know(1, 4) == (2, [2, 3])
+        assert graph.followers_you_know(1, 4, limit=1) == (2, [2])
+        assert graph.followers_you_know(5, 4) == (0, [])
+
+
+class TestFollowGraphIndex:
+    @pytest.fixture
+    def users(self, clean_db):
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(4)]
+        db.session.add_all(users)
+        db.session.commit()
+        me, one, two, three = users
+        me.following.extend([one, two])
+        one.following.append(three)
+        two.following.append(three)
+        db.session.commit()
+        follow_graph.reset()
+        yield users
+        follow_graph.reset()
+
+    def test_built_from_table_and_updated(self, app, users):
+        """Is the index built from `follows` and kept current by recorded edges?"""
+        me, one, two, three = users
+        assert follow_graph.graph.recommend(me.id) == [(three.id, 2)]
+        follow_graph.add_edge(me.id, three.id)
+        assert follow_graph.graph.recommend(me.id) == []
+
+    def test_recommendations_endpoint(self, app, users):
+        """Does the endpoint return ranked accounts with their overlap counts?"""
+        me, _, _, three = users
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(me.id)
+
+        response = client.get("/users/recommendations")
+        assert response.status_code == 200
+        assert response.get_json() == {'users': [{
+            'id': three.id, 'username': 'user3', 'image_url': three.image_url, 'followed_by_count': 2,
+        }]}
+
+    def test_full_overlay_rebuilds_in_background(self, app, users, monkeypatch):
+        """Past the threshold, is a rebuild started instead of compacting on the request thread?"""
+        me, one, two, three = users
+        graph = follow_graph.graph
+        monkeypatch.setattr(graph, 'compact', lambda: pytest.fail("compacted on the request thread"))
+        started = []
+        monkeypatch.setattr(follow_graph, '_start_rebuild', lambda: started.append(True))
+        monkeypatch.setattr(follow_graph, 'compact_threshold', 1)
+
+        follow_graph.add_edge(me.id, three.id)
+        assert started == []
+        follow_graph.add_edge(three.id, me.id)
+        assert started == [True]
+
+    def test_deleted_user_leaves_the_graph(self, app, users):
+        """Does deleting an account drop it from recommendations right away?"""
+        me, _, _, three = users
+        assert follow_graph.graph.recommend(me.id) == [(three.id, 2)]
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(three.id)
+        g.pop('_login_user', None)
+        client.post("/users/delete")
+        assert follow_graph.graph.recommend(me.id) == []
@@ -0,0 +1,64 @@
+"""app/test/test_follow_status.py"""
+
+import pytest
+from flask import g
+from flask_login import current_user
+from app.models import db, User, FollowStatus
+
+
+class TestFollowStatus:
+    @pytest.fixture
+    def users(self, make_users):
+        users = make_users("user0", "user1", "user2", "user3")
+
+        # user0 follows user1 and user2; user2 and user3 follow user0
+        me, one, two, three = users
+        me.following.extend([one, two])
+        two.following.append(me)
+        three.following.append(me)
+        db.session.commit()
+        return users
+
+    def test_follow_status(self, users):
+        """Are following, followed-by and mutual reported per user?"""
+        me, one, two, three = users
+        status = User.follow_status(me.id, [one.id, two.id, three.id])
+
+        assert status[one.id] == FollowStatus(following=True, followed_by=False)
+        assert status[two.id].mutual
+        assert status[three.id] == FollowStatus(following=False, followed_by=True)
+        assert not status[three.id].mutual
+
+    def test_unrelated_and_empty(self, users):
+        """Do unrelated users get an empty status, and does an empty list skip the query?"""
+        me, one, _, _ = users
+        assert User.follow_status(one.id, [one.id]) == {one.id: FollowStatus()}
+        assert User.follow_status(me.id, []) == {}
+
+    def test_followers_page(self, app, users):
+        """Does the followers page render each card's status from one lookup?"""
+        me, _, two, three = users
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(me.id)
+
+        response = client.get(f"/users/{me.id}/followers")
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert "Follows each other" in html and "Follows you" in html
+        assert f"/users/unfollow/{two.id}" in html
+        assert f"/users/follow/{three.id}" in html
+
+    def test_listing_keeps_the_principal_light(self, app, users):
+        """Does the status lookup use the cached principal's id instead of loading the viewer?"""
+        me = users[0]
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(me.id)
+        g.pop('_login_user', None)
+        client.get("/users/users")  # caches the principal
+
+        g.pop('_login_user', None)
+        with client:
+            assert client.get("/users/users").status_code == 200
+            assert current_user._get_current_object()._user is None
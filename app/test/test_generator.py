@@ -0,0 +1,49 @@
+"""app/test/test_generator.py"""
+
+import csv
+from collections import Counter
+import pytest
+from app.models import db, User, likes
+from app.generator.create_csvs import main
+from app.seed import seed_files, seed_progress, load_seed
+
+
+def read_rows(path):
+    with open(path, newline='') as file:
+        return list(csv.reader(file))[1:]
+
+
+class TestGenerator:
+    ARGS = ['--users', '200', '--messages', '500', '--follows', '3000', '--likes', '1000', '--chunk-size', '700']
+
+    @pytest.fixture
+    def generated(self, tmp_path):
+        main(self.ARGS + ['--out', str(tmp_path)])
+        return tmp_path
+
+    def test_deterministic(self, generated, tmp_path_factory):
+        """Do the same flags produce byte-identical files?"""
+        again = tmp_path_factory.mktemp('again')
+        main(self.ARGS + ['--out', str(again)])
+        for name in ('users', 'messages', 'follows', 'likes'):
+            assert (generated / f"{name}.csv").read_bytes() == (again / f"{name}.csv").read_bytes()
+
+    def test_pairs_are_unique_and_skewed(self, generated):
+        """Are follows and likes free of duplicates, and are followers concentrated on a few users?"""
+        follows = read_rows(generated / "follows.csv")
+        assert len(follows) == len({tuple(row) for row in follows}) == 3000
+        assert not any(followed == follower for followed, follower in follows)
+        likes_rows = read_rows(generated / "likes.csv")
+        assert len({(user_id, message_id) for user_id, message_id, _ in likes_rows}) == 1000
+
+        in_degree = sorted(Counter(followed for followed, _ in follows).values(), reverse=True)
+        assert sum(in_degree[:20]) > 3000 / 3  # The top 10% of users hold over a third of follows
+
+    def test_loads_with_seed(self, clean_db, generated):
+        """Does the generated data load through the seed loader, likes included?"""
+        seed_progress.drop(db.engine, checkfirst=True)
+        loaded = load_seed(seed_files(*(str(generated / f"{name}.csv")
+                                        for name in ('users', 'messages', 'follows', 'likes'))))
+        seed_progress.drop(db.engine, checkfirst=True)
+        assert loaded == {'users': 200, 'messages': 500, 'follows': 3000, 'likes': 1000}
+        assert sum(user.likes_count for user in User.query) == db.session.query(likes).count() == 1000
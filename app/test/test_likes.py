@@ -0,0 +1,38 @@
+"""app/test/test_likes.py"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Message, likes
+
+
+class TestLikesTable:
+    @pytest.fixture
+    def setup(self, make_users):
+        alice, bob = make_users("alice", "bob")
+        messages = [Message(text=f"warble {i}", user_id=alice.id) for i in range(2)]
+        db.session.add_all(messages)
+        db.session.commit()
+        return alice, bob, messages
+
+    def test_duplicate_like_rejected(self, setup):
+        """Does the (user_id, message_id) primary key reject a second identical like?"""
+        _, bob, messages = setup
+        db.session.execute(db.insert(likes).values(user_id=bob.id, message_id=messages[0].id))
+        with pytest.raises(IntegrityError):
+            db.session.execute(db.insert(likes).values(user_id=bob.id, message_id=messages[0].id))
+        db.session.rollback()
+
+    def test_likes_ordered_by_like_time(self, setup):
+        """Is `created_at` stamped so a user's likes can be listed newest-first?"""
+        _, bob, messages = setup
+        now = datetime.utcnow()
+        db.session.execute(db.insert(likes), [
+            {'user_id': bob.id, 'message_id': messages[0].id, 'created_at': now},
+            {'user_id': bob.id, 'message_id': messages[1].id, 'created_at': now - timedelta(hours=1)},
+        ])
+        db.session.commit()
+        liked = db.session.scalars(
+            db.select(likes.c.message_id).where(likes.c.user_id == bob.id).order_by(likes.c.created_at.desc())
+        ).all()
+        assert liked == [messages[0].id, messages[1].id]
@@ -0,0 +1,91 @@
+"""app/test/test_loading.py"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+from app.models import db, User, Message, likes
+from app.loading import FEED, PROFILE_CARD, AUTH_PRINCIPAL
+
+
+class TestLoadingProfiles:
+    @pytest.fixture
+    def user_ids(self, clean_db):
+        users = [User(username=f"user{i}", email=f"user{i}@example.com") for i in range(3)]
+        for user in users:
+            user.set_password("password123")
+        db.session.add_all(users)
+        db.session.commit()
+        for user in users:
+            db.session.add(Message(text=f"by {user.username}", user_id=user.id))
+        db.session.commit()
+        users[0].like_message(db.session.scalars(db.select(Message).limit(1)).one())
+        db.session.commit()
+        user_ids = [user.id for user in users]
+        db.session.expunge_all()
+        return user_ids
+
+    @pytest.fixture
+    def statements(self):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        yield statements
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    def test_likes_never_lazy_load(self, user_ids):
+        """Does touching `User.likes` without a profile raise instead of querying?"""
+        user = db.session.get(User, user_ids[0])
+        with pytest.raises(InvalidRequestError):
+            user.likes
+
+    def test_like_helpers(self, user_ids):
+        """Do the like helpers work without loading the collection?"""
+        user = db.session.get(User, user_ids[1])
+        msg = db.session.scalars(db.select(Message).where(Message.user_id == user_ids[0])).one()
+        assert not user.has_liked_message(msg)
+        user.like_message(msg)
+        user.like_message(msg)
+        assert user.has_liked_message(msg)
+        user.unlike_message(msg)
+        assert not user.has_liked_message(msg)
+
+    def test_deleting_a_user_removes_their_likes(self, user_ids):
+        """Do a deleted user's likes go with them, and the liked message's count drop?"""
+        msg = db.session.scalars(db.select(Message).where(Message.user_id == user_ids[0])).one()
+        liker = db.session.get(User, user_ids[1])
+        liker.like_message(msg)
+        db.session.commit()
+        assert db.session.get(Message, msg.id, populate_existing=True).likes_count == 2
+
+        db.session.delete(liker)
+        db.session.commit()
+
+        assert db.session.scalar(db.select(db.func.count()).select_from(likes)
+                                 .where(likes.c.user_id == user_ids[1])) == 0
+        assert db.session.get(Message, msg.id, populate_existing=True).likes_count == 1
+
+    def test_auth_principal_is_one_narrow_query(self, user_ids, statements):
+        """Is the logged-in user loaded in one query without likes or the password hash?"""
+        user = db.session.get(User, user_ids[0], options=AUTH_PRINCIPAL)
+        assert len(statements) == 1
+        assert 'JOIN likes' not in statements[0] and 'password' not in statements[0]
+        assert (user.username, user.likes_count) == ("user0", 1)
+        # Only the deferred hash costs another query; the fields above were loaded
+        assert user.password and len(statements) == 2
+
+    def test_feed_loads_authors_in_one_query(self, user_ids, statements):
+        """Does the feed profile load every author in a single extra query?"""
+        messages = Message.query.options(*FEED).all()
+        assert [msg.user.username for msg in messages] == ["user0", "user1", "user2"]
+        assert len(statements) == 2
+
+    def test_profile_card_loads_counters(self, user_ids):
+        """Does the profile card carry counters but refuse to load messages?"""
+        cards = User.query.options(*PROFILE_CARD).order_by(User.id).all()
+        assert [card.messages_count for card in cards] == [1, 1, 1]
+        assert cards[0].likes_count == 1
+        with pytest.raises(InvalidRequestError):
+            cards[0].messages
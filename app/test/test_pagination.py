@@ -0,0 +1,48 @@
+"""app/test/test_pagination.py"""
+
+import pytest
+from datetime import datetime, timedelta
+from app.models import db, User, Message
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_page
+
+
+class TestKeysetPagination:
+    @pytest.fixture
+    def messages(self, clean_db):
+        user = User(username="pager", email="pager@example.com")
+        user.set_password("password123")
+        db.session.add(user)
+        db.session.commit()
+
+        start = datetime(2024, 1, 1)
+        # Two messages share each timestamp to exercise the id tie-breaker
+        msgs = [Message(text=f"msg {i}", user_id=user.id, timestamp=start + timedelta(minutes=i // 2))
+                for i in range(7)]
+        db.session.add_all(msgs)
+        db.session.commit()
+        return msgs
+
+    def query(self):
+        return Message.query.order_by(Message.timestamp.desc(), Message.id.desc())
+
+    def test_cursor_round_trip(self):
+        """Does a cursor decode to the position it was built from?"""
+        when = datetime(2024, 5, 17, 8, 30, 1, 250)
+        assert decode_cursor(encode_cursor(when, 42)) == (when, 42)
+
+    def test_invalid_cursor(self):
+        """Is a malformed cursor rejected with ValueError?"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_pages_cover_every_message_once(self, messages):
+        """Does walking the cursors visit each message exactly once, newest first?"""
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(self.query(), Message.timestamp, Message.id, cursor, 3)
+            seen.extend(page)
+            if cursor is None:
+                break
+
+        assert [m.id for m in seen] == [m.id for m in self.query().all()]
+        assert len(seen) == len(messages)
@@ -0,0 +1,82 @@
+"""app/test/test_passwords.py"""
+
+import os
+import threading
+import pytest
+from flask import g
+from app.models import db, User
+from app.passwords import password_hasher, hash_cost, default_hash_workers, PasswordHasherBusy
+
+
+class TestPasswordHasher:
+    @pytest.fixture
+    def user(self, clean_db):
+        user = User.signup(username="hasher", email="hasher@example.com", password="password123")
+        yield user
+        password_hasher.rounds = 4
+
+    def test_hash_uses_configured_cost(self, app, user):
+        """Are new hashes made at BCRYPT_LOG_ROUNDS and verified off-thread?"""
+        assert hash_cost(user.password) == app.config['BCRYPT_LOG_ROUNDS'] == 4
+        assert user.check_password("password123")
+        assert not user.check_password("wrong")
+        assert hash_cost("plaintext") is None and not password_hasher.check("plaintext", "plaintext")
+
+    def test_login_rehashes_at_new_cost(self, app, user):
+        """Does a successful login transparently re-hash a password stored at another cost?"""
+        password_hasher.rounds = 5
+        client = app.test_client()
+        client.post("/auth/login", data={"username": "hasher", "password": "wrong"})
+        assert hash_cost(db.session.get(User, user.id).password) == 4
+
+        response = client.post("/auth/login", data={"username": "hasher", "password": "password123"})
+        assert response.status_code == 302
+        db.session.expire_all()
+        stored = db.session.get(User, user.id).password
+        assert hash_cost(stored) == 5 and password_hasher.check(stored, "password123")
+
+    @pytest.fixture
+    def saturated(self):
+        slots = password_hasher._slots
+        password_hasher._slots = threading.BoundedSemaphore(1)
+        password_hasher._slots.acquire()
+        yield
+        password_hasher._slots = slots
+
+    def test_default_workers_leave_half_the_cores(self, monkeypatch):
+        """Does the default hashing pool split half the cores between the gunicorn workers?"""
+        monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+        monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+        assert default_hash_workers() == 4
+        monkeypatch.setenv('WEB_CONCURRENCY', "2")
+        assert default_hash_workers() == 2
+        monkeypatch.setenv('WEB_CONCURRENCY', "16")
+        assert default_hash_workers() == 1
+
+    def test_saturated_hasher_sheds_signups_and_confirmations(self, app, user, saturated):
+        """Do sign-ups and password confirmations also answer 503 instead of failing or queueing?"""
+        client = app.test_client()
+        response = client.post("/auth/register", data={"username": "newbie", "email": "newbie@example.com",
+                                                       "password": "password123",
+                                                       "confirm_password": "password123"})
+        assert response.status_code == 503
+        assert User.query.filter_by(username="newbie").first() is None
+
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+        g.pop('_login_user', None)
+        response = client.post(f"/users/{user.id}/confirm-password", data={"password": "password123"})
+        assert response.status_code == 503
+
+    def test_saturated_hasher_sheds_logins(self, app, user):
+        """Are logins refused with a 503 instead of queueing when every slot is taken?"""
+        slots = password_hasher._slots
+        password_hasher._slots = threading.BoundedSemaphore(1)
+        password_hasher._slots.acquire()
+        try:
+            with pytest.raises(PasswordHasherBusy):
+                user.check_password("password123")
+            response = app.test_client().post("/auth/login", data={"username": "hasher", "password": "password123"})
+            assert response.status_code == 503
+        finally:
+            password_hasher._slots = slots
@@ -0,0 +1,54 @@
+"""app/test/test_pool.py"""
+
+import pytest
+from sqlalchemy import create_engine, exc
+from app.pool import TimedQueuePool, TimedNullPool, engine_options, describe_pool
+
+CONFIG = {'DB_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 2, 'DB_POOL_TIMEOUT': 5, 'DB_POOL_RECYCLE': 600,
+          'DB_POOL_PRE_PING': True, 'DB_CONNECT_TIMEOUT': 4, 'DB_STATEMENT_TIMEOUT': 2000}
+
+
+class TestEngineOptions:
+    def test_postgres(self):
+        """Are pool sizing and timeouts taken from the DB_* settings?"""
+        options = engine_options(CONFIG, "postgresql://warbler@db/warbler")
+        assert options['poolclass'] is TimedQueuePool
+        assert (options['pool_size'], options['max_overflow'], options['pool_timeout'],
+                options['pool_recycle']) == (3, 2, 5, 600)
+        assert options['connect_args'] == {'connect_timeout': 4, 'options': "-c statement_timeout=2000"}
+
+    def test_pgbouncer(self):
+        """Does PgBouncer mode drop the app-side pool and the startup options PgBouncer rejects?"""
+        options = engine_options({**CONFIG, 'DB_PGBOUNCER': True}, "postgresql://warbler@pgbouncer/warbler")
+        assert options['poolclass'] is TimedNullPool and 'pool_size' not in options
+        assert options['connect_args'] == {'connect_timeout': 4}
+
+    def test_in_memory_sqlite_keeps_defaults(self):
+        assert engine_options(CONFIG, "sqlite://") == {}
+
+
+class TestPoolStats:
+    def test_counts_checkouts_overflow_and_timeouts(self, tmp_path):
+        """Are live checkouts, overflow and timed-out waits reported?"""
+        options = engine_options({**CONFIG, 'DB_POOL_SIZE': 1, 'DB_MAX_OVERFLOW': 1, 'DB_POOL_TIMEOUT': 0.05},
+                                 f"sqlite:///{tmp_path / 'pool.db'}")
+        engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **options)
+        first, second = engine.connect(), engine.connect()
+
+        state = describe_pool(engine.pool)
+        assert (state['checked_out'], state['overflow'], state['checkouts']) == (2, 1, 2)
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        state = describe_pool(engine.pool)
+        assert state['timeouts'] == 1 and state['wait_ms_max'] >= 50
+
+        first.close()
+        second.close()
+        assert describe_pool(engine.pool)['checked_out'] == 0
+        engine.dispose()
+
+    def test_endpoint(self, app, client):
+        """Does /internal/pool-stats report the default database?"""
+        response = client.get('/internal/pool-stats')
+        assert response.status_code == 200
+        assert 'class' in response.get_json()['default']
@@ -0,0 +1,152 @@
+"""app/test/test_principal.py"""
+
+import pytest
+from flask import g, session
+from werkzeug.exceptions import HTTPException
+from flask_login import current_user
+from sqlalchemy import event
+from app.models import db, User
+from app.principal import Principal, invalidate_principal, revocations
+from app.autocomplete import autocomplete
+from app.cache import timeline_cache, LocalCache, NullCache
+
+
+class TestPrincipal:
+    @pytest.fixture
+    def user(self, clean_db):
+        user = User.signup(username="principal", email="principal@example.com", password="password123")
+        user.bio = "Cached, mostly."
+        db.session.commit()
+        autocomplete.reset()
+        return user.id
+
+    @pytest.fixture
+    def statements(self, app):
+        seen = []
+        listener = lambda *args: seen.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        yield seen
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    def client_for(self, app, user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        return client
+
+    def get(self, client, url):
+        # Requests share the module-wide app context, so make Flask-Login
+        # call load_user again as it would on a fresh request
+        g.pop('_login_user', None)
+        return client.get(url)
+
+    def test_cached_principal_skips_database(self, app, user, statements):
+        """Once cached, does authenticating a request run no queries at all?"""
+        client = self.client_for(app, user)
+        self.get(client, "/users/autocomplete?q=pr")  # caches the principal, builds the index
+        statements.clear()
+
+        with client:
+            self.get(client, "/users/autocomplete?q=pr")
+            assert isinstance(current_user._get_current_object(), Principal)
+            assert current_user.username == "principal"
+        assert statements == []
+
+    def test_hydrates_on_demand(self, app, user, statements):
+        """Do attributes beyond the principal's columns load the full user once?"""
+        client = self.client_for(app, user)
+        self.get(client, "/users/autocomplete?q=pr")
+        with client:
+            self.get(client, "/users/autocomplete?q=pr")
+            statements.clear()
+            assert current_user.bio == "Cached, mostly."
+            assert current_user.messages_count == 0
+        assert len(statements) == 1
+
+    def test_invalidated_by_profile_change_and_delete(self, app, user):
+        """Do other sessions pick up a rename, and lose the login once the account is deleted?"""
+        client = self.client_for(app, user)
+        self.get(client, "/users/autocomplete?q=pr")
+
+        db.session.get(User, user).username = "renamed"
+        db.session.commit()
+        invalidate_principal(user)
+        with client:
+            self.get(client, "/users/autocomplete?q=re")
+            assert current_user.username == "renamed"
+
+        db.session.delete(db.session.get(User, user))
+        db.session.commit()
+        invalidate_principal(user)
+        with client:
+            self.get(client, "/users/autocomplete?q=re")
+            assert not current_user.is_authenticated
+
+    @pytest.fixture
+    def workers(self, app):
+        """Two independent local revocation backends, standing in for two worker processes."""
+        original = revocations.backend
+        yield LocalCache(), LocalCache()
+        revocations.backend = original
+
+    def test_alternating_workers_keep_the_principal(self, app, user, statements, workers):
+        """Do requests hopping between workers neither reload the principal nor rewrite the cookie?"""
+        client = self.client_for(app, user)
+        revocations.backend = workers[0]
+        self.get(client, "/users/autocomplete?q=pr")
+        statements.clear()
+
+        for worker in workers * 3:
+            revocations.backend = worker
+            response = self.get(client, "/users/autocomplete?q=pr")
+            assert 'Set-Cookie' not in response.headers
+        assert not [s for s in statements if "FROM users" in s and "users.image_url" in s]
+
+    def test_revocation_reaches_sessions_on_that_worker(self, app, user, workers):
+        """Does a rename reload the principal on the worker that revoked it, and nowhere else early?"""
+        client = self.client_for(app, user)
+        revocations.backend = workers[0]
+        self.get(client, "/users/autocomplete?q=pr")
+
+        db.session.get(User, user).username = "renamed"
+        db.session.commit()
+        revocations.backend = workers[1]
+        invalidate_principal(user)
+        revocations.backend = workers[0]
+        with client:
+            self.get(client, "/users/autocomplete?q=pr")
+            assert current_user.username == "principal"  # until the TTL runs out
+        revocations.backend = workers[1]
+        with client:
+            self.get(client, "/users/autocomplete?q=re")
+            assert current_user.username == "renamed"
+
+    def test_null_backend_keeps_the_principal(self, app, user, workers):
+        """With caching off, is the principal still cached in the session until its TTL?"""
+        revocations.backend = NullCache()
+        client = self.client_for(app, user)
+        self.get(client, "/users/autocomplete?q=pr")
+        assert 'Set-Cookie' not in self.get(client, "/users/autocomplete?q=pr").headers
+
+    def test_revocations_stay_out_of_cache_stats(self, app, user):
+        """Does authenticating a request leave the timeline cache's counters alone?"""
+        client = self.client_for(app, user)
+        before = timeline_cache.backend.stats()
+        for _ in range(3):
+            self.get(client, "/users/autocomplete?q=pr")
+        invalidate_principal(user)
+        assert timeline_cache.backend.stats() == before
+
+    def test_deleted_user_is_logged_out_on_hydration(self, app, user):
+        """Does needing the full user of a deleted account log the session out instead of failing?"""
+        client = self.client_for(app, user)
+        self.get(client, "/users/autocomplete?q=pr")
+        db.session.delete(db.session.get(User, user))
+        db.session.commit()
+
+        with client:
+            self.get(client, "/users/autocomplete?q=pr")
+            with pytest.raises(HTTPException) as raised:
+                current_user.bio
+            assert raised.value.response.status_code == 302
+            assert '_user_id' not in session
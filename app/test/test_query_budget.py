@@ -0,0 +1,47 @@
+"""app/test/test_query_budget.py"""
+
+import logging
+import pytest
+from app.models import db, User
+from app.utils.query_budget import query_budget, fingerprint, QueryBudgetExceeded
+
+
+class TestQueryBudget:
+    @pytest.fixture
+    def users(self, clean_db):
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+    def n_plus_one(self, user_ids):
+        """Load users one at a time, the way an N+1 template loop would."""
+        return [db.session.scalar(db.select(User.username).where(User.id == user_id)) for user_id in user_ids]
+
+    def test_fingerprint_strips_parameters(self):
+        """Do statements that differ only in parameters share a fingerprint?"""
+        assert fingerprint("SELECT * FROM users\n WHERE id = 1") == fingerprint("SELECT * FROM users WHERE id = 42")
+        assert fingerprint("SELECT * FROM users WHERE name = 'bob'") == "SELECT * FROM users WHERE name = ?"
+        assert fingerprint("SELECT * FROM users WHERE id IN (?, ?, ?)") == "SELECT * FROM users WHERE id IN (?)"
+        assert fingerprint("SELECT * FROM users WHERE id = %(id_1)s") == "SELECT * FROM users WHERE id = ?"
+
+    def test_within_budget(self, app, users):
+        """Does a view within its budget return normally?"""
+        view = query_budget(3)(self.n_plus_one)
+        with app.test_request_context('/'):
+            assert view(users) == ["user0", "user1", "user2"]
+
+    def test_overrun_raises_in_tests(self, app, users):
+        """Does an overrun fail under the testing config and name the repeated statement?"""
+        view = query_budget(1)(self.n_plus_one)
+        with app.test_request_context('/'):
+            with pytest.raises(QueryBudgetExceeded, match=r"ran 3 queries \(budget 1\).*3x SELECT users.username"):
+                view(users)
+
+    def test_overrun_logs_in_production(self, app, users, caplog, monkeypatch):
+        """Is an overrun only logged when QUERY_BUDGET_RAISE is off?"""
+        monkeypatch.setitem(app.config, 'QUERY_BUDGET_RAISE', False)
+        view = query_budget(1)(self.n_plus_one)
+        with app.test_request_context('/'), caplog.at_level(logging.WARNING):
+            assert len(view(users)) == 3
+        assert "ran 3 queries (budget 1)" in caplog.text
@@ -0,0 +1,69 @@
+"""app/test/test_rehash.py"""
+
+import pytest
+from sqlalchemy import insert
+from app.models import db, User
+from app.passwords import bcrypt_hash, hash_cost
+from app.rehash import RehashReport, password_rehash_progress, rehash_passwords
+
+
+class TestRehashPasswords:
+    @pytest.fixture
+    def users(self, clean_db):
+        password_rehash_progress.drop(db.engine, checkfirst=True)
+        db.session.execute(insert(User), [
+            {'username': f"user{i}", 'email': f"user{i}@example.com", 'password': f"plain-{i}"} for i in range(5)
+        ] + [{'username': "old", 'email': "old@example.com", 'password': bcrypt_hash(b"old-secret", 5)}])
+        db.session.commit()
+        yield
+        password_rehash_progress.drop(db.engine, checkfirst=True)
+
+    def test_hashes_plaintext_and_counts_stale(self, users):
+        """Are plaintext passwords hashed in batches, and other-cost hashes left for login?"""
+        reports = []
+        report = rehash_passwords(batch_size=2, processes=1, rounds=4,
+                                  progress=lambda report, rate: reports.append(report))
+
+        assert report == RehashReport(scanned=6, hashed=5, stale=1)
+        assert [r.scanned for r in reports] == [2, 4, 6]
+        user = User.query.filter_by(username="user3").one()
+        assert hash_cost(user.password) == 4 and user.check_password("plain-3")
+        assert hash_cost(User.query.filter_by(username="old").one().password) == 5
+
+    def test_resumes_after_interruption(self, users):
+        """Does a rerun continue after the last committed batch instead of starting over?"""
+        def crash(report, rate):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            rehash_passwords(batch_size=2, processes=1, rounds=4, progress=crash)
+        first = User.query.filter_by(username="user0").one().password
+        first_batch = [user.id for user in User.query.order_by(User.id).limit(2)]
+
+        assert rehash_passwords(batch_size=2, processes=1, rounds=4) == RehashReport(
+            scanned=4, hashed=3, stale=1, resumed_after=first_batch[-1])
+        assert User.query.filter_by(username="user0").one().password == first
+        assert all(hash_cost(user.password) for user in User.query)
+
+        assert rehash_passwords(batch_size=2, processes=1, rounds=4, restart=True).hashed == 0
+
+    def test_finished_run_starts_over(self, users):
+        """After a run completes, does the next one scan every user instead of resuming past the end?"""
+        rehash_passwords(batch_size=2, processes=1, rounds=4)
+        # As after raising BCRYPT_LOG_ROUNDS: every cost-4 hash is now stale
+        assert rehash_passwords(batch_size=2, processes=1, rounds=5) == RehashReport(scanned=6, hashed=0, stale=5)
+
+    def test_command_reports_a_resume(self, app, users):
+        """Does the CLI say when it picked up an earlier run's checkpoint?"""
+        def crash(report, rate):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            rehash_passwords(batch_size=2, processes=1, rounds=4, progress=crash)
+        result = app.test_cli_runner().invoke(args=["rehash-passwords", "--processes", "1", "--cost", "4"])
+        assert "Resumed after user" in result.output and "--restart" in result.output
+
+    def test_command(self, app, users):
+        """Does the CLI report what it hashed?"""
+        result = app.test_cli_runner().invoke(args=["rehash-passwords", "--processes", "1", "--cost", "4"])
+        assert "5 of 6 users; 1 at another cost" in result.output
@@ -0,0 +1,91 @@
+"""app/test/test_replicas.py"""
+
+import pytest
+from flask import g
+from sqlalchemy import insert, select
+from app import create_app
+from app.config.settings import TestingConfig
+from app.models import db, User, Message
+from app.replicas import SESSION_KEY
+
+
+@pytest.fixture
+def replicated(tmp_path, monkeypatch):
+    """An app whose primary and replica are two SQLite files; the replica lags one user and message behind."""
+    monkeypatch.setenv('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_REPLICA_URIS', [f"sqlite:///{tmp_path / 'replica.db'}"])
+    app = create_app("testing")
+    with app.app_context():
+        users = [{'id': 1, 'username': "author", 'email': "author@example.com", 'password': "x"},
+                 {'id': 2, 'username': "reader", 'email': "reader@example.com", 'password': "x"}]
+        for engine in (db.engines[None], app.extensions['replicas']['replica1']):
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(insert(User), users)
+        with db.engines[None].begin() as conn:
+            conn.execute(insert(User), [{'id': 3, 'username': "newcomer", 'email': "new@example.com", 'password': "x"}])
+            conn.execute(insert(Message), [{'id': 1, 'text': "not replicated yet", 'user_id': 1}])
+    yield app
+    with app.app_context():
+        for engine in [*db.engines.values(), *app.extensions['replicas'].values()]:
+            engine.dispose()
+
+
+class TestReadReplicas:
+    def test_session_routes_reads_of_marked_requests(self, replicated):
+        """Do plain SELECTs go to the chosen replica, and writes and locking reads to the primary?"""
+        with replicated.test_request_context():
+            replica, primary = replicated.extensions['replicas']['replica1'], db.engines[None]
+            assert db.session.get_bind(clause=select(User)) is primary
+
+            g.replica = replica
+            assert db.session.get_bind(clause=select(User)) is replica
+            assert db.session.get_bind(clause=select(User).with_for_update()) is primary
+            assert db.session.get_bind(clause=insert(User)) is primary
+            assert g.wrote_primary
+
+    def test_read_only_views_use_the_replica(self, replicated):
+        client = replicated.test_client()
+        assert client.get('/messages/messages/1').status_code == 404
+        assert b"not replicated yet" not in client.get('/users/1').data
+        assert 'replica1' in client.get('/internal/pool-stats').get_json()
+
+    def test_reads_stick_to_the_primary_after_a_write(self, replicated):
+        """Does a user see their own post right away, and go back to the replica after the window?"""
+        client = replicated.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = "1"
+
+        response = client.post('/messages/messages/new', data={"text": "fresh warble"})
+        assert response.status_code == 302
+        assert b"fresh warble" in client.get('/users/1').data
+        assert b"newcomer" in client.get('/users/users').data
+
+        with client.session_transaction() as session:
+            session[SESSION_KEY] = 0
+        assert b"newcomer" not in client.get('/users/users').data
+
+        # Other users were never pinned
+        other = replicated.test_client()
+        with other.session_transaction() as session:
+            session['_user_id'] = "2"
+        assert b"newcomer" not in other.get('/users/users').data
+
+    def test_replica_pages_are_not_cached(self, replicated):
+        """Once the replica catches up, does the author see their post instead of a stale cached page?"""
+        author, reader = replicated.test_client(), replicated.test_client()
+        with author.session_transaction() as session:
+            session['_user_id'] = "1"
+        author.post('/messages/messages/new', data={"text": "fresh warble"})
+
+        # The reader is served the lagging replica's page, which must not be cached
+        assert b"fresh warble" not in reader.get('/users/1').data
+
+        with replicated.app_context():
+            with db.engines[None].connect() as conn:
+                rows = [row._asdict() for row in conn.execute(select(Message.__table__))]
+            with replicated.extensions['replicas']['replica1'].begin() as conn:
+                conn.execute(insert(Message), rows)
+        with author.session_transaction() as session:
+            session[SESSION_KEY] = 0
+        assert b"fresh warble" in author.get('/users/1').data
@@ -0,0 +1,135 @@
+"""app/test/test_search.py"""
+
+import re
+import pytest
+from html import unescape
+from sqlalchemy import insert
+from datetime import datetime, timedelta
+from app.models import db, User, Message
+from app.search import (search_users, index_user, unindex_user, reindex_users,
+                        search_messages, index_message, reindex_messages)
+
+
+class TestUserSearch:
+    @pytest.fixture
+    def users(self, clean_db):
+        names = ["robin", "robinson", "brobin", "rob", "alice"]
+        users = [User.signup(username=name, email=f"{name}@example.com", password="password123")
+                 for name in names]
+        return {user.username: user.id for user in users}
+
+    def test_substring_match(self, users):
+        """Are users matched on any substring of their username or email?"""
+        found = {user.username for user in search_users("obi").items}
+        assert found == {"robin", "robinson", "brobin"}
+        assert [user.username for user in search_users("alice@exa").items] == ["alice"]
+
+    def test_exact_match_ranks_first(self, users):
+        """Does the closest match come before longer usernames containing it?"""
+        assert search_users("robin").items[0].username == "robin"
+
+    def test_short_query_matches_prefix(self, users):
+        """Do queries shorter than a trigram fall back to a username prefix match?"""
+        assert [user.username for user in search_users("ro").items] == ["rob", "robin", "robinson"]
+
+    def test_short_query_ignores_case(self, users):
+        """Does the prefix fallback ignore case, like the trigram search does?"""
+        assert [user.username for user in search_users("RO").items] == ["rob", "robin", "robinson"]
+
+    def test_pagination(self, users):
+        """Are results paged with a has-next flag instead of a count?"""
+        first = search_users("example", per_page=2)
+        second = search_users("example", page=2, per_page=2)
+        last = search_users("example", page=3, per_page=2)
+        assert first.has_next and second.has_next and not last.has_next
+        ids = [user.id for page in (first, second, last) for user in page.items]
+        assert sorted(ids) == sorted(users.values())
+
+    def test_index_follows_edits_and_deletes(self, users):
+        """Does the index follow renames and deletions?"""
+        user = db.session.get(User, users["alice"])
+        user.username = "alicia"
+        index_user(user)
+        db.session.commit()
+        assert [user.username for user in search_users("alicia").items] == ["alicia"]
+
+        unindex_user(user.id)
+        db.session.delete(user)
+        db.session.commit()
+        assert search_users("alicia").items == []
+
+    def test_reindex(self, users):
+        """Does a rebuild index every user exactly once?"""
+        assert reindex_users(batch_size=2) == len(users)
+        assert len(search_users("example").items) == len(users)
+
+    def test_search_page(self, app, users):
+        """Does the search page render only the matching users?"""
+        response = app.test_client().get("/users/search?query=robin")
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert "robinson" in html and "alice" not in html
+
+    def test_search_page_next_link(self, app, clean_db):
+        """Does the Next link on the search page lead to the second page of results?"""
+        db.session.execute(insert(User), [{'username': f"wren{i:02}", 'email': f"wren{i:02}@example.com",
+                                           'password': "x"} for i in range(25)])
+        db.session.commit()
+        reindex_users()
+        client = app.test_client()
+
+        html = client.get("/users/search?query=wren").get_data(as_text=True)
+        next_url = unescape(re.search(r'href="([^"]+)"[^>]*>Next<', html).group(1))
+        response = client.get(next_url)
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert "wren24" in html and "wren00" not in html and ">Previous<" in html
+
+
+class TestMessageSearch:
+    @pytest.fixture
+    def author(self, clean_db):
+        author = User.signup(username="birder", email="birder@example.com", password="password123")
+        start = datetime(2024, 1, 1)
+        texts = ["Spotted a heron by the lake", "Herons are nesting again",
+                 "Coffee first", "Lake walk with the kids"]
+        for i, text in enumerate(texts):
+            message = Message(text=text, user_id=author.id, timestamp=start + timedelta(hours=i))
+            db.session.add(message)
+            db.session.flush()
+            index_message(message)
+        db.session.commit()
+        return author
+
+    def test_words_and_stems_match_newest_first(self, author):
+        """Do stemmed words match, with every word required and the newest message first?"""
+        messages, _ = search_messages("herons")
+        assert [m.text for m in messages] == ["Herons are nesting again", "Spotted a heron by the lake"]
+        assert [m.text for m in search_messages("heron lake")[0]] == ["Spotted a heron by the lake"]
+        assert search_messages("   ") == ([], None)
+
+    def test_keyset_pages(self, author):
+        """Does the cursor walk the results without repeats or gaps?"""
+        first, cursor = search_messages("lake", per_page=1)
+        second, end = search_messages("lake", cursor, per_page=1)
+        assert [m.text for m in first + second] == ["Lake walk with the kids", "Spotted a heron by the lake"]
+        assert end is None
+
+    def test_reindex(self, author):
+        """Does a rebuild index every message exactly once?"""
+        assert reindex_messages(batch_size=3) == 4
+        assert len(search_messages("lake")[0]) == 2
+
+    def test_post_and_delete_keep_index_in_sync(self, app, author):
+        """Is a posted warble searchable right away, and gone once deleted?"""
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(author.id)
+
+        client.post("/messages/messages/new", data={"text": "An osprey overhead"})
+        response = client.get("/messages/messages/search?q=osprey")
+        assert response.status_code == 200 and "An osprey overhead" in response.get_data(as_text=True)
+
+        message_id = db.session.scalar(db.select(Message.id).filter_by(text="An osprey overhead"))
+        client.post(f"/messages/messages/{message_id}/delete")
+        assert search_messages("osprey") == ([], None)
@@ -0,0 +1,89 @@
+"""app/test/test_seed.py"""
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from app.models import db, User, Message, follows
+from app.seed import SeedFile, seed_files, seed_progress, load_file, load_seed
+from app.search import search_users, search_messages
+
+
+class TestSeed:
+    @pytest.fixture
+    def empty(self, clean_db):
+        seed_progress.drop(db.engine, checkfirst=True)
+        yield
+        seed_progress.drop(db.engine, checkfirst=True)
+
+    def test_loads_sample_data(self, empty):
+        """Are the sample CSVs loaded in chunks, with indexes, triggers and derived data rebuilt?"""
+        reports = []
+        loaded = load_seed(seed_files('app/generator/users.csv', 'app/generator/messages.csv',
+                                      'app/generator/follows.csv'),
+                           chunk_size=400, progress=lambda *report: reports.append(report))
+
+        assert loaded == {'users': 300, 'messages': 1000, 'follows': 5000}
+        assert reports[0][:2] == ('users', 300) and reports[-1][:2] == ('follows', 5000)
+        assert [name for name, _, _ in reports].count('follows') == 13
+
+        user = db.session.get(User, 189)
+        assert user.messages_count == Message.query.filter_by(user_id=189).count()
+        assert user.followers_count == db.session.query(follows).filter_by(user_being_followed_id=189).count()
+        assert search_users(user.username).items[0] == user
+        assert search_messages(Message.query.first().text.split()[0])[0]
+        indexes = {index['name'] for index in inspect(db.engine).get_indexes('messages')}
+        assert 'ix_messages_user_id_timestamp' in indexes
+
+        db.session.add(Message(text="after the load", user_id=189))
+        db.session.commit()
+        db.session.refresh(user)
+        assert user.messages_count == Message.query.filter_by(user_id=189).count()  # Triggers are back
+
+    def test_resumes_after_failure(self, empty, tmp_path):
+        """Does a failed load keep its committed chunks and pick up after them, with the file's ids?"""
+        users = tmp_path / "users.csv"
+        users.write_text("id,email,username,password\n1,a@example.com,ann,x\n")
+        messages = tmp_path / "messages.csv"
+        rows = ["1,one,2020-01-01 00:00:00,1", "2,two,2020-01-02 00:00:00,1",
+                "3,,2020-01-03 00:00:00,1", "4,four,2020-01-04 00:00:00,1"]
+        messages.write_text("id,text,timestamp,user_id\n" + "\n".join(rows) + "\n")
+        load_seed([SeedFile(User.__table__, str(users))])
+
+        with pytest.raises(IntegrityError):
+            load_file(SeedFile(Message.__table__, str(messages)), chunk_size=2)
+        assert [m.text for m in Message.query.order_by(Message.id)] == ["one", "two"]
+
+        rows[2] = "3,three,2020-01-03 00:00:00,1"
+        messages.write_text("id,text,timestamp,user_id\n" + "\n".join(rows) + "\n")
+        assert load_file(SeedFile(Message.__table__, str(messages)), chunk_size=2) == 2
+        assert [(m.id, m.text) for m in Message.query.order_by(Message.id)] == [
+            (1, "one"), (2, "two"), (3, "three"), (4, "four")]
+
+    def test_requires_explicit_ids(self, empty, tmp_path):
+        """Is a parent CSV without ids refused, since child rows could end up pointing at the wrong rows?"""
+        users = tmp_path / "users.csv"
+        users.write_text("email,username,password\na@example.com,ann,x\n")
+        with pytest.raises(ValueError, match="no 'id' column"):
+            load_file(SeedFile(User.__table__, str(users)))
+
+    def test_refuses_unrecorded_rows(self, empty, tmp_path):
+        """Is a resumable load into a table with rows it did not load refused?"""
+        User.signup(username="existing", email="existing@example.com", password="password123")
+        users = tmp_path / "users.csv"
+        users.write_text("id,email,username,password\n7,a@example.com,ann,x\n")
+        with pytest.raises(ValueError, match="fresh=True"):
+            load_seed([SeedFile(User.__table__, str(users))])
+
+        # Refused before anything was dropped: the counter triggers still fire
+        user = User.query.one()
+        db.session.add(Message(text="still counted", user_id=user.id))
+        db.session.commit()
+        db.session.refresh(user)
+        assert user.messages_count == 1
+
+    def test_rejects_unknown_columns(self, empty, tmp_path):
+        """Is a CSV whose header does not match the table refused before loading?"""
+        users = tmp_path / "users.csv"
+        users.write_text("email,username,shoe_size\na@example.com,ann,9\n")
+        with pytest.raises(ValueError, match="shoe_size"):
+            load_file(SeedFile(User.__table__, str(users)))
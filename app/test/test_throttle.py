@@ -0,0 +1,100 @@
+"""app/test/test_throttle.py"""
+
+import pytest
+from flask import request
+from sqlalchemy import event
+from app import create_app
+from app.config.settings import TestingConfig
+from app.models import db, User
+from app.throttle import LocalBuckets, login_throttle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLocalBuckets:
+    def test_burst_then_refill(self):
+        """Does a bucket allow its burst, refuse with a wait time, then refill?"""
+        clock = FakeClock()
+        buckets = LocalBuckets(clock=clock)
+        assert [buckets.take("k", 3, 1.0) for _ in range(3)] == [0, 0, 0]
+        assert buckets.take("k", 3, 1.0) == pytest.approx(1.0)
+        clock.now = 1.0
+        assert buckets.take("k", 3, 1.0) == 0
+
+    def test_bounded(self):
+        """Is the number of buckets capped, evicting the least recently used?"""
+        buckets = LocalBuckets(max_entries=2, clock=FakeClock())
+        for key in ("a", "b", "a", "c"):
+            buckets.take(key, 1, 1.0)
+        assert buckets.stats()['size'] == 2 and buckets.stats()['evictions'] == 1
+        assert buckets.take("a", 1, 1.0) > 0  # still tracked
+        assert buckets.take("b", 1, 1.0) == 0  # evicted, so it came back full
+
+
+class TestLoginThrottle:
+    @pytest.fixture
+    def user(self, app, clean_db):
+        login_throttle.backend.clear()
+        User.signup(username="target", email="target@example.com", password="password123")
+        yield
+        login_throttle.backend.clear()
+
+    def test_username_throttled_before_database(self, app, user):
+        """Once a username's bucket is empty, is a login refused with a 429 and no query?"""
+        client = app.test_client()
+        burst = app.config['LOGIN_THROTTLE_USERNAME_BURST']
+        for _ in range(burst):
+            assert client.post("/auth/login", data={"username": "target", "password": "wrong-guess"}).status_code == 200
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = client.post("/auth/login", data={"username": "TARGET", "password": "password123"})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+        assert statements == []
+
+    def test_ip_throttled_across_usernames(self, app, user):
+        """Does one IP spraying many usernames run out of attempts?"""
+        client = app.test_client()
+        burst = app.config['LOGIN_THROTTLE_IP_BURST']
+        codes = [client.post("/auth/login", data={"username": f"guess{i}", "password": "wrong-guess"}).status_code
+                 for i in range(burst + 1)]
+        assert codes[:burst] == [200] * burst and codes[-1] == 429
+
+    def test_username_throttled_across_ips(self, app, user):
+        """Does a guessing run spread over many addresses still run out of guesses at one account?"""
+        burst = app.config['LOGIN_THROTTLE_USERNAME_BURST']
+        codes = [app.test_client().post("/auth/login", data={"username": "target", "password": "wrong-guess"},
+                                        environ_base={'REMOTE_ADDR': f"203.0.113.{i}"}).status_code
+                 for i in range(burst + 1)]
+        assert codes[:burst] == [200] * burst and codes[-1] == 429
+
+    def test_successes_keep_the_username_open(self, app, user):
+        """Can the real user log in again and again without draining their own bucket?"""
+        owner = app.test_client()
+        for _ in range(app.config['LOGIN_THROTTLE_USERNAME_BURST'] + 1):
+            response = owner.post("/auth/login", data={"username": "target", "password": "password123"})
+            assert response.status_code == 302
+            owner.get("/auth/logout")
+
+
+class TestProxyFix:
+    def test_forwarded_client_address(self, app, monkeypatch):
+        """With PROXY_FIX_X_FOR set, do clients behind the proxy get their own IP buckets?"""
+        monkeypatch.setattr(TestingConfig, 'PROXY_FIX_X_FOR', 1)
+        proxied = create_app("testing")
+        seen = []
+        proxied.before_request(lambda: seen.append(request.remote_addr))
+        client = proxied.test_client()
+        client.get("/auth/login", headers={'X-Forwarded-For': "198.51.100.1"})
+        client.get("/auth/login", headers={'X-Forwarded-For': "198.51.100.2"})
+        assert seen == ["198.51.100.1", "198.51.100.2"]
@@ -0,0 +1,140 @@
+"""app/test/test_timeline.py"""
+
+import pytest
+from flask import g
+from app.models import db, Message, TimelineEntry
+from app.timeline import (fan_out_message, retract_message, backfill_follow,
+                          retract_follow, timeline_query, rebuild_timelines,
+                          follow_graph_query, home_feed_page)
+
+
+class TestTimeline:
+    @pytest.fixture
+    def users(self, make_users):
+        return make_users("alice", "bob", "carol")
+
+    def post(self, user, text):
+        msg = Message(text=text, user_id=user.id)
+        db.session.add(msg)
+        fan_out_message(msg)
+        db.session.commit()
+        return msg
+
+    def test_fan_out_reaches_author_and_followers(self, users):
+        """Does posting push the message to the author and every follower?"""
+        alice, bob, carol = users
+        bob.following.append(alice)
+        db.session.commit()
+
+        msg = self.post(alice, "hello")
+
+        assert timeline_query(alice.id).all() == [msg]
+        assert timeline_query(bob.id).all() == [msg]
+        assert timeline_query(carol.id).all() == []
+
+    def test_retract_message(self, users):
+        """Does deleting a message remove it from every timeline?"""
+        alice, bob, _ = users
+        bob.following.append(alice)
+        db.session.commit()
+        msg = self.post(alice, "soon gone")
+
+        retract_message(msg.id)
+        db.session.delete(msg)
+        db.session.commit()
+
+        assert TimelineEntry.query.count() == 0
+
+    def test_follow_backfills_and_unfollow_retracts(self, users):
+        """Do follow/unfollow copy and remove the followed user's history?"""
+        alice, bob, _ = users
+        older = self.post(alice, "older")
+        newer = self.post(alice, "newer")
+
+        bob.following.append(alice)
+        backfill_follow(bob.id, alice.id)
+        db.session.commit()
+        assert timeline_query(bob.id).all() == [newer, older]
+
+        bob.following.remove(alice)
+        retract_follow(bob.id, alice.id)
+        db.session.commit()
+        assert timeline_query(bob.id).all() == []
+
+    def test_rebuild_matches_fan_out(self, users):
+        """Does a rebuild reproduce the timelines written on post?"""
+        alice, bob, carol = users
+        bob.following.append(alice)
+        carol.following.append(bob)
+        db.session.commit()
+        self.post(alice, "one")
+        self.post(bob, "two")
+        before = {(e.user_id, e.message_id) for e in TimelineEntry.query.all()}
+
+        total = rebuild_timelines(batch_size=2)
+
+        after = {(e.user_id, e.message_id) for e in TimelineEntry.query.all()}
+        assert total == len(after) == 4
+        assert before == after
+
+    def test_follow_graph_query_matches_timeline(self, users):
+        """Does the SQL follow-graph feed return the same messages as the timeline?"""
+        alice, bob, carol = users
+        bob.following.append(alice)
+        db.session.commit()
+        self.post(alice, "from alice")
+        self.post(bob, "from bob")
+        self.post(carol, "from carol")
+
+        assert follow_graph_query(bob.id).all() == timeline_query(bob.id).all()
+        assert [m.text for m in follow_graph_query(bob.id)] == ["from bob", "from alice"]
+
+    def test_hybrid_pulls_high_follower_accounts(self, app, users):
+        """Are accounts above the follower limit merged at read time instead of pushed?"""
+        alice, bob, carol = users
+        bob.following.append(alice)
+        carol.following.append(alice)
+        carol.following.append(bob)
+        db.session.commit()
+        app.config['TIMELINE_FANOUT_FOLLOWER_LIMIT'] = 1
+        try:
+            celebrity_msg = self.post(alice, "from alice")  # two followers: pulled
+            regular_msg = self.post(bob, "from bob")        # one follower: pushed
+
+            assert alice.fanout_on_read and not bob.fanout_on_read
+            assert TimelineEntry.query.filter_by(message_id=celebrity_msg.id).count() == 1
+            assert TimelineEntry.query.filter_by(message_id=regular_msg.id).count() == 2
+
+            page, _ = home_feed_page(carol.id, None, 10)
+            assert page == [regular_msg, celebrity_msg]
+
+            first, cursor = home_feed_page(carol.id, None, 1)
+            second, last = home_feed_page(carol.id, cursor, 1)
+            assert first + second == [regular_msg, celebrity_msg] and last is None
+        finally:
+            app.config['TIMELINE_FANOUT_FOLLOWER_LIMIT'] = 10000
+
+    def test_deleted_account_leaves_every_feed(self, app, users):
+        """Does deleting an account clear its timeline rows and followers' cached feeds?"""
+        alice, bob, _ = users
+        bob.following.append(alice)
+        alice.following.append(bob)
+        db.session.commit()
+        self.post(alice, "parting words")
+        self.post(bob, "bob was here")
+        alice_id, bob_id = alice.id, bob.id
+
+        def client_for(user_id):
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+            g.pop('_login_user', None)
+            return client
+
+        assert b"parting words" in client_for(bob_id).get("/").data  # cached
+        client_for(alice_id).post("/users/delete")
+
+        assert TimelineEntry.query.filter_by(author_id=alice_id).count() == 0
+        assert TimelineEntry.query.filter_by(user_id=alice_id).count() == 0
+        page = client_for(bob_id).get("/").data
+        assert b"parting words" not in page and b"bob was here" in page
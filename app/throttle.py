@@ -0,0 +1,192 @@
+"""app/throttle.py
+
+Token-bucket throttling for login attempts.
+
+Every login attempt takes one token from a bucket for the client IP.
+Failed attempts also take one from a bucket for the normalized username,
+which every attempt checks first without spending it. Buckets hold up to
+`burst` tokens and refill at `per_minute` tokens a minute. An attempt that
+finds either bucket empty is refused with a 429 before the user is looked
+up or bcrypt runs, so a credential-stuffing run costs a dictionary lookup
+per attempt instead of a bcrypt hash. The IP bucket is checked first, so a
+throttled IP does not also drain the username bucket it is guessing.
+
+The username bucket is shared by every client, so a guessing run spread
+over many addresses still gets `burst` guesses plus `per_minute` a minute
+at one account. Only failures drain it: the real user's own logins never
+count against them, though they do wait out the refill while someone is
+actively guessing their password.
+
+Client IPs come from `request.remote_addr`. Behind a load balancer or
+reverse proxy that is the proxy's address, and every client would share
+one IP bucket. Set `PROXY_FIX_X_FOR` to the number of trusted proxies in
+front of the app so `X-Forwarded-For` supplies the client address (see
+`create_app`).
+
+Buckets live in a backend. `LocalBuckets` is a bounded in-process LRU, so
+each worker process throttles on its own (the effective limit is per
+worker) and a bucket evicted under a flood of distinct keys comes back
+full. A shared backend implementing `ThrottleBackend` removes both caveats.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class ThrottleBackend(ABC):
+    """Interface every bucket store implements."""
+
+    @abstractmethod
+    def take(self, key: str, burst: float, rate: float) -> float:
+        """Take one token from `key`'s bucket.
+
+        Args:
+            key (str): Bucket name.
+            burst (float): Bucket capacity; a new bucket starts full.
+            rate (float): Tokens added per second.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is available.
+        """
+
+    @abstractmethod
+    def peek(self, key: str, burst: float, rate: float) -> float:
+        """Return the seconds until `key`'s bucket has a token (0 if it has one) without taking it."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget every bucket."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Return backend counters."""
+
+
+class NullBuckets(ThrottleBackend):
+    """Backend that never throttles."""
+
+    def take(self, key, burst, rate):
+        return 0.0
+
+    def peek(self, key, burst, rate):
+        return 0.0
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'null', 'size': 0, 'max_entries': 0, 'evictions': 0}
+
+
+class LocalBuckets(ThrottleBackend):
+    """Bounded in-process LRU of token buckets.
+
+    Args:
+        max_entries (int): Buckets kept before the least recently used is evicted.
+        clock: Monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, max_entries: int = 100000, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key, burst, rate):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate
+
+    def peek(self, key, burst, rate):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return 0.0
+            tokens = min(burst, bucket[0] + (self.clock() - bucket[1]) * rate)
+            return 0.0 if tokens >= 1 else (1 - tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'local', 'size': len(self._buckets),
+                    'max_entries': self.max_entries, 'evictions': self.evictions}
+
+
+BACKENDS = {
+    'local': lambda config: LocalBuckets(config.get('LOGIN_THROTTLE_MAX_ENTRIES', 100000)),
+    'null': lambda config: NullBuckets(),
+}
+
+
+class LoginThrottle:
+    """Per-IP and per-username login throttle."""
+
+    def __init__(self, app=None):
+        self.backend = NullBuckets()
+        self.ip_limit = (20, 10)  # (burst, per minute)
+        self.username_limit = (5, 5)
+        self.throttled = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Create the configured backend and register the throttle on the app."""
+        name = app.config.get('LOGIN_THROTTLE_BACKEND', 'local')
+        if name not in BACKENDS:
+            raise KeyError(f"Invalid LOGIN_THROTTLE_BACKEND '{name}'. Valid options are: {list(BACKENDS)}")
+        self.backend = BACKENDS[name](app.config)
+        self.ip_limit = (app.config.get('LOGIN_THROTTLE_IP_BURST', 20),
+                         app.config.get('LOGIN_THROTTLE_IP_PER_MINUTE', 10))
+        self.username_limit = (app.config.get('LOGIN_THROTTLE_USERNAME_BURST', 5),
+                               app.config.get('LOGIN_THROTTLE_USERNAME_PER_MINUTE', 5))
+        app.extensions['login_throttle'] = self
+
+    def check(self, ip: str | None, username: str) -> float:
+        """Spend a login attempt for `ip` and check the failure budget of `username`.
+
+        Returns:
+            float: 0 if the attempt may proceed, otherwise the seconds to wait.
+        """
+        burst, per_minute = self.ip_limit
+        retry_after = self.backend.take(f"ip:{ip}", burst, per_minute / 60)
+        if not retry_after:
+            burst, per_minute = self.username_limit
+            retry_after = self.backend.peek(self._username_key(username), burst, per_minute / 60)
+        if retry_after:
+            self.throttled += 1
+        return retry_after
+
+    def failed(self, username: str) -> None:
+        """Charge a failed login (unknown user or wrong password) to `username`."""
+        burst, per_minute = self.username_limit
+        self.backend.take(self._username_key(username), burst, per_minute / 60)
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        return f"user:{username.strip().lower()}"
+
+    def stats(self) -> dict:
+        """Return the throttled-attempt counter plus backend counters."""
+        return {'throttled': self.throttled, 'backend': self.backend.stats()}
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,299 @@
+"""app/timeline.py
+
+Materialized home timelines (fan-out on write).
+
+Every message is copied into the `timelines` table of its author and of each
+follower when it is posted, so reading a feed is one indexed range scan on
+`(user_id, timestamp)`. Follows and unfollows backfill or retract the
+followed user's messages, and `rebuild_timelines` recomputes everything from
+`follows` and `messages` (see the `flask rebuild-timelines` command).
+
+Accounts with more than `TIMELINE_FANOUT_FOLLOWER_LIMIT` followers are
+switched to fan-out on read (`User.fanout_on_read`): their messages only land
+on their own timeline and `home_feed_page` merges them into followers' feeds
+at read time, so one post never turns into 100k timeline writes.
+
+With `TIMELINE_FANOUT` disabled nothing is materialized and feeds are read
+with `follow_graph_query`, which joins `messages` against `follows` in SQL.
+"""
+
+from flask import current_app
+from sqlalchemy import select, literal, exists, union_all, func, update
+from sqlalchemy.orm import aliased
+from app.models import db, Message, TimelineEntry, User, follows
+from app.loading import FEED
+from app.utils.pagination import keyset_page, keyset_filter, split_page
+
+
+timelines = TimelineEntry.__table__
+TIMELINE_COLUMNS = ['user_id', 'message_id', 'author_id', 'timestamp']
+
+
+def fanout_enabled() -> bool:
+    """Return True when timelines are materialized on write."""
+    return current_app.config.get('TIMELINE_FANOUT', True)
+
+
+def follower_limit() -> int | None:
+    """Return the follower count above which an account is pulled at read time."""
+    return current_app.config.get('TIMELINE_FANOUT_FOLLOWER_LIMIT')
+
+
+def uses_fanout_on_read(author_id: int) -> bool:
+    """Check (and record) whether an author's messages are pulled at read time.
+
+    Accounts are flagged the first time they are seen above the follower
+    limit. The flag only goes back down through `refresh_fanout_flags`, which
+    `rebuild_timelines` runs before re-materializing their messages.
+    """
+    flagged, follower_count = db.session.execute(
+        select(User.fanout_on_read, User.followers_count).where(User.id == author_id)
+    ).one()
+    if flagged:
+        return True
+
+    limit = follower_limit()
+    if limit is None or follower_count <= limit:
+        return False
+
+    db.session.execute(update(User).where(User.id == author_id).values(fanout_on_read=True))
+    current_app.logger.info(f"User {author_id} exceeded {limit} followers; switched to fan-out on read.")
+    return True
+
+
+def fan_out_message(message: Message) -> int:
+    """Push a freshly posted message onto its author's and followers' timelines.
+
+    Messages by fan-out-on-read accounts only go to the author's own timeline.
+    Runs inside the caller's transaction; the caller commits.
+
+    Returns:
+        int: Number of timeline rows written.
+    """
+    if not fanout_enabled():
+        return 0
+
+    db.session.flush()  # Make sure the message has an id and timestamp
+
+    to_followers = (
+        select(
+            follows.c.user_following_id,
+            literal(message.id),
+            literal(message.user_id),
+            literal(message.timestamp),
+        )
+        .where(follows.c.user_being_followed_id == message.user_id)
+        .where(follows.c.user_following_id != message.user_id)
+    )
+    to_author = select(
+        literal(message.user_id),
+        literal(message.id),
+        literal(message.user_id),
+        literal(message.timestamp),
+    )
+
+    rows = to_author if uses_fanout_on_read(message.user_id) else union_all(to_followers, to_author)
+    result = db.session.execute(timelines.insert().from_select(TIMELINE_COLUMNS, rows))
+    return result.rowcount
+
+
+def retract_message(message_id: int) -> int:
+    """Remove a deleted message from every timeline it was pushed to."""
+    if not fanout_enabled():
+        return 0
+    result = db.session.execute(
+        timelines.delete().where(timelines.c.message_id == message_id)
+    )
+    return result.rowcount
+
+
+def retract_user(user_id: int) -> int:
+    """Remove a deleted user's timeline and their messages from every other timeline."""
+    if not fanout_enabled():
+        return 0
+    own = db.session.execute(timelines.delete().where(timelines.c.user_id == user_id))
+    pushed = db.session.execute(
+        timelines.delete().where(
+            timelines.c.message_id.in_(select(Message.id).where(Message.user_id == user_id))
+        )
+    )
+    return own.rowcount + pushed.rowcount
+
+
+def backfill_follow(follower_id: int, followed_id: int) -> int:
+    """Copy the followed user's messages into the follower's timeline.
+
+    The number of messages copied is capped by `TIMELINE_BACKFILL_LIMIT`
+    (newest first); `None` copies the full history. Fan-out-on-read accounts
+    are merged at read time and are not copied.
+    """
+    if not fanout_enabled() or uses_fanout_on_read(followed_id):
+        return 0
+
+    existing = aliased(TimelineEntry)
+    query = (
+        select(
+            literal(follower_id),
+            Message.id,
+            Message.user_id,
+            Message.timestamp,
+        )
+        .where(Message.user_id == followed_id)
+        .where(~exists().where(
+            (existing.user_id == follower_id) & (existing.message_id == Message.id)
+        ))
+        .order_by(Message.timestamp.desc(), Message.id.desc())
+    )
+    limit = current_app.config.get('TIMELINE_BACKFILL_LIMIT')
+    if limit is not None:
+        query = query.limit(limit)
+
+    result = db.session.execute(timelines.insert().from_select(TIMELINE_COLUMNS, query))
+    return result.rowcount
+
+
+def retract_follow(follower_id: int, followed_id: int) -> int:
+    """Remove the unfollowed user's messages from the follower's timeline."""
+    if not fanout_enabled() or follower_id == followed_id:
+        return 0
+    result = db.session.execute(
+        timelines.delete()
+        .where(timelines.c.user_id == follower_id)
+        .where(timelines.c.author_id == followed_id)
+    )
+    return result.rowcount
+
+
+def timeline_query(user_id: int):
+    """Return a query for the messages on a user's materialized timeline, newest first."""
+    return (Message.query
+            .options(*FEED)
+            .join(TimelineEntry, TimelineEntry.message_id == Message.id)
+            .filter(TimelineEntry.user_id == user_id)
+            .order_by(TimelineEntry.timestamp.desc(), TimelineEntry.message_id.desc()))
+
+
+def followed_ids_subquery(user_id: int):
+    """Return a subquery selecting the ids of the users `user_id` follows."""
+    return (select(follows.c.user_being_followed_id)
+            .where(follows.c.user_following_id == user_id))
+
+
+def follow_graph_query(user_id: int):
+    """Return a query for a user's feed computed from `follows` in SQL, newest first.
+
+    The followed ids never leave the database: `messages` is semi-joined
+    against `follows` (`user_following_id = :me`) and walked through the
+    `(user_id, timestamp)` index on `messages`.
+    """
+    return (Message.query
+            .options(*FEED)
+            .filter((Message.user_id == user_id) |
+                    Message.user_id.in_(followed_ids_subquery(user_id)))
+            .order_by(Message.timestamp.desc(), Message.id.desc()))
+
+
+def pulled_authors_subquery(user_id: int):
+    """Return a subquery of the fan-out-on-read accounts `user_id` follows."""
+    return (select(follows.c.user_being_followed_id)
+            .join(User, User.id == follows.c.user_being_followed_id)
+            .where(follows.c.user_following_id == user_id)
+            .where(User.fanout_on_read.is_(True)))
+
+
+def home_feed_page(user_id: int, cursor: str | None, per_page: int):
+    """Return one keyset page of a user's home feed and the next cursor.
+
+    Reads the materialized timeline and merges in the newest messages of any
+    followed fan-out-on-read accounts, or reads the follow graph when fan-out
+    is off.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not fanout_enabled():
+        return keyset_page(follow_graph_query(user_id), Message.timestamp, Message.id,
+                           cursor, per_page)
+
+    pushed = (keyset_filter(timeline_query(user_id), TimelineEntry.timestamp,
+                            TimelineEntry.message_id, cursor)
+              .limit(per_page + 1).all())
+
+    pulled_authors = db.session.scalars(pulled_authors_subquery(user_id)).all()
+    if not pulled_authors:
+        return split_page(pushed, per_page)
+
+    pulled = (keyset_filter(Message.query
+                            .options(*FEED)
+                            .filter(Message.user_id.in_(pulled_authors))
+                            .order_by(Message.timestamp.desc(), Message.id.desc()),
+                            Message.timestamp, Message.id, cursor)
+              .limit(per_page + 1).all())
+
+    # Both sides are newest-first and hold per_page + 1 rows, so the top
+    # per_page + 1 of their union is exact; dedupe by id for accounts that
+    # were pushed before they crossed the limit.
+    merged = sorted({msg.id: msg for msg in pushed + pulled}.values(),
+                    key=lambda msg: (msg.timestamp, msg.id), reverse=True)
+    return split_page(merged[:per_page + 1], per_page)
+
+
+def refresh_fanout_flags() -> None:
+    """Recompute `User.fanout_on_read` from current follower counts."""
+    limit = follower_limit()
+    if limit is None:
+        db.session.execute(update(User).values(fanout_on_read=False))
+    else:
+        follower_count = (select(func.count())
+                          .where(follows.c.user_being_followed_id == User.id)
+                          .scalar_subquery())
+        db.session.execute(update(User).values(fanout_on_read=follower_count > limit))
+    db.session.commit()
+
+
+def rebuild_timelines(batch_size: int = 500) -> int:
+    """Recompute every timeline from `follows` and `messages`.
+
+    Fan-out-on-read flags are refreshed first, then timelines are cleared
+    and refilled one batch of users at a time, with a commit per batch so a
+    large rebuild never holds one huge transaction. Messages by
+    fan-out-on-read accounts are only written to their authors' timelines.
+
+    Returns:
+        int: Total number of timeline rows written.
+    """
+    refresh_fanout_flags()
+    db.session.execute(timelines.delete())
+    db.session.commit()
+
+    user_ids = [row[0] for row in db.session.execute(select(User.id).order_by(User.id))]
+    total = 0
+    for start in range(0, len(user_ids), batch_size):
+        lo, hi = user_ids[start], user_ids[min(start + batch_size, len(user_ids)) - 1]
+
+        followed = (
+            select(
+                follows.c.user_following_id,
+                Message.id,
+                Message.user_id,
+                Message.timestamp,
+            )
+            .join(Message, Message.user_id == follows.c.user_being_followed_id)
+            .join(User, User.id == follows.c.user_being_followed_id)
+            .where(User.fanout_on_read.is_(False))
+            .where(follows.c.user_following_id.between(lo, hi))
+            .where(follows.c.user_following_id != follows.c.user_being_followed_id)
+        )
+        own = (
+            select(Message.user_id, Message.id, Message.user_id.label('author_id'), Message.timestamp)
+            .where(Message.user_id.between(lo, hi))
+        )
+
+        result = db.session.execute(
+            timelines.insert().from_select(TIMELINE_COLUMNS, union_all(followed, own))
+        )
+        db.session.commit()
+        total += result.rowcount
+        current_app.logger.debug(f"Rebuilt timelines for users {lo}-{hi}: {result.rowcount} rows.")
+
+    return total
@@ -3,41 +3,77 @@
 import os
 import sys
 import logging
-from flask import Blueprint, render_template, redirect, flash, url_for, request, current_app, session, g
+from flask import Blueprint, render_template, redirect, flash, url_for, request, current_app, session, g, abort, jsonify
 from flask_login import login_required, current_user
-from app.models import db, User, Message
+from app.models import db, User, Message, likes, follows
+from app.loading import FEED, PROFILE_CARD
 from app.forms import UserProfileForm, PasswordConfirmForm, FollowForm
 from werkzeug.security import check_password_hash
 from app.utils.session import is_session_expired
+from app.timeline import backfill_follow, retract_follow, retract_user
+from app.utils.pagination import keyset_page
+from app.feed import annotate_messages
+from app.cache import timeline_cache, snapshot_messages
+from app.follow_graph import follow_graph
+from app.autocomplete import autocomplete
+from app.principal import current_user_model, invalidate_principal
+from app.search import search_users as run_user_search, index_user, unindex_user
+from app.passwords import PasswordHasherBusy
+from app.utils.query_budget import query_budget
+from app.replicas import read_replica
 
 
 users_bp = Blueprint('users', __name__, url_prefix='/users')
 
 
+def viewer_follow_status(users) -> dict:
+    """Return the logged-in viewer's follow status towards each listed user (empty when anonymous)."""
+    if not current_user.is_authenticated:
+        return {}
+    return User.follow_status(current_user.id, (user.id for user in users))
+
+
 
 @users_bp.route('/users', methods=['GET'])
 @login_required
+@query_budget(4)
+@read_replica
 def list_users():
     """List all users."""
     form = FollowForm()  # Create an instance of the FollowForm
-    users = User.query.paginate(page=request.args.get('page', 1, type=int), per_page=20)
-    return render_template('users/index.html', users=users.items, pagination=users, form=form)
+    users = User.query.options(*PROFILE_CARD).order_by(User.id).paginate(page=request.args.get('page', 1, type=int), per_page=20)
+    return render_template('users/index.html', users=users.items, pagination=users, form=form,
+                           follow_status=viewer_follow_status(users.items))
 
 
 
 
 
 @users_bp.route('/<int:user_id>')
+@query_budget(8)  # includes the one-off follow graph build
+@read_replica
 def users_show(user_id: int) -> str:
     """Show user profile."""
-    user = User.query.get_or_404(user_id)
+    user = User.query.options(*PROFILE_CARD).filter_by(id=user_id).first_or_404()
     follow_form = FollowForm()
-    page = request.args.get('page', 1, type=int)
-    per_page = 20
 
-    messages = (Message.query.filter_by(user_id=user_id)
-                .order_by(Message.timestamp.desc())
-                .paginate(page=page, per_page=per_page))
+    cursor = request.args.get('before')
+
+    def load():
+        try:
+            messages, next_cursor = keyset_page(
+                Message.query.options(*FEED).filter_by(user_id=user_id)
+                .order_by(Message.timestamp.desc(), Message.id.desc()),
+                Message.timestamp,
+                Message.id,
+                cursor,
+                current_app.config.get('FEED_PAGE_SIZE', 50),
+            )
+        except ValueError:
+            abort(400)
+        return snapshot_messages(messages), next_cursor
+
+    messages, next_cursor = timeline_cache.cached_page('profile', user_id, cursor, load)
 
     try:
         # Explicitly find the template path
@@ -47,7 +83,17 @@ def users_show(user_id: int) -> str:
         current_app.logger.error(f"Error finding template: {e}")
         raise
 
-    return render_template('users/show.html', user=user, messages=messages.items, pagination=messages, follow_form=follow_form)
+    annotations = annotate_messages(messages, current_user.id if current_user.is_authenticated else None)
+
+    known_count, known_followers = 0, []
+    if current_user.is_authenticated and current_user.id != user.id:
+        known_count, known_ids = follow_graph.graph.followers_you_know(current_user.id, user.id)
+        if known_ids:
+            known_followers = User.query.options(*PROFILE_CARD).filter(User.id.in_(known_ids)).all()
+
+    return render_template('users/show.html', user=user, messages=messages, next_cursor=next_cursor,
+                           follow_form=follow_form, known_count=known_count,
+                           known_followers=known_followers, **annotations._asdict())
 
 
 
@@ -55,22 +101,71 @@ def users_show(user_id: int) -> str:
 
 @users_bp.route('/<int:user_id>/following')
 @login_required
+@query_budget(4)
 def show_following(user_id: int) -> str:
     """Show list of people this user is following."""
-    user = User.query.get_or_404(user_id)
-    return render_template('users/following.html', user=user)
+    user = User.query.options(*PROFILE_CARD).filter_by(id=user_id).first_or_404()
+    following = (User.query.options(*PROFILE_CARD)
+                 .join(follows, follows.c.user_being_followed_id == User.id)
+                 .filter(follows.c.user_following_id == user_id)
+                 .order_by(User.username)
+                 .all())
+    return render_template('users/following.html', user=user, following=following, form=FollowForm(),
+                           follow_status=viewer_follow_status(following))
 
 
 @users_bp.route('/<int:user_id>/followers')
 @login_required
+@query_budget(4)
 def users_followers(user_id: int) -> str:
     """Show list of followers of this user."""
-    user = User.query.get_or_404(user_id)
-    return render_template('users/followers.html', user=user)
+    user = User.query.options(*PROFILE_CARD).filter_by(id=user_id).first_or_404()
+    followers = (User.query.options(*PROFILE_CARD)
+                 .join(follows, follows.c.user_following_id == User.id)
+                 .filter(follows.c.user_being_followed_id == user_id)
+                 .order_by(User.username)
+                 .all())
+    return render_template('users/followers.html', user=user, followers=followers, form=FollowForm(),
+                           follow_status=viewer_follow_status(followers))
+
+
+@users_bp.route('/recommendations')
+@login_required
+@query_budget(3)  # includes the one-off follow graph build
+def recommendations():
+    """Return accounts followed by the people the current user follows, as JSON."""
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    ranked = follow_graph.graph.recommend(current_user.id, limit=limit)
+    users = {user.id: user for user in
+             User.query.options(*PROFILE_CARD).filter(User.id.in_([user_id for user_id, _ in ranked]))}
+    return jsonify({
+        'users': [
+            {
+                'id': user_id,
+                'username': users[user_id].username,
+                'image_url': users[user_id].image_url,
+                'followed_by_count': count,
+            }
+            for user_id, count in ranked if user_id in users
+        ],
+    })
+
+
+@users_bp.route('/autocomplete')
+@query_budget(2)  # includes the one-off index build; 0 once built
+def autocomplete_usernames():
+    """Return usernames starting with `q` for the navbar type-ahead, as JSON."""
+    prefix = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 8, type=int), 20)
+    return jsonify({
+        'users': [{'id': user_id, 'username': username}
+                  for user_id, username in autocomplete.complete(prefix, limit)],
+    })
 
 
 @users_bp.route('/follow/<int:user_id>', methods=['POST'])
 @login_required
+@query_budget(10)
 def follow_user(user_id):
     """Follow a user."""
     user_to_follow = User.query.get_or_404(user_id)
@@ -86,7 +181,10 @@ def follow_user(user_id):
         flash(f"You are already following {user_to_follow.username}.", "warning")
     else:
         g.user.following.append(user_to_follow)
+        backfill_follow(g.user.id, user_to_follow.id)
         db.session.commit()
+        follow_graph.add_edge(g.user.id, user_to_follow.id)
+        timeline_cache.invalidate('feed', g.user.id)
         flash(f"You are now following {user_to_follow.username}!", "success")
 
     return redirect(request.referrer or url_for('users.list_users'))
@@ -103,6 +201,7 @@ def follow_user(user_id):
 
 @users_bp.route('/unfollow/<int:user_id>', methods=['POST'])
 @login_required
+@query_budget(10)
 def unfollow_user(user_id):
     """Unfollow a user."""
     user_to_unfollow = User.query.get_or_404(user_id)
@@ -118,7 +217,10 @@ def unfollow_user(user_id):
         flash(f"You are not following {user_to_unfollow.username}.", "warning")
     else:
         g.user.following.remove(user_to_unfollow)
+        retract_follow(g.user.id, user_to_unfollow.id)
         db.session.commit()
+        follow_graph.remove_edge(g.user.id, user_to_unfollow.id)
+        timeline_cache.invalidate('feed', g.user.id)
         flash(f"You have unfollowed {user_to_unfollow.username}.", "success")
 
     return redirect(request.referrer or url_for('users.list_users'))
@@ -129,8 +231,16 @@ def unfollow_user(user_id):
 @login_required
 def delete_user() -> str:
     """Delete current user."""
-    db.session.delete(current_user)
+    user_id = current_user.id
+    pages = timeline_cache.author_pages(user_id)
+    unindex_user(user_id)
+    retract_user(user_id)
+    db.session.delete(current_user_model())
     db.session.commit()
+    timeline_cache.invalidate_pages(pages)
+    follow_graph.remove_user(user_id)
+    autocomplete.remove_user(user_id)
+    invalidate_principal(user_id)
     flash("User deleted.", "info")
     current_app.logger.debug(f"User {current_user.username} deleted their account.")
     return redirect(url_for('auth.login'))
@@ -146,7 +256,13 @@ def confirm_password(user_id):
 
     form = PasswordConfirmForm()
     if form.validate_on_submit():
-        if current_user.check_password(form.password.data):
+        try:
+            password_ok = current_user.check_password(form.password.data)
+        except PasswordHasherBusy:
+            current_app.logger.warning("Password hasher saturated; shedding password confirmation.")
+            flash("Too many requests right now. Please try again in a moment.", "warning")
+            return render_template('users/confirm_password.html', form=form), 503
+        if password_ok:
             # Store a session variable to indicate the user is authorized to edit
             session['password_confirmed'] = True
             session['password_confirmed_at'] = datetime.now().isoformat()  # Store timestamp
@@ -185,7 +301,11 @@ def edit_user(user_id):
         user.location = form.location.data
         user.image_url = form.image_url.data
         user.header_image_url = form.header_image_url.data
+        index_user(user)
         db.session.commit()
+        autocomplete.add_user(user.id, user.username)
+        invalidate_principal(user.id)
+        timeline_cache.invalidate_author(user.id)
         flash("Profile updated successfully!", "success")
         return redirect(url_for('main.homepage', user_id=user_id))
 
@@ -194,6 +314,8 @@ def edit_user(user_id):
 
 
 @users_bp.route('/search', methods=['GET', 'POST'])
+@query_budget(4)
+@read_replica
 def search_users():
     """Search for users by username or email."""
     query = request.args.get('query', '').strip()
@@ -202,21 +324,31 @@ def search_users():
         flash("Please enter a search term.", "warning")
         return redirect(url_for('users.list_users'))
 
-    # Search for users by username or email
-    users = User.query.filter(
-        (User.username.ilike(f"%{query}%")) | (User.email.ilike(f"%{query}%"))
-    ).all()
+    # Ranked, indexed search over username and email
+    results = run_user_search(query, request.args.get('page', 1, type=int))
+    users = results.items
 
     follow_form = FollowForm()  # Pass a form to the template
-    return render_template('users/search_results.html', users=users, query=query, follow_form=follow_form)
+    return render_template('users/search_results.html', users=users, query=query, follow_form=follow_form,
+                           results=results, follow_status=viewer_follow_status(users))
 
 
 
 @users_bp.route('/users/<int:user_id>/likes')
 @login_required
+@query_budget(4)
 def show_liked_warbles(user_id):
-    """Show all warbles liked by the user."""
-    user = User.query.get_or_404(user_id)
-    return render_template('users/likes.html', user=user)
+    """Show all warbles liked by the user, most recently liked first."""
+    user = User.query.options(*PROFILE_CARD).filter_by(id=user_id).first_or_404()
+    messages = timeline_cache.cached_page('likes', user.id, None, lambda: snapshot_messages(
+        Message.query
+        .options(*FEED)
+        .join(likes, likes.c.message_id == Message.id)
+        .filter(likes.c.user_id == user.id)
+        .order_by(likes.c.created_at.desc(), Message.id.desc())
+        .all()
+    ))
+    annotations = annotate_messages(messages, current_user.id)
+    return render_template('users/likes.html', user=user, messages=messages, **annotations._asdict())
 
 
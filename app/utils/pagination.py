@@ -0,0 +1,88 @@
+"""app/utils/pagination.py"""
+
+import base64
+from datetime import datetime
+
+
+def encode_cursor(timestamp: datetime, item_id: int) -> str:
+    """Encode a `(timestamp, id)` position as an opaque, URL-safe cursor.
+
+    Args:
+        timestamp (datetime): Timestamp of the last item on the page.
+        item_id (int): Id of the last item on the page (tie-breaker).
+
+    Returns:
+        str: The cursor string.
+    """
+    raw = f"{timestamp.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor string.
+
+    Returns:
+        tuple[datetime, int]: The `(timestamp, id)` position.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, item_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(item_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_filter(query, timestamp_col, id_col, cursor: str | None):
+    """Restrict a newest-first query to rows strictly after `cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    if not cursor:
+        return query
+    timestamp, item_id = decode_cursor(cursor)
+    return query.filter(
+        (timestamp_col < timestamp) |
+        ((timestamp_col == timestamp) & (id_col < item_id))
+    )
+
+
+def split_page(items: list, per_page: int):
+    """Split `per_page + 1` fetched items into a page and the next cursor."""
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, encode_cursor(last.timestamp, last.id)
+
+
+def keyset_page(query, timestamp_col, id_col, cursor: str | None, per_page: int):
+    """Fetch one page of a newest-first query after `cursor`.
+
+    The query must already be ordered by `timestamp_col DESC, id_col DESC`.
+    Instead of OFFSET, the page starts strictly after the cursor position, so
+    the cost stays proportional to `per_page` however deep the reader scrolls.
+
+    Args:
+        query: SQLAlchemy query returning `Message` rows.
+        timestamp_col: Column the query is ordered by.
+        id_col: Tie-breaking id column the query is ordered by.
+        cursor (str | None): Cursor from the previous page, or None for the first page.
+        per_page (int): Page size.
+
+    Returns:
+        tuple[list, str | None]: The page items and the cursor for the next
+        page (None when this is the last page).
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    query = keyset_filter(query, timestamp_col, id_col, cursor)
+    return split_page(query.limit(per_page + 1).all(), per_page)
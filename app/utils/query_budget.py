@@ -0,0 +1,130 @@
+"""app/utils/query_budget.py
+
+Per-request SQL statement counting and per-route query budgets.
+
+`init_query_budget` hooks SQLAlchemy engine events and records every
+statement run while handling a request: the count, the total time, and a
+fingerprint per statement (literals and bind parameters stripped). Views
+declare how many statements they may issue with `@query_budget(n)`. An
+overrun is logged with the repeated fingerprints, which is the signature of
+an N+1. With `QUERY_BUDGET_RAISE` set (the testing config), it raises
+`QueryBudgetExceeded` instead, so the offending test fails.
+"""
+
+import re
+import time
+from collections import Counter
+from functools import wraps
+from flask import g, current_app, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more statements than its budget allows."""
+
+
+class QueryStats:
+    """Statements recorded for the current request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = []
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.fingerprints.append(fingerprint(statement))
+
+    def repeated(self, since: int = 0) -> list[tuple[str, int]]:
+        """Return fingerprints run more than once after statement `since`, most frequent first."""
+        counts = Counter(self.fingerprints[since:])
+        return [(fp, n) for fp, n in counts.most_common() if n > 1]
+
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAMS = re.compile(r"%\(\w+\)s|:\w+|\$\d+|\?")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so repeats with different parameters compare equal.
+
+    Args:
+        statement (str): SQL as sent to the driver.
+
+    Returns:
+        str: The statement with whitespace collapsed and every literal, bind
+        parameter and IN-list replaced by `?`.
+    """
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _LITERALS.sub("?", _PARAMS.sub("?", statement))
+    return _IN_LISTS.sub("(?)", statement)
+
+
+def current_stats() -> QueryStats | None:
+    """Return the stats of the request being handled, or None outside requests."""
+    if not has_request_context():
+        return None
+    if 'query_stats' not in g:
+        g.query_stats = QueryStats()
+    return g.query_stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - context.query_started)
+
+
+def init_query_budget(app) -> None:
+    """Count statements per request for every engine and log a summary."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.after_request
+    def log_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is not None and stats.count:
+            current_app.logger.debug(
+                f"{stats.count} queries in {stats.duration * 1000:.1f}ms for {request.endpoint}"
+            )
+        return response
+
+
+def query_budget(max_queries: int):
+    """Limit the number of SQL statements a view (and its template) may run.
+
+    Statements issued before the view starts, such as loading the logged-in
+    user, are not charged to the budget.
+
+    Args:
+        max_queries (int): Statements the view may issue.
+
+    Raises:
+        QueryBudgetExceeded: On an overrun when `QUERY_BUDGET_RAISE` is set.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            stats = current_stats()
+            start = stats.count
+            response = view(*args, **kwargs)
+            used = stats.count - start
+            if used > max_queries:
+                repeated = "; ".join(f"{n}x {fp}" for fp, n in stats.repeated(start)) or "none"
+                message = (f"{view.__module__}.{view.__name__} ran {used} queries "
+                           f"(budget {max_queries}). Repeated statements: {repeated}")
+                if current_app.config.get('QUERY_BUDGET_RAISE'):
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+"""app/utils/rebuilding_index.py
+
+Per-process holder for in-memory indexes built from the database.
+
+The first access builds the index synchronously. Once it is older than
+`<PREFIX>_MAX_AGE` seconds, a background thread rebuilds it from the tables
+while requests keep reading the current one. Changes committed by this
+process are applied to the live index as they happen and replayed onto the
+new one before it is swapped in, so nothing recorded during a rebuild is
+lost. Changes made by other worker processes show up with the next rebuild.
+
+Applied changes pile up in the index's overlay. Once more than
+`<PREFIX>_COMPACT_THRESHOLD` are pending, the same background rebuild runs
+early: folding the overlay costs time proportional to the whole index, and
+doing it on the request thread that made the change, under the lock, would
+stall every other request in the process.
+
+An index must provide `built_at` (a `time.monotonic()` stamp), `pending()`
+(overlay entries not yet folded in) and `nbytes()`.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from flask import current_app
+
+
+class RebuildingIndex(ABC):
+    """Lazily built, periodically refreshed index; subclasses implement `build`.
+
+    Attributes
+    ----------
+    name : str
+        Key under `app.extensions`, also used in log messages.
+    config_prefix : str
+        Prefix of the `_MAX_AGE` and `_COMPACT_THRESHOLD` settings.
+    """
+    name = 'index'
+    config_prefix = 'INDEX'
+
+    def __init__(self, app=None):
+        self._index = None
+        self._lock = threading.Lock()
+        self._rebuilding = None  # changes seen while a rebuild runs
+        self.max_age = 300
+        self.compact_threshold = 10000
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Read the index settings and register it on the app."""
+        self.max_age = app.config.get(f'{self.config_prefix}_MAX_AGE', 300)
+        self.compact_threshold = app.config.get(f'{self.config_prefix}_COMPACT_THRESHOLD', 10000)
+        app.extensions[self.name] = self
+
+    @abstractmethod
+    def build(self):
+        """Build a fresh index from the database."""
+
+    def current(self):
+        """Return the index, building it on first use and refreshing it when stale."""
+        with self._lock:
+            if self._index is None:
+                self._index = self.build()
+            elif self.max_age is not None and time.monotonic() - self._index.built_at > self.max_age:
+                self._start_rebuild()
+            return self._index
+
+    def _start_rebuild(self) -> None:
+        """Rebuild in a background thread unless one is running; call with the lock held."""
+        if self._rebuilding is not None:
+            return
+        self._rebuilding = []
+        threading.Thread(target=self._rebuild, args=(current_app._get_current_object(),),
+                         daemon=True).start()
+
+    def _rebuild(self, app) -> None:
+        try:
+            with app.app_context():
+                index = self.build()
+        except Exception:
+            app.logger.exception(f"{self.name} rebuild failed; keeping the previous index.")
+            with self._lock:
+                self._rebuilding = None
+            return
+
+        with self._lock:
+            for change in self._rebuilding:
+                change(index)
+            self._index, self._rebuilding = index, None
+        app.logger.info(f"{self.name} rebuilt: {index.nbytes() / 2**20:.1f} MiB.")
+
+    def apply(self, change) -> None:
+        """Apply a committed change, a callable taking the index, to the live index."""
+        with self._lock:
+            if self._index is None:
+                return  # The first build will read the change from the table
+            change(self._index)
+            if self._rebuilding is not None:
+                self._rebuilding.append(change)
+            elif self._index.pending() > self.compact_threshold:
+                self._start_rebuild()
+
+    def reset(self) -> None:
+        """Drop the index so the next access rebuilds it."""
+        with self._lock:
+            self._index = None
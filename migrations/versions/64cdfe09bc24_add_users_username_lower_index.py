@@ -0,0 +1,27 @@
+"""add users lower(username) index for short search queries
+
+Revision ID: 64cdfe09bc24
+Revises: 8e82c60f0722
+Create Date: 2026-10-19 09:12:41.207315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '64cdfe09bc24'
+down_revision = '8e82c60f0722'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_username_lower', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,28 @@
+"""add users.fanout_on_read
+
+Revision ID: 678fb966c7b7
+Revises: f118e276c6b5
+Create Date: 2026-10-18 11:26:03.184470
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '678fb966c7b7'
+down_revision = 'f118e276c6b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fanout_on_read', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    # Existing high-follower accounts are flagged by `flask rebuild-timelines`.
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('fanout_on_read')
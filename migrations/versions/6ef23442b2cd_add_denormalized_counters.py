@@ -0,0 +1,97 @@
+"""add denormalized counters
+
+Revision ID: 6ef23442b2cd
+Revises: 678fb966c7b7
+Create Date: 2026-10-18 12:04:51.302118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6ef23442b2cd'
+down_revision = '678fb966c7b7'
+branch_labels = None
+depends_on = None
+
+
+USER_COUNTERS = ('messages_count', 'followers_count', 'following_count', 'likes_count')
+
+# Snapshot of app/counters.py COUNTER_TRIGGERS at this revision
+TRIGGERS = [
+    ('messages', 'messages_counters',
+     ["UPDATE users SET messages_count = messages_count + 1 WHERE id = NEW.user_id"],
+     ["UPDATE users SET messages_count = messages_count - 1 WHERE id = OLD.user_id"]),
+    ('follows', 'follows_counters',
+     ["UPDATE users SET followers_count = followers_count + 1 WHERE id = NEW.user_being_followed_id",
+      "UPDATE users SET following_count = following_count + 1 WHERE id = NEW.user_following_id"],
+     ["UPDATE users SET followers_count = followers_count - 1 WHERE id = OLD.user_being_followed_id",
+      "UPDATE users SET following_count = following_count - 1 WHERE id = OLD.user_following_id"]),
+    ('likes', 'likes_counters',
+     ["UPDATE users SET likes_count = likes_count + 1 WHERE id = NEW.user_id",
+      "UPDATE messages SET likes_count = likes_count + 1 WHERE id = NEW.message_id"],
+     ["UPDATE users SET likes_count = likes_count - 1 WHERE id = OLD.user_id",
+      "UPDATE messages SET likes_count = likes_count - 1 WHERE id = OLD.message_id"]),
+]
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        for name in USER_COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill existing rows; large databases can re-run `flask reconcile-counters` afterwards
+    op.execute("""
+        UPDATE users SET
+            messages_count = (SELECT count(*) FROM messages WHERE messages.user_id = users.id),
+            followers_count = (SELECT count(*) FROM follows WHERE follows.user_being_followed_id = users.id),
+            following_count = (SELECT count(*) FROM follows WHERE follows.user_following_id = users.id),
+            likes_count = (SELECT count(*) FROM likes WHERE likes.user_id = users.id)
+    """)
+    op.execute("""
+        UPDATE messages SET
+            likes_count = (SELECT count(*) FROM likes WHERE likes.message_id = messages.id)
+    """)
+
+    dialect = op.get_bind().dialect.name
+    for table, name, on_insert, on_delete in TRIGGERS:
+        if dialect == 'postgresql':
+            op.execute(
+                f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$ BEGIN "
+                f"IF TG_OP = 'INSERT' THEN " + " ".join(f"{stmt};" for stmt in on_insert)
+                + " ELSE " + " ".join(f"{stmt};" for stmt in on_delete)
+                + " END IF; RETURN NULL; END $$ LANGUAGE plpgsql"
+            )
+            op.execute(
+                f"CREATE TRIGGER {name} AFTER INSERT OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {name}()"
+            )
+        elif dialect == 'sqlite':
+            for event_name, body in (('INSERT', on_insert), ('DELETE', on_delete)):
+                op.execute(
+                    f"CREATE TRIGGER {name}_{event_name.lower()} "
+                    f"AFTER {event_name} ON {table} FOR EACH ROW BEGIN "
+                    + " ".join(f"{stmt};" for stmt in body) + " END"
+                )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for table, name, _, _ in TRIGGERS:
+        if dialect == 'postgresql':
+            op.execute(f"DROP TRIGGER IF EXISTS {name} ON {table}")
+            op.execute(f"DROP FUNCTION IF EXISTS {name}()")
+        elif dialect == 'sqlite':
+            op.execute(f"DROP TRIGGER IF EXISTS {name}_insert")
+            op.execute(f"DROP TRIGGER IF EXISTS {name}_delete")
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('likes_count')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        for name in reversed(USER_COUNTERS):
+            batch_op.drop_column(name)
@@ -0,0 +1,53 @@
+"""add timelines table
+
+Revision ID: 74fe53487501
+Revises: 93db0d88feeb
+Create Date: 2026-10-18 09:12:41.302118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '74fe53487501'
+down_revision = '93db0d88feeb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timelines',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'message_id')
+    )
+    with op.batch_alter_table('timelines', schema=None) as batch_op:
+        batch_op.create_index('ix_timelines_user_id_timestamp', ['user_id', 'timestamp', 'message_id'], unique=False)
+        batch_op.create_index('ix_timelines_user_id_author_id', ['user_id', 'author_id'], unique=False)
+        batch_op.create_index('ix_timelines_message_id', ['message_id'], unique=False)
+
+    # Materialize existing history: own messages plus messages of followed users.
+    # `flask rebuild-timelines` does the same in batches for large tables.
+    op.execute("""
+        INSERT INTO timelines (user_id, message_id, author_id, timestamp)
+        SELECT f.user_following_id, m.id, m.user_id, m.timestamp
+        FROM follows f JOIN messages m ON m.user_id = f.user_being_followed_id
+        WHERE f.user_following_id <> f.user_being_followed_id
+        UNION ALL
+        SELECT m.user_id, m.id, m.user_id, m.timestamp FROM messages m
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('timelines', schema=None) as batch_op:
+        batch_op.drop_index('ix_timelines_message_id')
+        batch_op.drop_index('ix_timelines_user_id_author_id')
+        batch_op.drop_index('ix_timelines_user_id_timestamp')
+
+    op.drop_table('timelines')
@@ -0,0 +1,42 @@
+"""user search: pg_trgm GIN indexes on Postgres, users_fts table on SQLite
+
+Revision ID: 80ed1c578cda
+Revises: e89f7e106e94
+Create Date: 2026-10-18 15:02:17.413580
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '80ed1c578cda'
+down_revision = 'e89f7e106e94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            op.create_index('ix_users_username_trgm', 'users', ['username'], postgresql_using='gin',
+                            postgresql_ops={'username': 'gin_trgm_ops'}, postgresql_concurrently=True)
+            op.create_index('ix_users_email_trgm', 'users', ['email'], postgresql_using='gin',
+                            postgresql_ops={'email': 'gin_trgm_ops'}, postgresql_concurrently=True)
+    elif bind.dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(username, email, tokenize='trigram')")
+        op.execute("INSERT INTO users_fts (rowid, username, email) SELECT id, username, email FROM users")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_users_email_trgm', table_name='users', postgresql_concurrently=True)
+            op.drop_index('ix_users_username_trgm', table_name='users', postgresql_concurrently=True)
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS users_fts")
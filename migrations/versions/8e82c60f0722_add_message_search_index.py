@@ -0,0 +1,39 @@
+"""message search: GIN to_tsvector index on Postgres, messages_fts table on SQLite
+
+Revision ID: 8e82c60f0722
+Revises: 80ed1c578cda
+Create Date: 2026-10-18 17:20:44.105932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e82c60f0722'
+down_revision = '80ed1c578cda'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        # An expression index needs no new column, so nothing rewrites the table
+        with op.get_context().autocommit_block():
+            op.create_index('ix_messages_text_fts', 'messages', [sa.text("to_tsvector('english', text)")],
+                            postgresql_using='gin', postgresql_concurrently=True)
+    elif bind.dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, tokenize='porter unicode61')")
+        op.execute("INSERT INTO messages_fts (rowid, text) SELECT id, text FROM messages")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_messages_text_fts', table_name='messages', postgresql_concurrently=True)
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS messages_fts")
@@ -0,0 +1,133 @@
+"""likes: (user_id, message_id) primary key, reverse index and created_at
+
+Revision ID: e89f7e106e94
+Revises: 6ef23442b2cd
+Create Date: 2026-10-18 13:12:40.871625
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e89f7e106e94'
+down_revision = '6ef23442b2cd'
+branch_labels = None
+depends_on = None
+
+
+DEDUPE_BATCH_SIZE = 10000
+UNIQUE_INDEX_ATTEMPTS = 5
+
+# Duplicate likes keep their lowest id. Each batch scans one id range so no
+# transaction holds locks on more than DEDUPE_BATCH_SIZE rows. The EXISTS
+# lookup is served by ix_likes_message_id_user_id, which upgrade() builds
+# first; without it every batch would scan the whole table.
+DEDUPE_RANGE = sa.text("""
+    DELETE FROM likes
+    WHERE id > :lo AND id <= :hi
+      AND EXISTS (SELECT 1 FROM likes AS kept
+                  WHERE kept.user_id = likes.user_id
+                    AND kept.message_id = likes.message_id
+                    AND kept.id < likes.id)
+""")
+
+# Snapshot of the likes triggers from app/counters.py; SQLite drops them
+# when batch mode recreates the table.
+SQLITE_LIKES_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS likes_counters_insert AFTER INSERT ON likes FOR EACH ROW BEGIN "
+    "UPDATE users SET likes_count = likes_count + 1 WHERE id = NEW.user_id; "
+    "UPDATE messages SET likes_count = likes_count + 1 WHERE id = NEW.message_id; END",
+    "CREATE TRIGGER IF NOT EXISTS likes_counters_delete AFTER DELETE ON likes FOR EACH ROW BEGIN "
+    "UPDATE users SET likes_count = likes_count - 1 WHERE id = OLD.user_id; "
+    "UPDATE messages SET likes_count = likes_count - 1 WHERE id = OLD.message_id; END",
+]
+
+
+def dedupe_likes(bind):
+    """Delete duplicate (user_id, message_id) rows in id-range batches."""
+    max_id = bind.execute(sa.text("SELECT max(id) FROM likes")).scalar() or 0
+    for lo in range(0, max_id, DEDUPE_BATCH_SIZE):
+        bind.execute(DEDUPE_RANGE, {'lo': lo, 'hi': lo + DEDUPE_BATCH_SIZE})
+
+
+def create_index_concurrently(name, columns, **kw):
+    """Build a Postgres index online, first dropping any copy a failed earlier run left INVALID."""
+    op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.create_index(name, 'likes', columns, postgresql_concurrently=True, **kw)
+
+
+def create_unique_index(bind):
+    """Dedupe, then build the unique index, again and again if likes race the build.
+
+    The like path still writes to the old schema, which allows duplicates,
+    so one can land between the dedupe and the index build. The build then
+    fails and leaves an INVALID index behind, which is dropped before the
+    next attempt.
+    """
+    for _ in range(UNIQUE_INDEX_ATTEMPTS):
+        dedupe_likes(bind)
+        try:
+            create_index_concurrently('uq_likes_user_id_message_id', ['user_id', 'message_id'], unique=True)
+            return
+        except sa.exc.IntegrityError:
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_likes_user_id_message_id")
+    raise RuntimeError(f"Duplicate likes kept arriving during {UNIQUE_INDEX_ATTEMPTS} unique index builds; "
+                       "pause the like endpoint and rerun the migration.")
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name != 'postgresql':
+        # Batch mode carries the index over to the recreated table
+        op.create_index('ix_likes_message_id_user_id', 'likes', ['message_id', 'user_id'])
+        dedupe_likes(bind)
+        with op.batch_alter_table('likes', schema=None, recreate='always') as batch_op:
+            batch_op.drop_column('id')
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+            batch_op.create_primary_key('pk_likes', ['user_id', 'message_id'])
+        op.create_index('ix_likes_user_id_created_at', 'likes', ['user_id', 'created_at', 'message_id'])
+        if bind.dialect.name == 'sqlite':
+            for statement in SQLITE_LIKES_TRIGGERS:
+                op.execute(statement)
+        return
+
+    # Postgres, online: every step either takes a brief lock or runs CONCURRENTLY.
+    # The autocommit block commits what came before it, so every step up to
+    # the key swap tolerates a rerun after a failed build.
+    # now() is stable, so adding the column does not rewrite the table.
+    op.execute("ALTER TABLE likes ADD COLUMN IF NOT EXISTS created_at TIMESTAMP WITHOUT TIME ZONE "
+               "NOT NULL DEFAULT now()")
+
+    with op.get_context().autocommit_block():
+        create_index_concurrently('ix_likes_message_id_user_id', ['message_id', 'user_id'])
+        create_unique_index(bind)
+        create_index_concurrently('ix_likes_user_id_created_at', ['user_id', 'created_at', 'message_id'])
+
+    # Swap the primary key onto the prebuilt unique index, then drop the surrogate id
+    op.execute("ALTER TABLE likes DROP CONSTRAINT likes_pkey, "
+               "ADD CONSTRAINT likes_pkey PRIMARY KEY USING INDEX uq_likes_user_id_message_id")
+    op.drop_column('likes', 'id')
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    op.drop_index('ix_likes_user_id_created_at', table_name='likes')
+    op.drop_index('ix_likes_message_id_user_id', table_name='likes')
+
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('likes', schema=None, recreate='always') as batch_op:
+            batch_op.drop_column('created_at')
+            batch_op.add_column(sa.Column('id', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.create_primary_key('pk_likes', ['id', 'user_id', 'message_id'])
+        if bind.dialect.name == 'sqlite':
+            for statement in SQLITE_LIKES_TRIGGERS:
+                op.execute(statement)
+        return
+
+    op.execute("ALTER TABLE likes DROP CONSTRAINT likes_pkey")
+    op.add_column('likes', sa.Column('id', sa.Integer(), sa.Identity(), nullable=False))
+    op.create_primary_key('likes_pkey', 'likes', ['id', 'user_id', 'message_id'])
+    op.drop_column('likes', 'created_at')
@@ -0,0 +1,34 @@
+"""add messages (user_id, timestamp DESC) index
+
+Revision ID: f118e276c6b5
+Revises: 74fe53487501
+Create Date: 2026-10-18 10:04:17.550912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f118e276c6b5'
+down_revision = '74fe53487501'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction on Postgres; elsewhere the
+    # flag is ignored and the index is built normally.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_user_id_timestamp',
+            'messages',
+            ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_user_id_timestamp', table_name='messages', postgresql_concurrently=True)
@@ -0,0 +1,67 @@
+"""scripts/bench_autocomplete.py
+
+Benchmark the in-memory username prefix index.
+
+Reports build time, packed memory, and `complete` latency for random
+two- to four-character prefixes, before and after an overlay of recent
+registrations. The index is built straight from generated usernames, so no
+database is needed.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_autocomplete.py --users 2000000
+"""
+
+import argparse
+import random
+import string
+import time
+from app.autocomplete import UsernameIndex
+
+
+def make_username(rng: random.Random) -> str:
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + str(rng.randint(0, 99))
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples in milliseconds."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def timed(index: UsernameIndex, prefixes: list) -> list:
+    samples = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.complete(prefix)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000000)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--overlay', type=int, default=1000, help="Registrations recorded after the build.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = [(make_username(rng), i) for i in range(1, args.users + 1)]
+
+    start = time.perf_counter()
+    index = UsernameIndex(entries)
+    print(f"build: {time.perf_counter() - start:.2f}s, packed: {index.nbytes() / 2**20:.1f} MiB")
+    del entries
+
+    prefixes = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 4))) for _ in range(args.queries)]
+    samples = timed(index, prefixes)
+    print(f"complete          p50={percentile(samples, .5):7.3f}ms p99={percentile(samples, .99):7.3f}ms")
+
+    for i in range(args.overlay):
+        index.add(args.users + 1 + i, make_username(rng))
+    samples = timed(index, prefixes)
+    print(f"complete+overlay  p50={percentile(samples, .5):7.3f}ms p99={percentile(samples, .99):7.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
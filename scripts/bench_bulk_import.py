@@ -0,0 +1,59 @@
+"""scripts/bench_bulk_import.py
+
+Benchmark bulk user import against one `User.signup` per user.
+
+Imports `--users` generated users with `import_users`, once per process
+count in `--processes`, into a fresh database each time, and times
+`User.signup` on a `--signup-sample` subset for comparison. Reports users
+per second. Hashing dominates, so import throughput should grow roughly
+linearly with processes, up to the number of cores.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_bulk_import.py --users 2000 --cost 10 --processes 1,2,4
+
+Uses the testing config (in-memory SQLite unless TEST_DATABASE_URL is set).
+"""
+
+import argparse
+import os
+import time
+from app import create_app
+from app.models import db, User
+from app.passwords import password_hasher
+from app.bulk_import import ImportRow, import_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--cost', type=int, default=10)
+    parser.add_argument('--processes', default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument('--signup-sample', type=int, default=100)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        password_hasher.rounds = args.cost
+        rows = [ImportRow(i + 2, f"partner{i}", f"partner{i}@example.com", f"password-{i}")
+                for i in range(args.users)]
+
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        for row in rows[:args.signup_sample]:
+            User.signup(row.username, row.email, row.password)
+        elapsed = time.perf_counter() - start
+        print(f"signup loop        {args.signup_sample / elapsed:8.1f} users/s")
+
+        for processes in sorted({int(p) for p in args.processes.split(',')}):
+            db.drop_all()
+            db.create_all()
+            start = time.perf_counter()
+            report = import_users(rows, processes=processes)
+            elapsed = time.perf_counter() - start
+            print(f"import processes={processes:<2} {report.created / elapsed:8.1f} users/s "
+                  f"({report.created} created, {len(report.conflicts)} rejected)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""scripts/bench_fanout.py
+
+Benchmark pure push vs hybrid push/pull timelines on a synthetic follow graph.
+
+The graph has a power-law (Zipf) in-degree, so a few accounts collect most
+followers. For each mode the script reports the timeline rows written per post
+(write amplification), the posting latency for authors below and above the
+follower limit, and the home-feed read latency for readers who follow a
+fan-out-on-read account and readers who don't.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_fanout.py --users 5000 --follows 100000 --limit 200
+
+Uses the testing config (in-memory SQLite unless TEST_DATABASE_URL is set).
+"""
+
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import insert, select, func
+from app import create_app
+from app.models import db, User, Message, follows
+from app.timeline import fan_out_message, home_feed_page, rebuild_timelines, timelines
+
+
+def build_graph(num_users: int, num_follows: int, alpha: float, rng: random.Random):
+    """Return follow pairs whose followed side follows a Zipf distribution."""
+    weights = [1 / (rank + 1) ** alpha for rank in range(num_users)]
+    followed = rng.choices(range(1, num_users + 1), weights=weights, k=num_follows)
+    pairs = set()
+    for user_being_followed_id in followed:
+        user_following_id = rng.randint(1, num_users)
+        if user_following_id != user_being_followed_id:
+            pairs.add((user_being_followed_id, user_following_id))
+    return [{'user_being_followed_id': a, 'user_following_id': b} for a, b in pairs]
+
+
+def seed(num_users: int, num_follows: int, alpha: float, rng: random.Random) -> None:
+    """Create users, the follow graph and a little history per user."""
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(User), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x'}
+        for i in range(1, num_users + 1)
+    ])
+    db.session.execute(insert(follows), build_graph(num_users, num_follows, alpha, rng))
+    db.session.execute(insert(Message), [
+        {'text': f'history {i}', 'user_id': rng.randint(1, num_users)} for i in range(num_users)
+    ])
+    db.session.commit()
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples in milliseconds."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def run_mode(app, limit, threshold: int, posts: int, reads: int, rng: random.Random) -> dict:
+    """Rebuild timelines under a follower limit, then time posts and feed reads.
+
+    Authors and readers are split on `threshold` in both modes so the pure
+    push run shows what the big accounts cost without the hybrid path.
+    """
+    app.config['TIMELINE_FANOUT_FOLLOWER_LIMIT'] = limit
+    rebuild_timelines(batch_size=1000)
+
+    follower_counts = dict(db.session.execute(
+        select(follows.c.user_being_followed_id, func.count())
+        .group_by(follows.c.user_being_followed_id)
+    ).all())
+    big = {author_id for author_id, count in follower_counts.items() if count > threshold}
+    # Sample authors by follower count so the biggest accounts get to post
+    authors = rng.choices(list(follower_counts), weights=list(follower_counts.values()), k=posts)
+
+    written = {'below': [], 'above': []}
+    post_latency = {'below': [], 'above': []}
+    for author_id in authors:
+        side = 'above' if author_id in big else 'below'
+        start = time.perf_counter()
+        msg = Message(text='benchmark', user_id=author_id)
+        db.session.add(msg)
+        rows = fan_out_message(msg)
+        db.session.commit()
+        post_latency[side].append(time.perf_counter() - start)
+        written[side].append(rows)
+
+    readers = db.session.execute(select(follows.c.user_following_id, follows.c.user_being_followed_id)).all()
+    following_big = sorted({r for r, f in readers if f in big})
+    others = sorted({r for r, _ in readers} - set(following_big))
+    read_latency = {}
+    for label, group in (('follows big', following_big), ('push only', others)):
+        samples = []
+        for reader in rng.sample(group, min(reads, len(group))):
+            start = time.perf_counter()
+            home_feed_page(reader, None, 50)
+            samples.append(time.perf_counter() - start)
+        read_latency[label] = samples
+
+    return {
+        'timeline_rows': db.session.scalar(select(func.count()).select_from(timelines)),
+        'written': written,
+        'post_latency': post_latency,
+        'read_latency': read_latency,
+    }
+
+
+def report(name: str, result: dict) -> None:
+    """Print one mode's results."""
+    print(f"\n== {name} ==")
+    print(f"timeline rows after run: {result['timeline_rows']}")
+    for side in ('below', 'above'):
+        rows, latency = result['written'][side], result['post_latency'][side]
+        if rows:
+            print(f"posts by authors {side} limit: n={len(rows):<5} "
+                  f"rows/post mean={statistics.mean(rows):9.1f} max={max(rows):7d}  "
+                  f"post p50={percentile(latency, .5):7.2f}ms p99={percentile(latency, .99):7.2f}ms")
+    for label, samples in result['read_latency'].items():
+        if samples:
+            print(f"feed read ({label:<14}): n={len(samples):<5} "
+                  f"p50={percentile(samples, .5):7.2f}ms p99={percentile(samples, .99):7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--follows', type=int, default=100000)
+    parser.add_argument('--alpha', type=float, default=1.1, help="Zipf exponent of the in-degree distribution.")
+    parser.add_argument('--limit', type=int, default=200, help="Follower limit for the hybrid run.")
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--reads', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        for name, limit in (('pure push', None), (f'hybrid (limit={args.limit})', args.limit)):
+            rng = random.Random(args.seed)
+            seed(args.users, args.follows, args.alpha, rng)
+            report(name, run_mode(app, limit, args.limit, args.posts, args.reads, rng))
+
+
+if __name__ == '__main__':
+    main()
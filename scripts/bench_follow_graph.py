@@ -0,0 +1,68 @@
+"""scripts/bench_follow_graph.py
+
+Benchmark the in-memory follow graph on a synthetic power-law graph.
+
+Reports build time, array memory, and the latency of `recommend` and
+`followers_you_know` for random users. The graph is built straight from
+generated edges, so no database is needed.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_follow_graph.py --users 200000 --follows 3000000
+"""
+
+import argparse
+import random
+import time
+from app.follow_graph import FollowGraph
+
+
+def build_edges(num_users: int, num_follows: int, alpha: float, rng: random.Random) -> list:
+    """Return sorted, de-duplicated follow pairs with a Zipf in-degree."""
+    weights = [1 / (rank + 1) ** alpha for rank in range(num_users)]
+    followed = rng.choices(range(1, num_users + 1), weights=weights, k=num_follows)
+    pairs = {(rng.randint(1, num_users), f) for f in followed}
+    return sorted((a, b) for a, b in pairs if a != b)
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples in milliseconds."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def timed(fn, args_list) -> list:
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--follows', type=int, default=3000000)
+    parser.add_argument('--alpha', type=float, default=1.1, help="Zipf exponent of the in-degree distribution.")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    edges = build_edges(args.users, args.follows, args.alpha, rng)
+    print(f"edges: {len(edges)}")
+
+    start = time.perf_counter()
+    graph = FollowGraph(edges, args.users + 1)
+    print(f"build: {time.perf_counter() - start:.2f}s, arrays: {graph.nbytes() / 2**20:.1f} MiB")
+
+    users = [(rng.randint(1, args.users),) for _ in range(args.queries)]
+    pairs = [(rng.randint(1, args.users), rng.randint(1, 100)) for _ in range(args.queries)]
+    for name, samples in (('recommend', timed(graph.recommend, users)),
+                          ('followers_you_know', timed(graph.followers_you_know, pairs))):
+        print(f"{name:<19} p50={percentile(samples, .5):7.3f}ms p99={percentile(samples, .99):7.3f}ms "
+              f"max={max(samples) * 1000:7.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
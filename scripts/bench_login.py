@@ -0,0 +1,90 @@
+"""scripts/bench_login.py
+
+Benchmark login throughput against the bcrypt cost, and what a login surge
+does to other requests.
+
+For each cost, `--clients` threads each verify `--logins` passwords, like
+request workers handling a burst in `auth.login`. Meanwhile a probe thread
+runs a small pure-Python task every 10ms, standing in for a feed request.
+The script reports logins/s and the probe's p99 latency, first with bcrypt
+run inline on every client thread and then through `PasswordHasher` with
+`--workers` threads.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_login.py --costs 10,11,12 --clients 16 --workers 2
+"""
+
+import argparse
+import threading
+import time
+import bcrypt
+from flask import Flask
+from app.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples in milliseconds."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def probe(stop: threading.Event, samples: list) -> None:
+    """Time a small CPU-bound task (a feed render stand-in) until stopped."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        sum(i * i for i in range(2000))
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def run(check, clients: int, logins: int) -> tuple[float, float, int]:
+    """Run the surge; return (logins/s, probe p99 ms, logins shed)."""
+    stop, samples, shed = threading.Event(), [], []
+    prober = threading.Thread(target=probe, args=(stop, samples))
+    prober.start()
+
+    def client():
+        for _ in range(logins):
+            try:
+                check()
+            except PasswordHasherBusy:
+                shed.append(1)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    return (clients * logins - len(shed)) / elapsed, percentile(samples, .99), len(shed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', default='10,11,12')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=4, help="Logins per client.")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-pending', type=int, default=None)
+    args = parser.parse_args()
+
+    password = b"correct horse battery staple"
+    for cost in map(int, args.costs.split(',')):
+        stored = bcrypt.hashpw(password, bcrypt.gensalt(cost))
+        app = Flask(__name__)
+        app.config.update(BCRYPT_LOG_ROUNDS=cost, PASSWORD_HASH_WORKERS=args.workers,
+                          PASSWORD_HASH_MAX_PENDING=args.max_pending)
+        hasher = PasswordHasher(app)
+
+        for name, check in (('inline', lambda: bcrypt.checkpw(password, stored)),
+                            ('executor', lambda: hasher.check(stored.decode(), password.decode()))):
+            rate, p99, shed = run(check, args.clients, args.logins)
+            print(f"cost={cost:<2} {name:<8} {rate:7.1f} logins/s  probe p99={p99:7.2f}ms  shed={shed}")
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""scripts/bench_startup.py
+
+Benchmark worker cold start.
+
+For each config in `--configs`, starts `--runs` fresh interpreters that
+import `app` and call `create_app(config)`. Reports the median time spent
+importing, in `create_app`, and for the whole process including interpreter
+startup. Every run is a new process, so nothing is shared with earlier
+runs except the OS file cache.
+
+The `forked` row measures a worker forked from a parent that has already
+built the app, as `gunicorn --preload wsgi:app` does. It times the fork
+and the worker's first response to `/`. `create_app` opens no database
+connection, so forking after it is safe.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_startup.py --configs production,development --runs 10
+
+Missing database URLs default to in-memory SQLite; no connection is opened.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app({config!r})
+created = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'create_app': created - imported}}))
+"""
+
+FORK_CHILD = """
+import json, os, time
+from app import create_app
+app = create_app({config!r})
+samples = []
+for _ in range({runs}):
+    read_end, write_end = os.pipe()
+    started = time.perf_counter()
+    if os.fork() == 0:
+        app.test_client().get('/')
+        os.write(write_end, b'x')
+        os._exit(0)
+    os.read(read_end, 1)
+    samples.append(time.perf_counter() - started)
+    os.wait()
+    os.close(read_end)
+    os.close(write_end)
+print(json.dumps(samples))
+"""
+
+
+def run_once(config: str, env: dict) -> dict:
+    """Start one interpreter and return its timings in seconds."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD.format(config=config)],
+                            env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = time.perf_counter() - started
+    timings['quiet'] = result.stdout.count('\n') == 1 and not result.stderr
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--configs', default="production,development")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    for name in ('DEV_DATABASE_URL', 'DATABASE_URL'):
+        env.setdefault(name, 'sqlite://')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+
+    configs = args.configs.split(',')
+    print(f"{'config':<12} {'import':>9} {'create_app':>11} {'process':>9}  output")
+    for config in configs:
+        runs = [run_once(config, env) for _ in range(args.runs)]
+        medians = {key: statistics.median(run[key] for run in runs) * 1000
+                   for key in ('import', 'create_app', 'process')}
+        quiet = "none" if all(run['quiet'] for run in runs) else "printed/logged"
+        print(f"{config:<12} {medians['import']:>7.0f}ms {medians['create_app']:>9.1f}ms "
+              f"{medians['process']:>7.0f}ms  {quiet}")
+
+    if hasattr(os, 'fork'):
+        result = subprocess.run([sys.executable, '-c', FORK_CHILD.format(config=configs[0], runs=args.runs)],
+                                env=env, capture_output=True, text=True, check=True)
+        samples = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{'forked':<12} {'-':>9} {'-':>11} {statistics.median(samples) * 1000:>7.1f}ms  "
+              f"({configs[0]}, fork to first response)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""scripts/bench_throttle.py
+
+Benchmark the login throttle's overhead.
+
+Times `LoginThrottle.check` on the normal path (a few IPs and usernames
+whose buckets are warm), during a flood of distinct attacker IPs that keeps
+the bounded store evicting, and once every bucket in play is empty (every
+attempt refused). For scale, it also times one bcrypt check at the
+configured cost, which is what each refused attempt saves.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_throttle.py --attempts 200000 --cost 12
+"""
+
+import argparse
+import random
+import time
+import bcrypt
+from flask import Flask
+from app.throttle import LoginThrottle
+
+
+def per_call_us(fn, args_list) -> float:
+    start = time.perf_counter()
+    for args in args_list:
+        fn(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attempts', type=int, default=200000)
+    parser.add_argument('--max-entries', type=int, default=100000)
+    parser.add_argument('--cost', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = Flask(__name__)
+    app.config.update(LOGIN_THROTTLE_MAX_ENTRIES=args.max_entries,
+                      LOGIN_THROTTLE_IP_BURST=10**9, LOGIN_THROTTLE_USERNAME_BURST=10**9)
+    throttle = LoginThrottle(app)
+
+    normal = [(f"10.0.0.{rng.randint(1, 50)}", f"user{rng.randint(1, 500)}") for _ in range(args.attempts)]
+    print(f"normal path      {per_call_us(throttle.check, normal):6.2f}us per attempt")
+
+    flood = [(f"{rng.randint(1, 2**32)}", f"user{rng.randint(1, 10**6)}") for _ in range(args.attempts)]
+    print(f"distinct-IP flood {per_call_us(throttle.check, flood):5.2f}us per attempt, "
+          f"evictions={throttle.backend.stats()['evictions']}")
+
+    app.config.update(LOGIN_THROTTLE_IP_BURST=1, LOGIN_THROTTLE_USERNAME_BURST=1)
+    throttle = LoginThrottle(app)
+    throttle.check("203.0.113.9", "victim")
+    refused = [("203.0.113.9", "victim")] * args.attempts
+    print(f"refused          {per_call_us(throttle.check, refused):6.2f}us per attempt")
+
+    stored = bcrypt.hashpw(b"password", bcrypt.gensalt(args.cost))
+    start = time.perf_counter()
+    bcrypt.checkpw(b"guess", stored)
+    print(f"bcrypt cost={args.cost}   {(time.perf_counter() - start) * 1e6:9.0f}us per check avoided")
+
+
+if __name__ == '__main__':
+    main()
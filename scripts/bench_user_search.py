@@ -0,0 +1,95 @@
+"""scripts/bench_user_search.py
+
+Benchmark indexed user search against the `ILIKE '%q%'` scan it replaced.
+
+Seeds `--users` users with random pronounceable usernames, builds the search
+index, then times the same random substrings through the unindexed
+`UserSearch` fallback and through `search_users` (pg_trgm on Postgres,
+FTS5 on SQLite). Reports p50/p99 latency for the first page of each.
+
+Usage (from the project root):
+    PYTHONPATH=. python scripts/bench_user_search.py --users 1000000 --queries 200
+
+Uses the testing config (in-memory SQLite unless TEST_DATABASE_URL is set).
+"""
+
+import argparse
+import random
+import time
+from sqlalchemy import insert
+from app import create_app
+from app.models import db, User
+from app.search import UserSearch, search_users, reindex_users
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'tor', 'bel', 'sin', 'dra', 'quo', 'zel', 'fen', 'ash', 'or', 'ul']
+
+
+def make_username(i: int, rng: random.Random) -> str:
+    return ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) + str(i)
+
+
+def seed(num_users: int, rng: random.Random, batch_size: int = 50000) -> list[str]:
+    """Insert users in batches and return their usernames."""
+    db.drop_all()
+    db.create_all()
+    usernames = []
+    for lo in range(1, num_users + 1, batch_size):
+        rows = []
+        for i in range(lo, min(lo + batch_size, num_users + 1)):
+            username = make_username(i, rng)
+            usernames.append(username)
+            rows.append({'id': i, 'username': username, 'email': f'{username}@example.com', 'password': 'x'})
+        db.session.execute(insert(User), rows)
+        db.session.commit()
+    return usernames
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Return the pct-th percentile of samples in milliseconds."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def timed(fn, terms: list) -> list:
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        fn(term)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = create_app('testing')
+    with app.app_context():
+        start = time.perf_counter()
+        usernames = seed(args.users, rng)
+        print(f"seed: {args.users} users in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        reindex_users(batch_size=10000)
+        print(f"index: {time.perf_counter() - start:.1f}s")
+
+        terms = []
+        for username in rng.sample(usernames, args.queries):
+            at = rng.randint(0, len(username) - 4)
+            terms.append(username[at:at + rng.randint(4, 6)])
+
+        scan = UserSearch()
+        for name, samples in (
+            ('ILIKE scan', timed(lambda t: scan.query(t).limit(args.per_page).all(), terms)),
+            ('indexed', timed(lambda t: search_users(t, per_page=args.per_page), terms)),
+        ):
+            print(f"{name:<10} p50={percentile(samples, .5):8.2f}ms p99={percentile(samples, .99):8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,28 @@
-"""scripts/fix_plaintext_passwords.py"""
+"""scripts/fix_plaintext_passwords.py
 
+Hash every plaintext password in batches (see app/rehash.py). Safe to
+interrupt: re-running resumes after the last committed batch. `flask
+rehash-passwords` does the same from the Flask CLI.
+"""
+
+import argparse
 from app import create_app
-from app.models import db, User
+from app.rehash import rehash_passwords
+
+parser = argparse.ArgumentParser(description="Hash plaintext passwords in resumable batches.")
+parser.add_argument('--batch-size', type=int, default=1000)
+parser.add_argument('--processes', type=int, default=None)
+parser.add_argument('--cost', type=int, default=None, help="bcrypt cost (default: BCRYPT_LOG_ROUNDS).")
+parser.add_argument('--restart', action='store_true', help="Scan from the first user instead of resuming.")
+args = parser.parse_args()
 
 app = create_app()
 
 with app.app_context():
-    users = User.query.all()
-    for user in users:
-        if not user.password.startswith("$2b$"):  # Check for bcrypt hash
-            print(f"Fixing password for user: {user.username}")
-            user.set_password(user.password)  # Rehash the plaintext password
-            db.session.add(user)
-
-    db.session.commit()
-    print("All plaintext passwords have been hashed.")
+    report = rehash_passwords(
+        batch_size=args.batch_size, processes=args.processes, rounds=args.cost, restart=args.restart,
+        progress=lambda report, rate: print(f"{report.scanned} users scanned, {report.hashed} hashed "
+                                            f"({rate:,.0f} users/s)"),
+    )
+    print(f"All plaintext passwords have been hashed ({report.hashed} of {report.scanned} users). "
+          f"{report.stale} hashes at another cost will be upgraded at their next login.")
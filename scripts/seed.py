@@ -1,10 +1,15 @@
-"""Seed database with sample data from CSV files."""
+"""Seed database with sample data from CSV files.
+
+Streams the CSVs in chunks (see app/seed.py). By default every table is
+dropped and recreated first; pass --resume to continue a load that was
+interrupted. `flask seed` does the same from the Flask CLI.
+"""
 
 import os
+import argparse
 import logging
-from csv import DictReader
-from app import db, create_app
-from app.models import User, Message, Follows
+from app import create_app
+from app.seed import seed_files, load_seed
 
 logging.basicConfig(level=logging.INFO)
 
@@ -12,6 +17,7 @@ logging.basicConfig(level=logging.INFO)
 USERS_CSV = os.getenv('USERS_CSV', 'app/generator/users.csv')
 MESSAGES_CSV = os.getenv('MESSAGES_CSV', 'app/generator/messages.csv')
 FOLLOWS_CSV = os.getenv('FOLLOWS_CSV', 'app/generator/follows.csv')
+LIKES_CSV = os.getenv('LIKES_CSV')  # Optional; see app/generator/create_csvs.py
 
 def validate_csv(file_path):
     """Check if the CSV file exists and is readable."""
@@ -20,43 +26,25 @@ def validate_csv(file_path):
     if not file_path.endswith('.csv'):
         raise ValueError(f"{file_path} is not a valid CSV file.")
 
-def seed_users():
-    """Seed users table from users.csv."""
-    logging.info("Seeding users...")
-    validate_csv(USERS_CSV)
-    with open(USERS_CSV) as users:
-        db.session.bulk_insert_mappings(User, DictReader(users))
-    logging.info("Users seeded successfully.")
-
-def seed_messages():
-    """Seed messages table from messages.csv."""
-    logging.info("Seeding messages...")
-    validate_csv(MESSAGES_CSV)
-    with open(MESSAGES_CSV) as messages:
-        db.session.bulk_insert_mappings(Message, DictReader(messages))
-    logging.info("Messages seeded successfully.")
-
-def seed_follows():
-    """Seed follows table from follows.csv."""
-    logging.info("Seeding follows...")
-    validate_csv(FOLLOWS_CSV)
-    with open(FOLLOWS_CSV) as follows:
-        db.session.bulk_insert_mappings(Follows, DictReader(follows))
-    logging.info("Follows seeded successfully.")
+def log_progress(table, loaded, rate):
+    """Report each committed chunk."""
+    logging.info(f"{table}: {loaded} rows loaded ({rate:,.0f} rows/s)")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted load instead of starting over.")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows loaded per transaction.")
+    args = parser.parse_args()
+
     app = create_app()  # Create the Flask app instance
     with app.app_context():  # Wrap the operations in an app context
-        logging.info("Dropping and creating tables...")
-        db.drop_all()
-        db.create_all()
-
+        for path in (USERS_CSV, MESSAGES_CSV, FOLLOWS_CSV, LIKES_CSV):
+            if path:
+                validate_csv(path)
         try:
-            seed_users()
-            seed_messages()
-            seed_follows()
-            db.session.commit()
-            logging.info("Database seeding completed successfully.")
+            loaded = load_seed(seed_files(USERS_CSV, MESSAGES_CSV, FOLLOWS_CSV, LIKES_CSV),
+                               chunk_size=args.chunk_size, fresh=not args.resume, progress=log_progress)
+            logging.info(f"Database seeding completed successfully: {loaded}")
         except Exception as e:
-            logging.error(f"An error occurred during seeding: {e}")
-            db.session.rollback()
+            logging.error(f"An error occurred during seeding: {e}. Re-run with --resume to continue.")
+            raise SystemExit(1)
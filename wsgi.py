@@ -0,0 +1,17 @@
+"""wsgi.py
+
+Production entry point, e.g. `gunicorn --preload wsgi:app`. Builds the app
+with the production config: no debug toolbar, no Alembic import, no console
+output. With --preload, workers fork from a master that has already imported
+and built the app, so a new worker is ready in milliseconds (see
+scripts/bench_startup.py). `create_app` opens no database connection, so
+nothing is shared across the fork.
+
+Behind a load balancer or reverse proxy, set PROXY_FIX_X_FOR to the number
+of proxies in front of gunicorn. Otherwise every client shares the proxy's
+address, and so one login-throttle bucket (see app/throttle.py).
+"""
+
+from app import create_app
+
+app = create_app('production')